@@ -1,17 +1,28 @@
 
 # ai/api.py
 from flask import Blueprint, request, jsonify
-from ai.model_utils import predict_from_dict
-import traceback
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from ai.model_utils import predict_batch, reload_bundle, model_info
+from ai.prediction_cache import predict_cached
+from ai.recommendations import (
+    save_if_changed,
+    latest_recommendation,
+    latest_by_instance,
+    list_recommendations
+)
+import logging
 import app_state  # <-- store partagé
 
 ai_bp = Blueprint('ai', __name__)
+logger = logging.getLogger(__name__)
+
 
 @ai_bp.route("/predict", methods=["POST"])
 def predict():
     """
     Reçoit {instance_id, metrics} et renvoie une recommandation.
-    Persiste la dernière recommandation pour le Dashboard (/status) dans app_state.
+    Persiste la recommandation (table Recommendation + app_state) pour le Dashboard (/status),
+    seulement si elle diffère de la dernière enregistrée pour cette instance.
     """
     try:
         data = request.get_json() or {}
@@ -28,9 +39,9 @@ def predict():
 
         # Appel modèle IA
         try:
-            model_out = predict_from_dict(metrics)  # ex: {"recommended_ec2": "...", ...}
+            model_out = predict_cached(metrics)  # ex: {"recommended_ec2": "...", ...}
         except Exception as m_err:
-            traceback.print_exc()
+            logger.exception("Erreur modèle IA (predict)")
             return jsonify({"error": f"Erreur modèle IA: {str(m_err)}"}), 500
 
         recommendation = {
@@ -45,21 +56,115 @@ def predict():
             "recommendation": model_out
         }
 
-        # ✅ Persistance pour le Dashboard
+        # ✅ Persistance pour le Dashboard (table Recommendation, partagée entre workers)
         app_state.last_ai_recommendation = recommendation
+        try:
+            save_if_changed(recommendation)
+        except Exception:
+            logger.exception("Persistance de la recommandation")
 
         return jsonify(recommendation), 200
 
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Erreur IA (predict)")
+        return jsonify({"error": f"Erreur IA: {str(e)}"}), 500
+
+
+@ai_bp.route("/predict/batch", methods=["POST"])
+def predict_many():
+    """
+    Reçoit {items: [{instance_id, metrics}, ...]} et score toutes les lignes en un seul passage.
+    Les lignes invalides sont renvoyées avec leur erreur, sans bloquer les autres.
+    """
+    try:
+        data = request.get_json() or {}
+        items = data.get("items")
+        if not items or not isinstance(items, list):
+            return jsonify({"error": "items manquant"}), 400
+
+        required = ["CPUUtilization", "NetworkIn", "NetworkOut"]
+        results = [None] * len(items)
+        valid_idx, rows = [], []
+        for i, item in enumerate(items):
+            item = item if isinstance(item, dict) else {}
+            instance_id = item.get("instance_id")
+            metrics = item.get("metrics") or {}
+            missing = [k for k in required if k not in metrics]
+            if not instance_id:
+                results[i] = {"instance_id": None, "error": "instance_id manquant"}
+            elif missing:
+                results[i] = {"instance_id": instance_id, "error": f"Métriques manquantes: {', '.join(missing)}"}
+            else:
+                valid_idx.append(i)
+                rows.append(metrics)
+
+        try:
+            model_out = predict_batch(rows)
+        except Exception as m_err:
+            logger.exception("Erreur modèle IA (predict/batch)")
+            return jsonify({"error": f"Erreur modèle IA: {str(m_err)}"}), 500
+
+        for i, out in zip(valid_idx, model_out):
+            results[i] = {"instance_id": items[i]["instance_id"], "recommendation": out}
+
+        return jsonify({"results": results, "total": len(results), "scored": len(rows)}), 200
+
+    except Exception as e:
+        logger.exception("Erreur IA (predict/batch)")
         return jsonify({"error": f"Erreur IA: {str(e)}"}), 500
 
 
 @ai_bp.route("/last", methods=["GET"])
 def last():
-    return jsonify({"last_ai": app_state.last_ai_recommendation})
+    """Dernière recommandation, globale ou pour ?instance_id=..."""
+    return jsonify({"last_ai": latest_recommendation(request.args.get("instance_id"))})
+
+
+@ai_bp.route("/latest", methods=["GET"])
+def latest():
+    """Dernière recommandation de chaque instance (alimenté par le pipeline planifié)."""
+    recs = latest_by_instance()
+    return jsonify({"recommendations": recs, "total": len(recs)})
+
+
+# taille max d'une page d'historique
+HISTORY_MAX_LIMIT = 500
+
+
+@ai_bp.route("/recommendations", methods=["GET"])
+def recommendations_history():
+    """
+    Historique des recommandations, du plus récent au plus ancien (pagination par clé).
+    Query: instance_id=..., limit=N (défaut 50), cursor=<valeur "cursor" de la page précédente>
+    """
+    limit = request.args.get("limit", 50, type=int)
+    cursor = request.args.get("cursor", type=int)
+    if not 1 <= limit <= HISTORY_MAX_LIMIT:
+        return jsonify({"error": f"limit invalide (1 à {HISTORY_MAX_LIMIT})"}), 400
+
+    try:
+        recs, next_cursor = list_recommendations(request.args.get("instance_id"), limit, cursor)
+    except Exception as e:
+        logger.exception("Lecture de l'historique des recommandations")
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"recommendations": recs, "cursor": next_cursor})
+
+
+@ai_bp.route("/reload", methods=["POST"])
+@jwt_required()
+def reload_model():
+    """Recharge model_bundle.pkl depuis le disque ; les prédictions en cours gardent l'ancien bundle."""
+    identity = get_jwt_identity()
+    if not identity or identity.get('role') != 'admin':
+        return jsonify({"error": "Accès réservé aux administrateurs"}), 403
+
+    try:
+        return jsonify({"message": "Modèle rechargé", "model": reload_bundle()}), 200
+    except Exception as e:
+        logger.exception("Erreur rechargement modèle")
+        return jsonify({"error": f"Erreur rechargement modèle: {str(e)}"}), 500
 
 
 @ai_bp.route("/", methods=["GET"])
 def index():
-    return jsonify({"service": "aws-config-recommender", "status": "running"})
+    return jsonify({"service": "aws-config-recommender", "status": "running", "model": model_info()})
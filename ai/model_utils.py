@@ -1,9 +1,18 @@
 # app/model_utils.py
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
 from pathlib import Path
 import joblib
 import numpy as np
 import pandas as pd
 
+from observability import span
+
+logger = logging.getLogger(__name__)
+
 _BASE = Path(__file__).resolve().parent
 # prefer `models/model_bundle.pkl` next to this file
 BUNDLE_PATH = _BASE / "models" / "model_bundle.pkl"
@@ -21,64 +30,322 @@ if not BUNDLE_PATH.exists():
         nested_alt = _BASE / "app" / "models" / "model.pkl"
         if nested_alt.exists():
             BUNDLE_PATH = nested_alt
+# explicit override (benchmarks, alternative deployments)
+if os.getenv("MODEL_BUNDLE_PATH"):
+    BUNDLE_PATH = Path(os.getenv("MODEL_BUNDLE_PATH"))
+
+# memory-map the numpy arrays so forked workers share pages instead of copying them
+MODEL_MMAP = os.getenv("MODEL_MMAP", "0") == "1"
+# how often (seconds) predictions check the bundle file for changes; 0 disables
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "30"))
 
 def load_bundle():
     if not BUNDLE_PATH.exists():
         raise FileNotFoundError(f"Model bundle not found: {BUNDLE_PATH}")
-    return joblib.load(BUNDLE_PATH)
-
-_bundle = load_bundle()
-_scaler = _bundle["scaler"]
-_models = _bundle["models"]
-_encoders = _bundle["encoders"]
-_FEATURES = _bundle["features"]
+    return joblib.load(BUNDLE_PATH, mmap_mode="r" if MODEL_MMAP else None)
 
 # mapping for categorical incoming fields (must match training mapping)
 JOB_TYPE_MAP = {"service":0, "batch":1, "ai_training":2}
 SCHEDULER_MAP = {"fifo":0, "batch":1, "realtime":2}
 
-def _prepare_input(data: dict):
-    # ensure order matches FEATURES
-    row = []
-    for f in _FEATURES:
-        v = data.get(f, 0)
-        # handle timestamp string
-        if f == "timestamp":
+# --- typed converters used by the feature plan ---
+
+def _to_float(v):
+    if type(v) is float:
+        return v
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _parse_timestamp(v):
+    """ISO-8601 string or epoch seconds -> epoch seconds (naive datetimes are UTC)."""
+    if isinstance(v, (int, float)):
+        return float(v)
+    if isinstance(v, str):
+        try:
+            return float(v)
+        except ValueError:
+            pass
+        if v.endswith(("Z", "z")):
+            # fromisoformat() only accepts "Z" from Python 3.11 on
+            v = v[:-1] + "+00:00"
+        try:
+            dt = datetime.fromisoformat(v)
+        except ValueError:
+            # non ISO formats: let pandas try, as before
             try:
-                v = pd.to_datetime(v).timestamp()
-            except:
-                try:
-                    v = float(v)
-                except:
-                    v = 0.0
-        # job_type / scheduler mapping to int
-        if f == "job_type":
-            v = JOB_TYPE_MAP.get(v, 0)
-        if f == "scheduler":
-            v = SCHEDULER_MAP.get(v, 0)
-        # cast numeric where possible
+                return pd.to_datetime(v).timestamp()
+            except Exception:
+                return 0.0
+    elif isinstance(v, datetime):
+        dt = v
+    else:
+        return 0.0
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+def _categorical(mapping):
+    lookup = {k: float(v) for k, v in mapping.items()}
+
+    def convert(v):
         try:
-            row.append(float(v))
-        except:
-            row.append(0.0)
-    X = np.array([row])
-    Xs = _scaler.transform(X)
+            return lookup.get(v, 0.0)
+        except TypeError:  # unhashable value
+            return 0.0
+    return convert
+
+_CONVERTERS = {
+    "timestamp": _parse_timestamp,
+    "job_type": _categorical(JOB_TYPE_MAP),
+    "scheduler": _categorical(SCHEDULER_MAP),
+}
+
+
+class FeatureEncoder:
+    """
+    Column plan compiled once per bundle: one (feature, converter) pair per column,
+    in FEATURES order, writing straight into float64 buffers.
+    """
+
+    def __init__(self, features):
+        self.features = list(features)
+        self.plan = [(i, f, _CONVERTERS.get(f, _to_float)) for i, f in enumerate(self.features)]
+        self._local = threading.local()
+
+    def encode_into(self, data: dict, out):
+        get = data.get
+        for i, f, convert in self.plan:
+            out[i] = convert(get(f, 0))
+        return out
+
+    def encode_one(self, data: dict):
+        # per-thread 1xN buffer, reused across calls (the scaler returns a new array)
+        buf = getattr(self._local, "buf", None)
+        if buf is None:
+            buf = self._local.buf = np.empty((1, len(self.plan)), dtype=np.float64)
+        return self.encode_into(data, buf[0]).reshape(1, -1)
+
+    def encode_many(self, rows):
+        X = np.empty((len(rows), len(self.plan)), dtype=np.float64)
+        for r, data in enumerate(rows):
+            self.encode_into(data, X[r])
+        return X
+
+
+class ModelState:
+    """
+    Immutable snapshot of a loaded bundle. Callers grab one reference per prediction,
+    so a reload never mixes models from two bundles inside a request.
+    """
+
+    def __init__(self, bundle, stat, load_seconds):
+        self.scaler = bundle["scaler"]
+        self.models = bundle["models"]
+        self.encoders = bundle["encoders"]
+        self.features = bundle["features"]
+        self.encoder = FeatureEncoder(self.features)
+        self.path = str(BUNDLE_PATH)
+        self.stat = stat
+        self.version = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        self.loaded_at = datetime.now(timezone.utc).isoformat()
+        self.load_seconds = load_seconds
+
+    def info(self):
+        return {
+            "loaded": True,
+            "path": self.path,
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "load_seconds": round(self.load_seconds, 4),
+            "mmap": MODEL_MMAP,
+            "features": len(self.features),
+        }
+
+
+_state = None
+_state_lock = threading.Lock()
+_last_check = 0.0
+_reloading = False
+
+def _bundle_stat():
+    return BUNDLE_PATH.stat()
+
+def _load_state():
+    t0 = time.perf_counter()
+    bundle = load_bundle()
+    stat = _bundle_stat()
+    return ModelState(bundle, stat, time.perf_counter() - t0)
+
+def reload_bundle():
+    """Load the bundle from disk and swap it in atomically; in-flight predictions keep the old one."""
+    global _state
+    new_state = _load_state()
+    with _state_lock:
+        _state = new_state
+    return new_state.info()
+
+def _background_reload():
+    global _reloading
+    try:
+        reload_bundle()
+    except Exception:
+        # half-written file, bad pickle... keep serving the current bundle
+        logger.exception("Model reload failed, keeping the current bundle")
+    finally:
+        _reloading = False
+
+def _watch(state):
+    global _last_check, _reloading
+    if MODEL_RELOAD_INTERVAL <= 0:
+        return
+    now = time.monotonic()
+    if now - _last_check < MODEL_RELOAD_INTERVAL:
+        return
+    with _state_lock:
+        if _reloading or now - _last_check < MODEL_RELOAD_INTERVAL:
+            return
+        _last_check = now
+        try:
+            st = _bundle_stat()
+        except OSError:
+            return
+        if (st.st_mtime_ns, st.st_size) == (state.stat.st_mtime_ns, state.stat.st_size):
+            return
+        _reloading = True
+    threading.Thread(target=_background_reload, daemon=True).start()
+
+def get_model_state():
+    """Current bundle, loaded on first use and hot-swapped when the file changes."""
+    global _state, _last_check
+    state = _state
+    if state is None:
+        with _state_lock:
+            if _state is None:
+                _state = _load_state()
+                _last_check = time.monotonic()
+            return _state
+    _watch(state)
+    return state
+
+def model_info():
+    """Bundle metadata without triggering a load."""
+    state = _state
+    if state is None:
+        return {"loaded": False, "path": str(BUNDLE_PATH), "mmap": MODEL_MMAP}
+    return state.info()
+
+def _prepare_input(data: dict, state=None):
+    state = state or get_model_state()
+    X = state.encoder.encode_one(data)
+    Xs = state.scaler.transform(X)
     return Xs
 
-def predict_from_dict(data: dict):
+_EPOCH = pd.Timestamp(0, tz="UTC")
+
+def _frame_timestamps(col: pd.Series):
+    """Vectorized _parse_timestamp: numbers are epoch seconds, ISO strings go through to_datetime."""
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return (pd.to_datetime(col, utc=True) - _EPOCH) / pd.Timedelta(seconds=1)
+    col = col.reset_index(drop=True)  # .loc below needs unique labels
+    # numbers first: to_datetime would read them as nanoseconds
+    seconds = pd.to_numeric(col, errors="coerce").astype(np.float64)
+    rest = col[seconds.isna() & col.notna()]
+    if len(rest):
+        parsed = pd.to_datetime(rest, errors="coerce", utc=True, format="ISO8601")
+        seconds.loc[rest.index] = (parsed - _EPOCH) / pd.Timedelta(seconds=1)
+        # anything ISO8601 rejects: exactly what the dict path does (pandas guess, else 0)
+        unparsed = rest[parsed.isna()]
+        if len(unparsed):
+            seconds.loc[unparsed.index] = unparsed.map(_parse_timestamp)
+    return seconds
+
+def _encode_frame(df: pd.DataFrame, features):
+    """Column-wise encoding of a DataFrame, same semantics as FeatureEncoder."""
+    X = np.zeros((len(df), len(features)))
+    for i, f in enumerate(features):
+        if f not in df.columns:
+            continue
+        col = df[f]
+        if f == "timestamp":
+            col = _frame_timestamps(col)
+        elif f == "job_type":
+            col = col.map(JOB_TYPE_MAP)
+        elif f == "scheduler":
+            col = col.map(SCHEDULER_MAP)
+        else:
+            col = pd.to_numeric(col, errors="coerce")
+        X[:, i] = col.fillna(0).to_numpy(dtype=np.float64)
+    return X
+
+def _prepare_batch(rows, state):
+    if isinstance(rows, pd.DataFrame):
+        X = _encode_frame(rows, state.features)
+    else:
+        X = state.encoder.encode_many(rows)
+    return state.scaler.transform(X)
+
+def _decode(encoder, preds):
+    # LabelEncoder.inverse_transform is a single vectorized lookup in classes_
+    try:
+        return encoder.inverse_transform(preds).tolist()
+    except Exception:
+        pass
+    labels = []
+    for p in preds:
+        try:
+            labels.append(encoder.inverse_transform([p])[0])
+        except Exception:
+            labels.append(str(p))
+    return labels
+
+def predict_batch(rows):
+    """
+    Input: list of dicts (same keys as predict_from_dict) or a DataFrame with FEATURES columns
+    Output: list of recommendation dicts, one per row, in input order
+    Builds one feature matrix, scales it once and runs each model once over all rows.
+    """
+    if len(rows) == 0:
+        return []
+    state = get_model_state()
+    models, encoders = state.models, state.encoders
+    with span("model", "prepare.batch"):
+        Xs = _prepare_batch(rows, state)
+    with span("model", "predict.batch"):
+        ec2_labels = _decode(encoders.get("ec2"), models["ec2"].predict(Xs))
+        storage_labels = _decode(encoders.get("storage"), models["storage"].predict(Xs))
+        scaling_labels = _decode(encoders.get("scaling"), models["scaling"].predict(Xs))
+
+    return [
+        {
+            "recommended_ec2": ec2,
+            "recommended_storage": storage,
+            "recommended_scaling_action": scaling
+        }
+        for ec2, storage, scaling in zip(ec2_labels, storage_labels, scaling_labels)
+    ]
+
+def predict_from_dict(data: dict, state=None):
     """
     Input: dict with keys matching FEATURES (or a subset)
     Output: dict with recommendations
+    `state` pins the bundle snapshot (defaults to the current one).
     """
-    Xs = _prepare_input(data)
-    pred_ec2 = _models["ec2"].predict(Xs)[0]
-    pred_storage = _models["storage"].predict(Xs)[0]
-    pred_scaling = _models["scaling"].predict(Xs)[0]
+    state = state or get_model_state()
+    models, encoders = state.models, state.encoders
+    # one span per stage: shows whether scaling/encoding or the estimators dominate
+    with span("model", "prepare"):
+        Xs = _prepare_input(data, state)
+    with span("model", "predict"):
+        pred_ec2 = models["ec2"].predict(Xs)[0]
+        pred_storage = models["storage"].predict(Xs)[0]
+        pred_scaling = models["scaling"].predict(Xs)[0]
 
     # If encoders are LabelEncoder objects, inverse_transform to strings where applicable
-    le_ec2 = _encoders.get("ec2")
-    le_storage = _encoders.get("storage")
-    le_scaling = _encoders.get("scaling")
+    le_ec2 = encoders.get("ec2")
+    le_storage = encoders.get("storage")
+    le_scaling = encoders.get("scaling")
 
     try:
         ec2_label = le_ec2.inverse_transform([pred_ec2])[0]
@@ -0,0 +1,97 @@
+# ai/pipeline.py
+"""
+Pipeline planifié de recommandations pour toute la flotte :
+inventaire EC2 (running) -> métriques GetMetricData par lots -> predict_batch -> INSERT groupé.
+
+Activé par AI_PIPELINE_INTERVAL (secondes, 0 = désactivé). Les lots de métriques sont
+récupérés sur un pool borné de AI_PIPELINE_WORKERS threads.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ai.model_utils import predict_batch
+from ai.recommendations import save_recommendations
+from monitoring.cloudwatch_manager import get_ec2_metrics_batch
+from monitoring.inventory import list_ec2_instances
+
+logger = logging.getLogger(__name__)
+
+AI_PIPELINE_INTERVAL = float(os.getenv("AI_PIPELINE_INTERVAL", "0"))
+AI_PIPELINE_WORKERS = int(os.getenv("AI_PIPELINE_WORKERS", "4"))
+# 100 instances x 5 métriques = 500 requêtes, soit un appel GetMetricData
+AI_PIPELINE_CHUNK = int(os.getenv("AI_PIPELINE_CHUNK", "100"))
+
+
+class RecommendationPipeline:
+    def __init__(self, app, interval=AI_PIPELINE_INTERVAL, workers=AI_PIPELINE_WORKERS,
+                 chunk_size=AI_PIPELINE_CHUNK):
+        self.app = app
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ai-pipeline")
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_run = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="ai-pipeline", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._pool.shutdown(wait=False)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Pipeline IA : passage en échec")
+            self._stop.wait(self.interval)
+
+    def run_once(self):
+        """Un passage complet ; renvoie le nombre de recommandations écrites."""
+        t0 = time.perf_counter()
+        instance_ids = [inst["instanceId"] for inst in list_ec2_instances(state="running")]
+        chunks = [
+            instance_ids[i:i + self.chunk_size]
+            for i in range(0, len(instance_ids), self.chunk_size)
+        ]
+
+        metrics = {}
+        for part in self._pool.map(get_ec2_metrics_batch, chunks):
+            metrics.update(part)
+
+        rows = [metrics[iid] for iid in instance_ids]
+        outputs = predict_batch(rows)
+        recs = [
+            {"instance_id": iid, "metrics": m, "recommendation": out}
+            for iid, m, out in zip(instance_ids, rows, outputs)
+        ]
+
+        with self.app.app_context():
+            written = save_recommendations(recs)
+
+        self.last_run = {
+            "at": time.time(),
+            "instances": len(instance_ids),
+            "written": written,
+            "seconds": round(time.perf_counter() - t0, 3)
+        }
+        return written
+
+
+pipeline = None
+
+
+def start_pipeline(app):
+    """Démarre le pipeline si AI_PIPELINE_INTERVAL > 0 (une fois par process)."""
+    global pipeline
+    if AI_PIPELINE_INTERVAL > 0 and pipeline is None:
+        pipeline = RecommendationPipeline(app).start()
+    return pipeline
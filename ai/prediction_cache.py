@@ -0,0 +1,206 @@
+# ai/prediction_cache.py
+"""
+LRU/TTL cache in front of predict_from_dict.
+
+Entries are keyed on the scaled feature vector (after scaler.transform) rounded to a
+multiple of PREDICTION_CACHE_STEP, plus the bundle version so a model reload
+invalidates everything. Rounding in scaled space gives every feature a tolerance of
+PREDICTION_CACHE_STEP x its training spread (scaler.scale_, the std for a
+StandardScaler): with the default 0.01, inputs share a result when each feature is
+within ~1% of a standard deviation, timestamp included, instead of a tolerance that
+grows with the raw magnitude of the value. With PREDICTION_CACHE_BACKEND=sqlite the
+entries are also written to a local SQLite file shared by every worker on the host.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+from ai.model_utils import get_model_state, predict_from_dict
+from extensions import metrics
+
+_BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "4096"))  # 0 disables the cache
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "300"))
+PREDICTION_CACHE_STEP = float(os.getenv("PREDICTION_CACHE_STEP", "0.01"))  # scaled units, 0 = exact match
+PREDICTION_CACHE_BACKEND = os.getenv("PREDICTION_CACHE_BACKEND", "memory")  # memory | sqlite
+PREDICTION_CACHE_PATH = os.getenv(
+    "PREDICTION_CACHE_PATH", os.path.join(_BASE, "instance", "prediction_cache.db")
+)
+
+CACHE_REQUESTS = Counter(
+    "prediction_cache_requests_total",
+    "Prediction cache lookups",
+    ["result"],
+    registry=metrics.registry
+)
+CACHE_SIZE = Gauge(
+    "prediction_cache_size",
+    "Entries held in the in-process prediction cache",
+    registry=metrics.registry
+)
+CACHE_HIT_RATIO = Gauge(
+    "prediction_cache_hit_ratio",
+    "Prediction cache hits / lookups since start",
+    registry=metrics.registry
+)
+
+
+def quantize(x, step):
+    """Round every value to a multiple of `step` (0 keeps values as-is)."""
+    x = np.asarray(x, dtype=np.float64)
+    if step <= 0:
+        return x
+    # + 0.0 turns -0.0 into 0.0: both must hash to the same key
+    return np.round(x / step) + 0.0
+
+
+class _SqliteStore:
+    """Shared store: one row per key, expired rows purged lazily."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS prediction_cache ("
+            "key TEXT PRIMARY KEY, version TEXT NOT NULL, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value, expires FROM prediction_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, version, value, expires):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO prediction_cache (key, version, value, expires) VALUES (?, ?, ?, ?)",
+            (key, version, json.dumps(value, default=str), expires)
+        )
+        self._writes += 1
+        if self._writes % 500 == 0:
+            conn.execute("DELETE FROM prediction_cache WHERE expires < ?", (time.time(),))
+
+    def drop_other_versions(self, version):
+        self._conn().execute("DELETE FROM prediction_cache WHERE version != ?", (version,))
+
+
+class PredictionCache:
+    def __init__(self, max_size=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL,
+                 step=PREDICTION_CACHE_STEP, backend=PREDICTION_CACHE_BACKEND,
+                 path=PREDICTION_CACHE_PATH):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.step = step
+        self._entries = OrderedDict()  # key -> (value, expires)
+        self._lock = threading.Lock()
+        self._version = None
+        self._hits = 0
+        self._lookups = 0
+        self._store = _SqliteStore(path) if backend == "sqlite" and max_size > 0 else None
+
+    def key(self, data, state):
+        x = quantize(state.scaler.transform(state.encoder.encode_one(data))[0], self.step)
+        return hashlib.blake2b(state.version.encode() + x.tobytes(), digest_size=16).hexdigest()
+
+    def predict(self, data: dict):
+        """predict_from_dict with caching; same input/output."""
+        state = get_model_state()
+        if self.max_size <= 0:
+            return predict_from_dict(data, state)
+
+        self._check_version(state.version)
+        key = self.key(data, state)
+        value = self._get(key)
+        if value is not None:
+            self._record(hit=True)
+            return value
+
+        self._record(hit=False)
+        value = predict_from_dict(data, state)
+        self._set(key, state.version, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            CACHE_SIZE.set(0)
+
+    def _check_version(self, version):
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            self._version = version
+            self._entries.clear()
+            CACHE_SIZE.set(0)
+        if self._store is not None:
+            self._store.drop_other_versions(version)
+
+    def _get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] >= now:
+                    self._entries.move_to_end(key)
+                    return entry[0]
+                del self._entries[key]
+        if self._store is not None:
+            found = self._store.get(key)
+            if found is not None:
+                self._put_local(key, *found)
+                return found[0]
+        return None
+
+    def _set(self, key, version, value):
+        expires = time.time() + self.ttl
+        self._put_local(key, value, expires)
+        if self._store is not None:
+            self._store.set(key, version, value, expires)
+
+    def _put_local(self, key, value, expires):
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            CACHE_SIZE.set(len(self._entries))
+
+    def _record(self, hit):
+        CACHE_REQUESTS.labels("hit" if hit else "miss").inc()
+        with self._lock:
+            self._lookups += 1
+            self._hits += hit
+            CACHE_HIT_RATIO.set(self._hits / self._lookups)
+
+
+cache = PredictionCache()
+
+
+def predict_cached(data: dict):
+    return cache.predict(data)
@@ -0,0 +1,95 @@
+# ai/recommendations.py
+"""
+Persistance des recommandations dans la table Recommendation + lectures indexées
+de la dernière recommandation (globale ou par instance).
+"""
+import json
+import logging
+from datetime import datetime
+
+from sqlalchemy import func
+
+from extensions import db
+from auth.models import Recommendation, keyset_page
+import app_state
+
+logger = logging.getLogger(__name__)
+
+
+def save_recommendations(recs):
+    """Insère en un seul INSERT groupé une liste de {instance_id, metrics, recommendation}."""
+    if not recs:
+        return 0
+    now = datetime.utcnow()
+    db.session.bulk_insert_mappings(Recommendation, [
+        {
+            "instance_id": rec["instance_id"],
+            "content": json.dumps(rec, default=str),
+            "created_at": now
+        }
+        for rec in recs
+    ])
+    db.session.commit()
+
+    for rec in recs:
+        app_state.latest_recommendations[rec["instance_id"]] = rec
+    app_state.last_ai_recommendation = recs[-1]
+    return len(recs)
+
+
+def save_if_changed(rec):
+    """
+    Persiste rec seulement si sa recommandation diffère de la dernière enregistrée pour
+    l'instance : un client qui interroge /ai/predict en boucle n'ajoute pas une ligne par appel.
+    """
+    last = latest_recommendation(rec["instance_id"])
+    if last is not None and last.get("recommendation") == rec["recommendation"]:
+        return 0
+    return save_recommendations([rec])
+
+
+def _decode(row):
+    rec = json.loads(row.content)
+    rec["created_at"] = row.created_at.isoformat() if row.created_at else None
+    return rec
+
+
+def latest_recommendation(instance_id=None):
+    """Dernière recommandation (PK / index instance_id,id) ; repli sur l'état du process."""
+    try:
+        query = Recommendation.query
+        if instance_id:
+            query = query.filter(Recommendation.instance_id == instance_id)
+        row = query.order_by(Recommendation.id.desc()).first()
+        if row is not None:
+            return _decode(row)
+    except Exception:
+        logger.exception("Lecture de la dernière recommandation")
+
+    if instance_id:
+        return app_state.latest_recommendations.get(instance_id)
+    return app_state.last_ai_recommendation
+
+
+def list_recommendations(instance_id=None, limit=50, cursor=None):
+    """Historique paginé par clé (id décroissant) : renvoie (recommandations, next_cursor)."""
+    query = Recommendation.query
+    if instance_id:
+        query = query.filter(Recommendation.instance_id == instance_id)
+    rows, next_cursor = keyset_page(query, Recommendation.id, limit, cursor)
+    return [{"id": row.id, **_decode(row)} for row in rows], next_cursor
+
+
+def latest_by_instance():
+    """{instance_id: dernière recommandation} pour toute la flotte, en une requête."""
+    try:
+        latest_ids = (
+            db.session.query(func.max(Recommendation.id))
+            .filter(Recommendation.instance_id.isnot(None))
+            .group_by(Recommendation.instance_id)
+        )
+        rows = Recommendation.query.filter(Recommendation.id.in_(latest_ids)).all()
+        return {row.instance_id: _decode(row) for row in rows}
+    except Exception:
+        logger.exception("Lecture des dernières recommandations par instance")
+        return dict(app_state.latest_recommendations)
@@ -1,28 +1,47 @@
 import os
+import logging
 from flask import Flask, request, jsonify
-from extensions import db, jwt
+from extensions import db, jwt, metrics, engine_options
 from dotenv import load_dotenv
-from prometheus_flask_exporter import PrometheusMetrics
 from flask_cors import CORS
 load_dotenv()
-import app_state
 
-def create_app():
+logger = logging.getLogger(__name__)
+
+def create_app(background=True):
+    """
+    background=False : pas de threads d'arrière-plan (master gunicorn avec preload_app,
+    voir gunicorn.conf.py qui appelle start_background dans chaque worker après le fork).
+    """
     app = Flask(__name__)
 
-    # --- PROMETHEUS ---
-    metrics = PrometheusMetrics(app)
+    # --- LOGS (console + table Log) : avant les imports de blueprints qui loggent ---
+    from logs import init_logging
+    init_logging(app)
+
+    # --- PROMETHEUS + TRACES (latence par dépendance, Server-Timing) ---
+    metrics.init_app(app)
+    from observability import init_tracing
+    init_tracing(app)
 
     # --- CORS (development) ---
     # Allow the frontend dev server (and other local origins) to call any API route.
     # In production you should restrict origins to the real domains.
-    CORS(app, resources={r"/*": {"origins": "*"}})
+    # ETag / X-Snapshot-Version lisibles par le frontend (GET conditionnels, ?since=)
+    CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=["ETag", "X-Snapshot-Version"])
+
+    # --- COMPRESSION (gzip/br selon Accept-Encoding) ---
+    from http_cache import init_compression
+    init_compression(app)
 
     # --- DATABASE LOCATION ---
+    # SQLALCHEMY_DATABASE_URI (ex. postgresql://...) ; SQLite local par défaut
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
     DB_PATH = os.path.join(BASE_DIR, "instance", "cloudnetops.db")
+    db_uri = os.getenv("SQLALCHEMY_DATABASE_URI") or f"sqlite:///{DB_PATH}"
 
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{DB_PATH}"
+    app.config['SQLALCHEMY_DATABASE_URI'] = db_uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(db_uri)
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_SECRET_KEY'] = 'cloudnetops_secret'
 
@@ -30,8 +49,8 @@ def create_app():
     db.init_app(app)
     jwt.init_app(app)
 
-    print("JWT header:", app.config.get('JWT_HEADER_NAME', 'Authorization'))
-    print("JWT type:", app.config.get('JWT_HEADER_TYPE', 'Bearer'))
+    logger.info("JWT header: %s", app.config.get('JWT_HEADER_NAME', 'Authorization'))
+    logger.info("JWT type: %s", app.config.get('JWT_HEADER_TYPE', 'Bearer'))
 
     # Register blueprints
     from auth.routes import auth_bp
@@ -40,12 +59,28 @@ def create_app():
     from ai.api import ai_bp           # <---- à ajouter pour IA
     from monitoring.routes import status_bp
     from k8s import k8s_bp
+    from push import push_bp, hub
+    from logs import logs_bp
+    from observability import observability_bp
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(deploy_bp, url_prefix="/deploy")
     app.register_blueprint(monitor_bp, url_prefix="/monitor")
     app.register_blueprint(ai_bp, url_prefix="/ai")   # <---- à ajouter
     app.register_blueprint(status_bp, url_prefix='')
     app.register_blueprint(k8s_bp)
+    app.register_blueprint(push_bp)   # /events (SSE)
+    app.register_blueprint(logs_bp)   # /logs
+    app.register_blueprint(observability_bp)   # /debug/profile, /debug/traces
+    hub.init_app(app)
+
+    # --- SCHEMA + PIPELINE IA ---
+    from auth.models import upgrade_schema
+    from ai.recommendations import latest_recommendation
+    with app.app_context():
+        upgrade_schema()
+    if background:
+        start_background(app)
+
     @app.route("/")
     def home():
         return {"message": "Bienvenue sur CloudNetOps API"}
@@ -55,22 +90,31 @@ def create_app():
     def status():
         return jsonify({
             'status': 'ok',
-            'last_ai': app_state.last_ai_recommendation
+            'last_ai': latest_recommendation()
         })
 
     return app
 
 
-if __name__ == "__main__":
-    app = create_app()
+def start_background(app, leader=True, resume_jobs=True):
+    """
+    Threads d'arrière-plan du process : écriture des logs et pool des jobs de déploiement
+    partout ; pipeline IA planifié seulement dans le process `leader` (un seul worker
+    gunicorn), et reprise des jobs interrompus seulement si `resume_jobs` (process unique ;
+    sous gunicorn, le leader reprend les jobs dont le bail a expiré).
+    """
+    from logs import start_log_writer
+    from ai.pipeline import start_pipeline
+    from deploy.jobs import start_jobs
+    start_log_writer(app)
+    if leader:
+        start_pipeline(app)
+    start_jobs(app, resume=resume_jobs)
 
-    with app.app_context():
-        db_path = app.config["SQLALCHEMY_DATABASE_URI"].replace("sqlite:///", "")
 
-        if not os.path.exists(db_path):
-            print("Database not found → Creating database...")
-            db.create_all()
-        else:
-            print("Database already exists → OK")
+if __name__ == "__main__":
+    app = create_app()
 
+    # serveur de développement (un seul process) ; en production : gunicorn -c gunicorn.conf.py wsgi:app
+    # create_app() crée / met à niveau le schéma (upgrade_schema)
     app.run(host="0.0.0.0", port=5000)
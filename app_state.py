@@ -1,3 +1,27 @@
+import os
+import threading
+from collections import OrderedDict
+
+# instances gardées dans l'index en mémoire (l'instance_id vient du client)
+AI_LATEST_MAX = int(os.getenv("AI_LATEST_MAX", "4096"))
+
+
+class BoundedDict(OrderedDict):
+    """dict borné : au-delà de maxsize entrées, les moins récemment écrites sont oubliées."""
+
+    def __init__(self, maxsize):
+        super().__init__()
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            super().__setitem__(key, value)
+            self.move_to_end(key)
+            while len(self) > self.maxsize:
+                self.popitem(last=False)
+
 
-# app_state.py
 last_ai_recommendation = None
+# index en mémoire {instance_id: dernière recommandation} (repli si la base est indisponible)
+latest_recommendations = BoundedDict(AI_LATEST_MAX)
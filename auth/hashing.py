@@ -0,0 +1,132 @@
+# auth/hashing.py
+"""
+Hachage des mots de passe hors des threads HTTP.
+
+pbkdf2 est volontairement coûteux en CPU : exécuté dans le thread de la requête, une
+rafale de connexions occupe tous les cœurs et affame les autres API. Les calculs partent
+donc dans un pool de PASSWORD_HASH_WORKERS process (par process serveur : avec gunicorn,
+GUNICORN_WORKERS x PASSWORD_HASH_WORKERS au total). Au plus PASSWORD_HASH_MAX_PENDING
+calculs sont en cours ou en attente ; au-delà, HashingBusy est levée tout de suite
+(429 côté routes) au lieu d'allonger la file.
+
+Le coût est fixé par PASSWORD_HASH_ITERATIONS ; un hash créé avec un autre coût est
+recalculé à la prochaine connexion réussie (needs_rehash).
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from prometheus_client import Counter, Histogram
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+from extensions import metrics
+
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", str(DEFAULT_PBKDF2_ITERATIONS)))
+# pbkdf2:sha256 forcé pour compatibilité Windows / Python 3.13
+PASSWORD_HASH_METHOD = f"pbkdf2:sha256:{PASSWORD_HASH_ITERATIONS}"
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "1"))  # 0 = dans le thread appelant
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "4"))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+# priorité abaissée des process de hachage : les API du tableau de bord passent avant
+PASSWORD_HASH_NICE = int(os.getenv("PASSWORD_HASH_NICE", "5"))
+
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_seconds",
+    "Durée d'un hachage / d'une vérification de mot de passe, attente comprise",
+    ["op"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    registry=metrics.registry
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "Hachages refusés (file pleine ou délai dépassé)",
+    ["op"],
+    registry=metrics.registry
+)
+
+
+class HashingBusy(Exception):
+    pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # forkserver : les process de hachage ne sont pas forkés depuis un worker multi-thread
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                _pool = ProcessPoolExecutor(
+                    PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context(method),
+                    initializer=os.nice,
+                    initargs=(PASSWORD_HASH_NICE,)
+                )
+    return _pool
+
+
+def _reset_pool():
+    # process de hachage tué (OOM...) : nouveau pool au prochain appel
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+def _run(op, fn, *args):
+    if not _slots.acquire(blocking=False):
+        PASSWORD_HASH_REJECTED.labels(op).inc()
+        raise HashingBusy()
+    t0 = time.perf_counter()
+    try:
+        if PASSWORD_HASH_WORKERS <= 0:
+            try:
+                return fn(*args)
+            finally:
+                _slots.release()
+        try:
+            future = _get_pool().submit(fn, *args)
+        except Exception as e:
+            # aucune tâche soumise : la place doit être rendue ici, sinon elle est perdue
+            # (RuntimeError "cannot schedule new futures after shutdown" à l'arrêt, par exemple)
+            _slots.release()
+            if isinstance(e, BrokenProcessPool):
+                _reset_pool()
+            raise
+        # la place ne se libère qu'à la fin du calcul, même si l'appelant abandonne
+        future.add_done_callback(lambda f: _slots.release())
+        try:
+            return future.result(PASSWORD_HASH_TIMEOUT)
+        except FutureTimeout:
+            PASSWORD_HASH_REJECTED.labels(op).inc()
+            raise HashingBusy()
+        except BrokenProcessPool:
+            _reset_pool()
+            raise
+    finally:
+        PASSWORD_HASH_SECONDS.labels(op).observe(time.perf_counter() - t0)
+
+
+def hash_password(password):
+    """
+    Hash au coût courant. HashingBusy si PASSWORD_HASH_MAX_PENDING calculs sont déjà
+    en cours ou si le résultat n'arrive pas en PASSWORD_HASH_TIMEOUT secondes.
+    """
+    # fonctions werkzeug soumises telles quelles : les process du pool n'importent que werkzeug
+    return _run("hash", generate_password_hash, password, PASSWORD_HASH_METHOD, 16)
+
+
+def verify_password(password_hash, password):
+    return _run("verify", check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """Vrai si le hash a été calculé avec une autre méthode ou un autre coût."""
+    return password_hash.split("$", 1)[0] != PASSWORD_HASH_METHOD
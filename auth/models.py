@@ -1,8 +1,10 @@
 # auth/models.py
 from extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
+import sqlalchemy as sa
 from datetime import datetime
 
+from auth.hashing import hash_password, needs_rehash, verify_password
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -10,11 +12,15 @@ class User(db.Model):
     role = db.Column(db.String(20), default="dev")
 
     # Utilisation forcée de pbkdf2:sha256 pour compatibilité Windows / Python 3.13
+    # hachage dans le pool de auth/hashing.py ; HashingBusy si saturé
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password, method="pbkdf2:sha256", salt_length=16)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash)
 
 
 class Deployment(db.Model):
@@ -23,6 +29,23 @@ class Deployment(db.Model):
     status = db.Column(db.String(50), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # jobs de provisioning (deploy/jobs.py)
+    kind = db.Column(db.String(20))
+    instance_type = db.Column(db.String(50))
+    count = db.Column(db.Integer)
+    instance_ids = db.Column(db.Text)      # liste JSON
+    client_token = db.Column(db.String(64))
+    error = db.Column(db.Text)
+    progress = db.Column(db.Text)          # dernier état JSON (vidage de bucket)
+    updated_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    # reprise des jobs actifs (status IN ...) et listes chronologiques
+    __table_args__ = (
+        db.Index("ix_deployment_status", "status"),
+        db.Index("ix_deployment_created_at", "created_at"),
+    )
+
 
 class Log(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -30,8 +53,84 @@ class Log(db.Model):
     level = db.Column(db.String(20), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # enregistrements structurés (logs/handler.py)
+    logger = db.Column(db.String(100))
+    route = db.Column(db.String(200))
+    method = db.Column(db.String(10))
+    status = db.Column(db.Integer)
+    latency_ms = db.Column(db.Float)
+    exception = db.Column(db.Text)
+
+    # pages par niveau ou par route : WHERE level = ? AND id < ? ORDER BY id DESC ; plages de dates sur created_at
+    __table_args__ = (
+        db.Index("ix_log_level_id", "level", "id"),
+        db.Index("ix_log_route_id", "route", "id"),
+        db.Index("ix_log_created_at", "created_at"),
+    )
+
 
 class Recommendation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
+    instance_id = db.Column(db.String(64))
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # dernière reco par instance : WHERE instance_id = ? ORDER BY id DESC LIMIT 1
+    __table_args__ = (
+        db.Index("ix_recommendation_instance_id_id", "instance_id", "id"),
+        db.Index("ix_recommendation_created_at", "created_at"),
+    )
+
+
+class MetricPoint(db.Model):
+    """Point CloudWatch EC2 conservé localement (monitoring/timeseries.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    account = db.Column(db.String(64), nullable=False)
+    region = db.Column(db.String(32), nullable=False)
+    instance_id = db.Column(db.String(64), nullable=False)
+    metric = db.Column(db.String(40), nullable=False)
+    ts = db.Column(db.DateTime, nullable=False)
+    value = db.Column(db.Float, nullable=False)
+
+    # lectures par instance et plage : WHERE instance_id = ? AND region = ? AND account = ? AND ts >= ?
+    __table_args__ = (
+        db.Index("ux_metric_point_series_ts", "instance_id", "region", "account", "metric", "ts", unique=True),
+        db.Index("ix_metric_point_ts", "ts"),
+    )
+
+
+def keyset_page(query, column, limit, cursor=None):
+    """
+    Pagination par clé sur une colonne croissante (id) : WHERE column < :cursor ORDER BY column DESC
+    LIMIT limit + 1 — coût constant quelle que soit la page, contrairement à OFFSET.
+    Renvoie (lignes, next_cursor) ; next_cursor vaut None sur la dernière page.
+    """
+    if cursor is not None:
+        query = query.filter(column < cursor)
+    rows = query.order_by(column.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        return rows[:limit], getattr(rows[limit - 1], column.key)
+    return rows, None
+
+
+def upgrade_schema():
+    """
+    create_all + ajout des colonnes et index manquants sur une base existante
+    (le projet n'utilise pas Alembic ; seules des colonnes nullables sont ajoutées).
+    """
+    db.create_all()
+    inspector = sa.inspect(db.engine)
+    quote = db.engine.dialect.identifier_preparer.quote
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    col_type = column.type.compile(dialect=db.engine.dialect)
+                    conn.execute(sa.text(
+                        f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {col_type}"
+                    ))
+            existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(conn)
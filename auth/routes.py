@@ -1,10 +1,21 @@
+import logging
+
 from flask import Blueprint, request, jsonify
 from extensions import db
+from auth.hashing import HashingBusy
 from auth.models import User
 from flask_jwt_extended import create_access_token
 
+logger = logging.getLogger(__name__)
+
 auth_bp = Blueprint('auth', __name__)
 
+
+def _busy():
+    # pool de hachage saturé : refus immédiat plutôt qu'une file qui s'allonge
+    return jsonify({"message": "Trop de connexions simultanées, réessayez"}), 429, {"Retry-After": "1"}
+
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -17,7 +28,10 @@ def register():
         return jsonify({"message": "Utilisateur déjà existant"}), 400
 
     user = User(username=username, role=role)
-    user.set_password(password)
+    try:
+        user.set_password(password)
+    except HashingBusy:
+        return _busy()
     db.session.add(user)
     db.session.commit()
 
@@ -34,8 +48,22 @@ def login():
     password = data.get('password')
 
     user = User.query.filter_by(username=username).first()
-    if not user or not user.check_password(password):
-        return jsonify({"message": "Identifiants invalides"}), 401
+    try:
+        if not user or not user.check_password(password):
+            return jsonify({"message": "Identifiants invalides"}), 401
+    except HashingBusy:
+        return _busy()
+
+    # coût de hachage modifié depuis la création du hash : on en profite, le mot de passe est connu
+    if user.password_needs_rehash():
+        try:
+            user.set_password(password)
+            db.session.commit()
+        except HashingBusy:
+            pass  # prochaine connexion
+        except Exception:
+            db.session.rollback()
+            logger.exception("Recalcul du hash de %s", user.username)
 
     token = create_access_token(identity={"username": user.username, "role": user.role})
     return jsonify({"token": token})
@@ -0,0 +1,335 @@
+# aws_clients.py
+"""
+Registre partagé des clients boto3.
+
+Un client par (service, région), créé au premier usage et réutilisé par tous les
+blueprints et threads (les clients botocore sont thread-safe, la création via
+boto3.Session ne l'est pas : elle est faite sous verrou). Tous partagent la même
+Config : pool de connexions, retries adaptatifs et timeouts réglables par env.
+
+Chaque appel d'API est mesuré via les événements botocore :
+aws_api_calls_total{service, operation, status} et aws_api_call_seconds{service, operation},
+et ajouté comme span "aws" à la trace de la requête en cours (observability/tracing.py).
+
+Multi-région / multi-compte : une cible (Target) est un couple (compte, région).
+AWS_REGIONS liste les régions interrogeables, AWS_ACCOUNTS les comptes en plus des
+identifiants par défaut ("alias=arn:aws:iam::123456789012:role/Lecture" pour un
+AssumeRole, "alias=profil" pour un profil ~/.aws). fan_out() interroge plusieurs
+cibles en parallèle, chacune bornée par AWS_FANOUT_TIMEOUT secondes, dans un pool
+propre à l'appel ; les clients obtenus pendant un fan-out ont un read timeout et un
+nombre de tentatives courts (AWS_FANOUT_READ_TIMEOUT, AWS_FANOUT_MAX_ATTEMPTS) pour
+qu'une région bloquée ne garde pas ses threads au-delà du délai.
+"""
+import contextvars
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import boto3
+import botocore.session
+from botocore.config import Config
+from botocore.credentials import AssumeRoleCredentialFetcher, DeferredRefreshableCredentials
+from dotenv import load_dotenv
+from prometheus_client import Counter, Histogram
+
+from extensions import metrics
+from observability import tracing
+
+load_dotenv()
+
+AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50"))
+AWS_RETRY_MODE = os.getenv("AWS_RETRY_MODE", "adaptive")
+AWS_MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", "5"))
+AWS_CONNECT_TIMEOUT = float(os.getenv("AWS_CONNECT_TIMEOUT", "5"))
+AWS_READ_TIMEOUT = float(os.getenv("AWS_READ_TIMEOUT", "30"))
+
+AWS_REGIONS = [r.strip() for r in os.getenv("AWS_REGIONS", AWS_REGION).split(",") if r.strip()]
+if AWS_REGION not in AWS_REGIONS:
+    AWS_REGIONS.insert(0, AWS_REGION)
+# threads par appel à fan_out() (pas un pool partagé entre requêtes)
+AWS_FANOUT_WORKERS = int(os.getenv("AWS_FANOUT_WORKERS", "16"))
+AWS_FANOUT_TIMEOUT = float(os.getenv("AWS_FANOUT_TIMEOUT", "10"))
+AWS_FANOUT_READ_TIMEOUT = float(os.getenv("AWS_FANOUT_READ_TIMEOUT", "5"))
+AWS_FANOUT_MAX_ATTEMPTS = int(os.getenv("AWS_FANOUT_MAX_ATTEMPTS", "2"))
+
+# compte des identifiants par défaut (variables d'env, profil par défaut, rôle IAM)
+DEFAULT_ACCOUNT = "default"
+
+
+def _parse_accounts(value):
+    accounts = {}
+    for item in value.split(","):
+        alias, _, source = item.strip().partition("=")
+        if alias and source:
+            accounts[alias.strip()] = source.strip()
+    return accounts
+
+
+# alias -> ARN de rôle ou nom de profil
+AWS_ACCOUNTS = _parse_accounts(os.getenv("AWS_ACCOUNTS", ""))
+
+AWS_API_CALLS = Counter(
+    "aws_api_calls_total",
+    "Appels d'API AWS (après retries) par service, opération et statut HTTP",
+    ["service", "operation", "status"],
+    registry=metrics.registry
+)
+AWS_API_LATENCY = Histogram(
+    "aws_api_call_seconds",
+    "Durée des appels d'API AWS, retries inclus",
+    ["service", "operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    registry=metrics.registry
+)
+FANOUT_TARGETS = Counter(
+    "aws_fanout_targets_total",
+    "Cibles (compte, région) interrogées en parallèle, par résultat (ok, error, timeout, not_started)",
+    ["region", "result"],
+    registry=metrics.registry
+)
+
+_START = "cloudnetops_start"
+
+
+def default_config():
+    return Config(
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        retries={"mode": AWS_RETRY_MODE, "total_max_attempts": AWS_MAX_ATTEMPTS},
+        connect_timeout=AWS_CONNECT_TIMEOUT,
+        read_timeout=AWS_READ_TIMEOUT
+    )
+
+
+def fanout_config():
+    # un appel bloqué occupe son thread au plus ~ AWS_FANOUT_READ_TIMEOUT x AWS_FANOUT_MAX_ATTEMPTS
+    return default_config().merge(Config(
+        retries={"mode": AWS_RETRY_MODE, "total_max_attempts": AWS_FANOUT_MAX_ATTEMPTS},
+        read_timeout=AWS_FANOUT_READ_TIMEOUT
+    ))
+
+
+def _split_event(event_name):
+    # "after-call.ec2.DescribeInstances" -> ("ec2", "DescribeInstances")
+    _, service, operation = event_name.split(".", 2)
+    return service, operation
+
+
+def _before_call(context, **kwargs):
+    context[_START] = time.perf_counter()
+
+
+def _record(event_name, context, status, error=None):
+    service, operation = _split_event(event_name)
+    AWS_API_CALLS.labels(service, operation, status).inc()
+    start = context.get(_START)
+    if start is not None:
+        AWS_API_LATENCY.labels(service, operation).observe(time.perf_counter() - start)
+        # span de la trace de requête ; la latence est déjà dans aws_api_call_seconds
+        tracing.record("aws", f"{service}.{operation}", start, error, observe=False)
+
+
+def _after_call(event_name, http_response, context, **kwargs):
+    status = http_response.status_code
+    _record(event_name, context, str(status), f"HTTP {status}" if status >= 400 else None)
+
+
+def _after_call_error(event_name, context, exception, **kwargs):
+    # erreurs réseau / timeouts (pas de réponse HTTP)
+    _record(event_name, context, type(exception).__name__, type(exception).__name__)
+
+
+def instrument(client):
+    """Branche le comptage et la mesure de latence sur les événements du client."""
+    events = client.meta.events
+    # before-parameter-build plutôt que before-call : un Stubber (tests) répond dans
+    # before-call et court-circuiterait la prise du temps de départ
+    events.register("before-parameter-build", _before_call)
+    events.register("after-call", _after_call)
+    events.register("after-call-error", _after_call_error)
+    return client
+
+
+def _assume_role_session(base, role_arn, alias):
+    """Session dont les identifiants viennent d'un AssumeRole, renouvelés avant expiration."""
+    fetcher = AssumeRoleCredentialFetcher(
+        client_creator=base._session.create_client,
+        source_credentials=base.get_credentials(),
+        role_arn=role_arn,
+        extra_args={"RoleSessionName": f"cloudnetops-{alias}"}
+    )
+    botocore_session = botocore.session.Session()
+    botocore_session._credentials = DeferredRefreshableCredentials(
+        method="assume-role", refresh_using=fetcher.fetch_credentials
+    )
+    return boto3.Session(botocore_session=botocore_session)
+
+
+class ClientRegistry:
+    def __init__(self, region=AWS_REGION, config=None, accounts=None):
+        self.region = region
+        self.config = config or default_config()
+        self.accounts = AWS_ACCOUNTS if accounts is None else accounts
+        self._sessions = {}
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def client(self, service, region=None, account=None):
+        key = (service, region or self.region, account or DEFAULT_ACCOUNT)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = instrument(self._session(key[2]).client(
+                        service, region_name=key[1], config=self.config
+                    ))
+                    self._clients[key] = client
+        return client
+
+    def _session(self, account):
+        # appelé sous self._lock
+        session = self._sessions.get(account)
+        if session is None:
+            if account == DEFAULT_ACCOUNT:
+                session = boto3.Session()
+            elif account not in self.accounts:
+                raise ValueError(f"compte inconnu : {account}")
+            elif self.accounts[account].startswith("arn:"):
+                session = _assume_role_session(self._session(DEFAULT_ACCOUNT), self.accounts[account], account)
+            else:
+                session = boto3.Session(profile_name=self.accounts[account])
+            self._sessions[account] = session
+        return session
+
+    def clear(self):
+        """Oublie les clients (nouveaux identifiants, tests)."""
+        with self._lock:
+            self._clients.clear()
+            self._sessions.clear()
+
+
+registry = ClientRegistry()
+fanout_registry = ClientRegistry(config=fanout_config())
+
+# vrai dans les threads d'un fan_out() (et ceux qu'ils lancent via tracing.propagate)
+_in_fanout = contextvars.ContextVar("aws_in_fanout", default=False)
+
+
+def get_client(service, region=None, account=None):
+    """
+    Client boto3 partagé pour `service` (région AWS_REGION et identifiants par défaut si omis) ;
+    pendant un fan_out(), client aux timeouts et retries courts.
+    """
+    return (fanout_registry if _in_fanout.get() else registry).client(service, region, account)
+
+
+# ------------------------------
+# FAN-OUT MULTI-RÉGION / MULTI-COMPTE
+# ------------------------------
+
+Target = namedtuple("Target", ["account", "region"])
+
+# i- suivi de 8 (ancien format) ou 17 chiffres hexadécimaux
+INSTANCE_ID_RE = re.compile(r"^i-(?:[0-9a-f]{8}|[0-9a-f]{17})$")
+
+DEFAULT_TARGET = Target(DEFAULT_ACCOUNT, AWS_REGION)
+
+
+def _names(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [v.strip() for v in value if isinstance(v, str) and v.strip()]
+
+
+def resolve_regions(regions):
+    """Régions demandées ("a,b", liste ou "all"), validées contre AWS_REGIONS ; AWS_REGION si vide."""
+    names = _names(regions)
+    if names == ["all"]:
+        return list(AWS_REGIONS)
+    unknown = [r for r in names if r not in AWS_REGIONS]
+    if unknown:
+        raise ValueError(f"région inconnue : {', '.join(unknown)}")
+    return list(dict.fromkeys(names)) or [AWS_REGION]
+
+
+def resolve_accounts(accounts):
+    """Comptes demandés (alias AWS_ACCOUNTS, "default" ou "all") ; compte par défaut si vide."""
+    names = _names(accounts)
+    if names == ["all"]:
+        return [DEFAULT_ACCOUNT] + list(AWS_ACCOUNTS)
+    unknown = [a for a in names if a != DEFAULT_ACCOUNT and a not in AWS_ACCOUNTS]
+    if unknown:
+        raise ValueError(f"compte inconnu : {', '.join(unknown)}")
+    return list(dict.fromkeys(names)) or [DEFAULT_ACCOUNT]
+
+
+def resolve_targets(regions=None, accounts=None):
+    """Produit cartésien comptes x régions ; lève ValueError pour un nom inconnu."""
+    return [
+        Target(account, region)
+        for account in resolve_accounts(accounts)
+        for region in resolve_regions(regions)
+    ]
+
+
+def target_tags(target):
+    return {"account": target.account, "region": target.region}
+
+
+def _fanout_call(fn, target):
+    _in_fanout.set(True)
+    return fn(target)
+
+
+def fan_out(fn, targets, timeout=AWS_FANOUT_TIMEOUT):
+    """
+    Appelle fn(target) pour chaque cible en parallèle.
+    Renvoie (résultats [(target, valeur)] dans l'ordre des cibles, erreurs [{account, region, error}]).
+    Une cible qui ne répond pas dans `timeout` secondes est rapportée en erreur sans retarder
+    les autres ; son appel se termine en arrière-plan (borné par AWS_FANOUT_READ_TIMEOUT et
+    AWS_FANOUT_MAX_ATTEMPTS). Au-delà de AWS_FANOUT_WORKERS cibles, les suivantes attendent un
+    thread libre : celles jamais lancées avant le délai sont rapportées à part ("not_started").
+    """
+    if len(targets) == 1:
+        # cas courant (une seule région) : pas de saut de thread
+        target = targets[0]
+        try:
+            value = fn(target)
+        except Exception as e:
+            FANOUT_TARGETS.labels(target.region, "error").inc()
+            return [], [{**target_tags(target), "error": str(e)}]
+        FANOUT_TARGETS.labels(target.region, "ok").inc()
+        return [(target, value)], []
+
+    # pool propre à l'appel : une requête multi-région ne fait pas attendre les autres
+    pool = ThreadPoolExecutor(min(len(targets), AWS_FANOUT_WORKERS), thread_name_prefix="aws-fanout")
+    try:
+        futures = [(target, pool.submit(tracing.propagate(_fanout_call), fn, target)) for target in targets]
+        wait([f for _, f in futures], timeout=timeout)
+    finally:
+        # les cibles encore en file sont annulées ; celles en cours se terminent en
+        # arrière-plan, sans bloquer la réponse
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    results, errors = [], []
+    for target, future in futures:
+        if future.cancelled():
+            # jamais lancée faute de thread libre : ce n'est pas la cible qui est lente
+            FANOUT_TARGETS.labels(target.region, "not_started").inc()
+            errors.append({**target_tags(target), "error": f"non lancée ({timeout:g} s, tous les threads occupés)"})
+        elif not future.done():
+            FANOUT_TARGETS.labels(target.region, "timeout").inc()
+            errors.append({**target_tags(target), "error": f"délai dépassé ({timeout:g} s)"})
+        elif future.exception() is not None:
+            FANOUT_TARGETS.labels(target.region, "error").inc()
+            errors.append({**target_tags(target), "error": str(future.exception())})
+        else:
+            FANOUT_TARGETS.labels(target.region, "ok").inc()
+            results.append((target, future.result()))
+    return results, errors
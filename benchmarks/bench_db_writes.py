@@ -0,0 +1,124 @@
+# benchmarks/bench_db_writes.py
+"""
+Débit d'écriture SQLite avec N processus (comme N workers gunicorn) sur la même base :
+réglages SQLite par défaut (journal DELETE, synchronous FULL, timeout 5 s, NullPool)
+contre ceux de extensions.py (WAL, synchronous NORMAL, busy_timeout, pool de connexions).
+
+Chaque worker enchaîne pendant --seconds : un Log, un Deployment créé puis mis à jour,
+un lot de Recommendation (comme le pipeline IA) et une lecture de la dernière recommandation.
+
+    python benchmarks/bench_db_writes.py [--workers 8] [--seconds 10]
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+import traceback
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = {
+    "default": {
+        "SQLITE_JOURNAL_MODE": "DELETE",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_BUSY_TIMEOUT": "5",
+        "DB_POOL_SIZE": "0"
+    },
+    "tuned": {}
+}
+
+
+def worker(uri, seconds, start_at, results):
+    os.environ["SQLALCHEMY_DATABASE_URI"] = uri
+    import logging
+    logging.disable(logging.CRITICAL)
+    from app import create_app
+    from extensions import db
+    from auth.models import Deployment, Log
+    from ai.recommendations import save_recommendations, latest_recommendation
+
+    app = create_app()
+    ops = errors = 0
+    latencies = []
+    locked = 0
+    with app.app_context():
+        while time.time() < start_at:
+            time.sleep(0.01)
+        deadline = start_at + seconds
+        pid = os.getpid()
+        while time.time() < deadline:
+            t0 = time.perf_counter()
+            try:
+                db.session.add(Log(message=f"bench {pid} {ops}", level="INFO"))
+                db.session.commit()
+
+                dep = Deployment(name=f"bench-{pid}-{ops}", status="queued", kind="bench")
+                db.session.add(dep)
+                db.session.commit()
+                dep.status = "running"
+                db.session.commit()
+
+                save_recommendations([
+                    {"instance_id": f"i-{pid}-{k}", "metrics": {}, "recommendation": "ok"} for k in range(10)
+                ])
+                latest_recommendation(f"i-{pid}-0")
+                ops += 1
+                latencies.append(time.perf_counter() - t0)
+            except Exception as e:
+                db.session.rollback()
+                errors += 1
+                if "locked" in str(e):
+                    locked += 1
+                elif errors == 1:
+                    traceback.print_exc()
+    results.put({"ops": ops, "errors": errors, "locked": locked, "latencies": latencies})
+
+
+def run(mode, workers, seconds):
+    for key, value in MODES[mode].items():
+        os.environ[key] = value
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    uri = f"sqlite:///{path}"
+
+    # schéma créé une fois avant de lancer les workers
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    setup = ctx.Process(target=worker, args=(uri, 0, 0, results))
+    setup.start()
+    results.get()
+    setup.join()
+
+    start_at = time.time() + 15  # laisse le temps aux imports de chaque process
+    procs = [ctx.Process(target=worker, args=(uri, seconds, start_at, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    stats = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    for key in MODES[mode]:
+        os.environ.pop(key, None)
+
+    ops = sum(s["ops"] for s in stats)
+    latencies = sorted(l for s in stats for l in s["latencies"])
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0
+    # une itération = 5 transactions d'écriture
+    print(f"[{mode:7}] {workers} workers x {seconds:g} s : {ops / seconds:7.1f} itérations/s "
+          f"({ops * 5 / seconds:7.1f} commits/s)  p50={p(0.5):6.1f} ms  p99={p(0.99):7.1f} ms  "
+          f"erreurs={sum(s['errors'] for s in stats)} (database is locked: {sum(s['locked'] for s in stats)})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--mode", choices=list(MODES), action="append")
+    args = parser.parse_args()
+    for mode in args.mode or list(MODES):
+        run(mode, args.workers, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
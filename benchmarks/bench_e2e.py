@@ -0,0 +1,397 @@
+# benchmarks/bench_e2e.py
+"""
+Benchmark de bout en bout : l'API complète (create_app, via gunicorn ou flask run) face
+à des remplaçants locaux d'AWS (moto en mode serveur, AWS_ENDPOINT_URL) et de
+Kubernetes (benchmarks/fake_k8s.py, KUBECONFIG), avec une flotte synthétique.
+
+Des utilisateurs virtuels rejouent un mélange pondéré de requêtes du tableau de bord
+(--mix, voir MIXES) ; débit et p50/p95/p99 sont mesurés par route après --warmup
+secondes, affichés puis enregistrés en JSON (commit, paramètres, résultats).
+--compare compare à un résultat précédent et sort en erreur si le p95 d'une route
+se dégrade de plus de --threshold %.
+
+La latence des routes AWS inclut celle de moto (Python, local) : les chiffres servent
+à comparer deux commits sur la même machine, pas à prédire la latence face à AWS.
+
+    python benchmarks/bench_e2e.py [--instances 500] [--buckets 100] [--pods 500] [--nodes 20]
+        [--users 16] [--seconds 30] [--mix dashboard] [--server gunicorn] [--out FICHIER]
+        [--compare ANCIEN.json] [--threshold 10]
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_serving import free_port, start_server, wait_ready
+from benchmarks.synthetic import make_rows, use_synthetic_bundle
+
+REGION = "us-east-1"
+CREDENTIALS = {"username": "bench@cloudnetops.local", "password": "bench-password"}
+
+# (poids, méthode, chemin, corps) ; {instance_id} et {bucket} tirés dans la flotte
+MIXES = {
+    # pages Dashboard, EC2, S3, Monitoring, IA et Kubernetes ouvertes en même temps
+    "dashboard": [
+        (4, "GET", "/status", None),
+        (2, "GET", "/deploy/summary", None),
+        (4, "GET", "/monitor/ec2/list", None),
+        (2, "GET", "/monitor/s3/list", None),
+        (2, "GET", "/monitor/ec2/{instance_id}?step=300", None),
+        (1, "POST", "/ai/predict", "predict"),
+        (1, "GET", "/ai/recommendations?instance_id={instance_id}&limit=20", None),
+        (2, "GET", "/k8s/pods", None),
+        (1, "GET", "/k8s/services", None),
+        (2, "GET", "/k8s/metrics", None),
+        (1, "GET", "/k8s/recommendation", None),
+        (0.2, "POST", "/auth/login", "login"),
+    ],
+    "aws": [
+        (4, "GET", "/monitor/ec2/list", None),
+        (2, "GET", "/monitor/s3/list", None),
+        (2, "GET", "/deploy/summary", None),
+        (2, "GET", "/monitor/ec2/{instance_id}?step=300", None),
+    ],
+    "k8s": [
+        (2, "GET", "/k8s/pods", None),
+        (1, "GET", "/k8s/services", None),
+        (2, "GET", "/k8s/metrics", None),
+        (1, "GET", "/k8s/recommendation", None),
+    ],
+    "ai": [
+        (3, "POST", "/ai/predict", "predict"),
+        (1, "GET", "/ai/recommendations?instance_id={instance_id}&limit=20", None),
+        (1, "GET", "/status", None),
+    ],
+}
+
+
+# ------------------------------
+# REMPLAÇANTS AWS / KUBERNETES
+# ------------------------------
+
+def wait_port(port, proc, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"process arrêté (code {proc.returncode})")
+        try:
+            socket.create_connection(("127.0.0.1", port), 1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"port {port} fermé après {timeout} s")
+
+
+def spawn(cmd, env=None):
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            start_new_session=True)
+
+
+def seed_aws(endpoint, instances, buckets):
+    """Flotte EC2 (running, tags Name/env) et buckets S3 dans moto ; renvoie (ids, noms)."""
+    import boto3
+
+    kwargs = {"endpoint_url": endpoint, "region_name": REGION,
+              "aws_access_key_id": "testing", "aws_secret_access_key": "testing"}
+    ec2 = boto3.client("ec2", **kwargs)
+    image_id = ec2.describe_images(Owners=["amazon"])["Images"][0]["ImageId"]
+    ids = []
+    while len(ids) < instances:
+        n = min(100, instances - len(ids))
+        resp = ec2.run_instances(
+            ImageId=image_id, InstanceType=random.choice(["t3.micro", "t3.medium", "m5.large"]),
+            MinCount=n, MaxCount=n,
+            TagSpecifications=[{"ResourceType": "instance", "Tags": [
+                {"Key": "Name", "Value": f"bench-{len(ids) // 100}"},
+                {"Key": "env", "Value": random.choice(["prod", "staging", "dev"])},
+            ]}]
+        )
+        ids += [i["InstanceId"] for i in resp["Instances"]]
+
+    s3 = boto3.client("s3", **kwargs)
+    names = [f"bench-bucket-{i:05d}" for i in range(buckets)]
+    for name in names:
+        s3.create_bucket(Bucket=name)
+    return ids, names
+
+
+# ------------------------------
+# CHARGE
+# ------------------------------
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}   # route -> [latences (s)]
+        self.errors = {}    # route -> {statut: nombre}
+        self._lock = threading.Lock()
+
+    def add(self, route, status, seconds):
+        with self._lock:
+            if status == 200 or status == 201:
+                self.samples.setdefault(route, []).append(seconds)
+            else:
+                errors = self.errors.setdefault(route, {})
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+
+def user_loop(port, mix, fleet, token, start_at, deadline, think, recorder, seed):
+    rnd = random.Random(seed)
+    weights = [w for w, *_ in mix]
+    rows = make_rows(50, seed=seed)
+    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {token}"}
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    while time.time() < deadline:
+        _, method, path, body = rnd.choices(mix, weights)[0]
+        route = f"{method} {path.split('?')[0]}"
+        url = path.format(instance_id=rnd.choice(fleet["instances"]) if fleet["instances"] else "i-0",
+                          bucket=rnd.choice(fleet["buckets"]) if fleet["buckets"] else "none")
+        if body == "predict":
+            payload = json.dumps({"instance_id": rnd.choice(fleet["instances"] or ["i-0"]),
+                                  "metrics": rnd.choice(rows)})
+        elif body == "login":
+            payload = json.dumps(CREDENTIALS)
+        else:
+            payload = None
+        t0 = time.perf_counter()
+        try:
+            conn.request(method, url, payload, headers)
+            resp = conn.getresponse()
+            resp.read()
+            status = resp.status
+        except (OSError, http.client.HTTPException) as e:
+            status = type(e).__name__
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        elapsed = time.perf_counter() - t0
+        if time.time() >= start_at:
+            recorder.add(route, status, elapsed)
+        if think:
+            time.sleep(rnd.expovariate(1 / think))
+    conn.close()
+
+
+def summarize(recorder, seconds):
+    def pct(values, q):
+        return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2) if values else None
+
+    routes = {}
+    for route in sorted(set(recorder.samples) | set(recorder.errors)):
+        values = sorted(recorder.samples.get(route, []))
+        errors = recorder.errors.get(route, {})
+        routes[route] = {
+            "count": len(values),
+            "errors": errors,
+            "rps": round(len(values) / seconds, 2),
+            "p50_ms": pct(values, 0.50),
+            "p95_ms": pct(values, 0.95),
+            "p99_ms": pct(values, 0.99),
+            "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else None,
+            "max_ms": round(values[-1] * 1000, 2) if values else None,
+        }
+    all_values = sorted(v for values in recorder.samples.values() for v in values)
+    total = {
+        "count": len(all_values),
+        "errors": sum(sum(e.values()) for e in recorder.errors.values()),
+        "rps": round(len(all_values) / seconds, 2),
+        "p50_ms": pct(all_values, 0.50),
+        "p95_ms": pct(all_values, 0.95),
+        "p99_ms": pct(all_values, 0.99),
+    }
+    return routes, total
+
+
+def print_table(routes, total):
+    print(f"{'route':42} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}  erreurs")
+    for route, r in list(routes.items()) + [("TOTAL", total)]:
+        errors = r["errors"] if isinstance(r["errors"], int) else sum(r["errors"].values())
+        fmt = lambda v: f"{v:8.1f}" if v is not None else f"{'-':>8}"
+        print(f"{route:42} {r['rps']:8.1f} {fmt(r['p50_ms'])} {fmt(r['p95_ms'])} {fmt(r['p99_ms'])}  {errors}")
+
+
+def compare(current, baseline_path, threshold):
+    """Écarts par route contre un résultat précédent ; renvoie les routes dont le p95 régresse."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\ncomparaison avec {baseline_path} (commit {baseline['meta'].get('commit')})")
+    print(f"{'route':42} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    regressions = []
+    for route, r in current["routes"].items():
+        old = baseline["routes"].get(route)
+        if not old:
+            continue
+
+        def delta(key):
+            if not old.get(key) or r.get(key) is None:
+                return None
+            return (r[key] - old[key]) / old[key] * 100
+
+        fmt = lambda d: f"{d:+8.1f}%" if d is not None else f"{'-':>9}"
+        p95 = delta("p95_ms")
+        flag = ""
+        if p95 is not None and p95 > threshold:
+            regressions.append(route)
+            flag = "  RÉGRESSION"
+        print(f"{route:42} {fmt(delta('rps'))} {fmt(delta('p50_ms'))} {fmt(p95)} {fmt(delta('p99_ms'))}{flag}")
+    return regressions
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ------------------------------
+# ORCHESTRATION
+# ------------------------------
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="cloudnetops-e2e-")
+    procs = []
+    try:
+        moto_port = free_port()
+        procs.append(spawn([sys.executable, "-m", "moto.server", "-H", "127.0.0.1", "-p", str(moto_port)]))
+        wait_port(moto_port, procs[-1])
+        endpoint = f"http://127.0.0.1:{moto_port}"
+        t0 = time.time()
+        instances, buckets = seed_aws(endpoint, args.instances, args.buckets)
+        print(f"moto : {len(instances)} instances, {len(buckets)} buckets ({time.time() - t0:.1f} s)")
+
+        k8s_port = free_port()
+        kubeconfig = os.path.join(workdir, "kubeconfig")
+        procs.append(spawn([sys.executable, os.path.join(ROOT, "benchmarks", "fake_k8s.py"),
+                            "--port", str(k8s_port), "--pods", str(args.pods), "--nodes", str(args.nodes),
+                            "--services", str(args.services), "--kubeconfig", kubeconfig]))
+        wait_port(k8s_port, procs[-1])
+
+        env = dict(os.environ)
+        env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+        env.update({
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+            "AWS_ENDPOINT_URL": endpoint,
+            "AWS_ACCESS_KEY_ID": "testing",
+            "AWS_SECRET_ACCESS_KEY": "testing",
+            "AWS_DEFAULT_REGION": REGION,
+            "AWS_REGION": REGION,
+            "KUBECONFIG": kubeconfig,
+            "MODEL_BUNDLE_PATH": use_synthetic_bundle(),
+            "LOG_LEVEL": "WARNING",
+            "PYTHONPATH": ROOT,
+        })
+        env.update(dict(kv.split("=", 1) for kv in args.env))
+        port = free_port()
+        server = start_server(args.server, port, env, args)
+        procs.append(server)
+        wait_ready(port, server)
+
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        conn.request("POST", "/auth/register", json.dumps(CREDENTIALS), {"Content-Type": "application/json"})
+        token = json.loads(conn.getresponse().read())["token"]
+        conn.close()
+
+        fleet = {"instances": instances, "buckets": buckets}
+        recorder = Recorder()
+        start_at = time.time() + args.warmup
+        deadline = start_at + args.seconds
+        threads = [
+            threading.Thread(target=user_loop, args=(port, MIXES[args.mix], fleet, token, start_at, deadline,
+                                                     args.think, recorder, args.seed + i))
+            for i in range(args.users)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        for proc in reversed(procs):
+            try:
+                os.killpg(proc.pid, signal.SIGTERM)
+                proc.wait(30)
+            except (ProcessLookupError, subprocess.TimeoutExpired):
+                os.killpg(proc.pid, signal.SIGKILL)
+
+    routes, total = summarize(recorder, args.seconds)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "server": args.server if args.server == "flask" else f"gunicorn {args.workers}x{args.threads}",
+            "mix": args.mix,
+            "users": args.users,
+            "think_s": args.think,
+            "seconds": args.seconds,
+            "warmup_s": args.warmup,
+            "fleet": {"instances": args.instances, "buckets": args.buckets, "pods": args.pods,
+                      "nodes": args.nodes, "services": args.services},
+            "env": args.env,
+        },
+        "routes": routes,
+        "total": total,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--instances", type=int, default=500)
+    parser.add_argument("--buckets", type=int, default=100)
+    parser.add_argument("--pods", type=int, default=500)
+    parser.add_argument("--nodes", type=int, default=20)
+    parser.add_argument("--services", type=int, default=50)
+    parser.add_argument("--mix", choices=list(MIXES), default="dashboard")
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--think", type=float, default=0, help="pause moyenne (s) entre deux requêtes d'un utilisateur")
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--server", choices=["gunicorn", "flask"], default="gunicorn")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--env", action="append", default=[], metavar="CLÉ=VALEUR",
+                        help="variable d'environnement du serveur (répétable)")
+    parser.add_argument("--out", help="fichier JSON (défaut : benchmarks/results/e2e-<commit>-<date>.json)")
+    parser.add_argument("--compare", metavar="ANCIEN.json")
+    parser.add_argument("--threshold", type=float, default=10, help="régression tolérée sur le p95 (%%)")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    result = run(args)
+    print_table(result["routes"], result["total"])
+
+    out = args.out or os.path.join(
+        ROOT, "benchmarks", "results",
+        f"e2e-{result['meta']['commit'] or 'nocommit'}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nrésultats : {out}")
+
+    if args.compare:
+        regressions = compare(result, args.compare, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} route(s) au-delà de +{args.threshold:g} % sur le p95")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
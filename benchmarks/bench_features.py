@@ -0,0 +1,82 @@
+# benchmarks/bench_features.py
+"""
+Latence de préparation d'une ligne : FeatureEncoder compilé vs implémentation historique
+(pd.to_datetime + chaîne de if + try/except à chaque appel).
+
+    python benchmarks/bench_features.py [--rows 20000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_rows, use_synthetic_bundle
+
+
+def legacy_encode(data, features, job_type_map, scheduler_map):
+    """Copie de l'ancien _prepare_input (sans le scaler)."""
+    row = []
+    for f in features:
+        v = data.get(f, 0)
+        if f == "timestamp":
+            try:
+                v = pd.to_datetime(v).timestamp()
+            except Exception:
+                try:
+                    v = float(v)
+                except Exception:
+                    v = 0.0
+        if f == "job_type":
+            v = job_type_map.get(v, 0)
+        if f == "scheduler":
+            v = scheduler_map.get(v, 0)
+        try:
+            row.append(float(v))
+        except Exception:
+            row.append(0.0)
+    return np.array([row])
+
+
+def _per_call_us(fn, rows):
+    t0 = time.perf_counter()
+    for r in rows:
+        fn(r)
+    return (time.perf_counter() - t0) / len(rows) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    use_synthetic_bundle()
+    from ai import model_utils
+
+    rows = make_rows(args.rows)
+    state = model_utils.get_model_state()
+    encoder = state.encoder
+    features = state.features
+    maps = (model_utils.JOB_TYPE_MAP, model_utils.SCHEDULER_MAP)
+
+    # mêmes valeurs que l'ancienne implémentation sur des timestamps ISO-8601
+    for r in rows[:1000]:
+        assert np.allclose(encoder.encode_one(r), legacy_encode(r, features, *maps))
+
+    legacy = _per_call_us(lambda r: legacy_encode(r, features, *maps), rows)
+    fast = _per_call_us(encoder.encode_one, rows)
+    t0 = time.perf_counter()
+    encoder.encode_many(rows)
+    many = (time.perf_counter() - t0) / len(rows) * 1e6
+
+    print(f"legacy _prepare_input      : {legacy:8.2f} µs/row")
+    print(f"FeatureEncoder.encode_one : {fast:8.2f} µs/row  ({legacy / fast:.1f}x)")
+    print(f"FeatureEncoder.encode_many: {many:8.2f} µs/row  ({legacy / many:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/bench_k8s_metrics.py
+"""
+Temps de calcul de /k8s/metrics (build_cluster_metrics + sérialisation JSON)
+sur un cluster synthétique. Objectif : < 50 ms pour 1 000 nœuds.
+
+    python benchmarks/bench_k8s_metrics.py [--nodes 1000] [--pods 30000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kubernetes import client
+
+
+def make_nodes(n, seed=0):
+    rnd = random.Random(seed)
+    nodes, usage = [], {}
+    for i in range(n):
+        name = f"node-{i}"
+        cores = rnd.choice([2, 4, 8, 16])
+        memory_gi = cores * 4
+        nodes.append(client.V1Node(
+            metadata=client.V1ObjectMeta(name=name),
+            status=client.V1NodeStatus(allocatable={
+                "cpu": f"{cores * 1000 - 100}m", "memory": f"{memory_gi * 1024 ** 2 - 500000}Ki", "pods": "110"
+            })
+        ))
+        if rnd.random() > 0.01:  # ~1 % de nœuds sans metrics-server
+            usage[name] = {
+                "cpu": f"{rnd.randint(1, cores * 10 ** 9)}n",
+                "memory": f"{rnd.randint(1, memory_gi * 1024)}Mi"
+            }
+    return nodes, usage
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=1000)
+    parser.add_argument("--pods", type=int, default=30000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    from k8s.k8s_routes import build_cluster_metrics
+
+    nodes, usage = make_nodes(args.nodes)
+    phases = {"Running": int(args.pods * 0.97), "Pending": int(args.pods * 0.02), "Failed": int(args.pods * 0.01)}
+    node_pods = {f"node-{i}": args.pods // args.nodes for i in range(args.nodes)}
+
+    timings = []
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        payload = build_cluster_metrics(nodes, usage, args.pods, phases, node_pods)
+        json.dumps(payload)
+        timings.append((time.perf_counter() - t0) * 1000)
+
+    timings.sort()
+    print(f"nodes={args.nodes} cpu={payload['cpuUsage']} memory={payload['memoryUsage']} "
+          f"reporting={payload['nodesReporting']}")
+    print(f"p50={timings[len(timings) // 2]:.2f} ms  max={timings[-1]:.2f} ms  (objectif < 50 ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# benchmarks/bench_login_storm.py
+"""
+Latence des API du tableau de bord (GET /status, GET /ai/last) pendant une rafale de
+connexions (POST /auth/login), servies par gunicorn (gunicorn.conf.py) :
+
+- calme    : pas de connexions, référence ;
+- inline   : hachage dans le thread de la requête (PASSWORD_HASH_WORKERS=0, sans limite) ;
+- pool     : hachage dans le pool de auth/hashing.py (file bornée, 429 au-delà ;
+             les clients respectent Retry-After).
+
+    python benchmarks/bench_login_storm.py [--logins 32] [--dashboard 4] [--seconds 10]
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_serving import free_port, start_server, wait_ready
+
+SCENARIOS = {
+    "calme": None,
+    "inline": {"PASSWORD_HASH_WORKERS": "0", "PASSWORD_HASH_MAX_PENDING": "100000"},
+    "pool": {},
+}
+CREDENTIALS = json.dumps({"username": "storm", "password": "s3cret-storm"})
+
+
+def call(conn, method, path, body=None):
+    conn.request(method, path, body, {"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    resp.read()
+    if resp.status == 429:
+        # client poli : attend Retry-After avant de réessayer
+        time.sleep(float(resp.getheader("Retry-After", "1")))
+    return resp.status
+
+
+def loop(port, deadline, fn, out, lock):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    local = []
+    while time.time() < deadline:
+        t0 = time.perf_counter()
+        try:
+            status = fn(conn)
+        except (OSError, http.client.HTTPException):
+            status = "erreur"
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        local.append((status, time.perf_counter() - t0))
+    conn.close()
+    with lock:
+        out.extend(local)
+
+
+def dashboard(conn):
+    a = call(conn, "GET", "/status")
+    b = call(conn, "GET", "/ai/last")
+    return a if a != 200 else b
+
+
+def login(conn):
+    return call(conn, "POST", "/auth/login", CREDENTIALS)
+
+
+def pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] * 1000 if values else 0
+
+
+def run(name, args):
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}",
+        "LOG_REQUESTS": "0",
+        "LOG_LEVEL": "WARNING",
+        "K8S_INFORMERS": "0",
+        "PYTHONPATH": ROOT,
+    })
+    env.update(SCENARIOS[name] or {})
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    proc = start_server("gunicorn", port, env, args)
+    try:
+        wait_ready(port, proc)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        call(conn, "POST", "/auth/register", CREDENTIALS)
+        conn.close()
+
+        deadline = time.time() + args.seconds
+        lock = threading.Lock()
+        dash, logins = [], []
+        threads = [threading.Thread(target=loop, args=(port, deadline, dashboard, dash, lock))
+                   for _ in range(args.dashboard)]
+        if SCENARIOS[name] is not None:
+            threads += [threading.Thread(target=loop, args=(port, deadline, login, logins, lock))
+                        for _ in range(args.logins)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(30)
+
+    ok = [d for s, d in dash if s == 200]
+    line = (f"[{name:6}] tableau de bord : {len(ok) / args.seconds:6.1f} it/s  "
+            f"p50={pct(ok, 0.5):7.1f} ms  p99={pct(ok, 0.99):7.1f} ms")
+    if logins:
+        statuses = Counter(s for s, _ in logins)
+        accepted = [d for s, d in logins if s == 200]
+        line += (f"  | login : {statuses[200] / args.seconds:5.1f}/s  p50={pct(accepted, 0.5):7.1f} ms  "
+                 f"429={statuses[429]}  autres={sum(v for k, v in statuses.items() if k not in (200, 429))}")
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--dashboard", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--scenario", choices=list(SCENARIOS), action="append")
+    args = parser.parse_args()
+    print(f"{os.cpu_count()} cœur(s), gunicorn {args.workers}x{args.threads}")
+    for name in args.scenario or list(SCENARIOS):
+        run(name, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# benchmarks/bench_predict.py
+"""
+Débit de predict_from_dict (ligne par ligne) vs predict_batch (une matrice).
+
+    python benchmarks/bench_predict.py [--sizes 1 100 10000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_rows, use_synthetic_bundle
+
+
+def _best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("bundle:", use_synthetic_bundle())
+    from ai import model_utils
+
+    print(f"{'rows':>8} {'per-row rows/s':>16} {'batch rows/s':>14} {'speedup':>8}")
+    for n in args.sizes:
+        rows = make_rows(n)
+        # per-row sur 10k lignes est lent : une seule passe suffit
+        per_row = _best_of(lambda: [model_utils.predict_from_dict(r) for r in rows],
+                           1 if n > 1000 else args.repeat)
+        batch = _best_of(lambda: model_utils.predict_batch(rows), args.repeat)
+        print(f"{n:>8} {n / per_row:>16.0f} {n / batch:>14.0f} {per_row / batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
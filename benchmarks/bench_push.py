@@ -0,0 +1,102 @@
+# benchmarks/bench_push.py
+"""
+Charge du canal push (/events) : nombre d'appels aux producteurs (describe_instances,
+list_buckets...) quand le nombre d'abonnés passe de 1 à 500. Avec le polling, chaque
+onglet faisait ses propres appels ; avec le hub, un instantané par topic et par intervalle.
+Un abonné qui ne lit jamais sa file vérifie que la contre-pression ne bloque personne.
+
+    python benchmarks/bench_push.py [--subscribers 1,10,100,500] [--seconds 3] [--interval 0.1]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeInventory:
+    """Producteur ec2 simulé : 500 instances dont quelques-unes changent d'état à chaque appel."""
+
+    def __init__(self, size=500, seed=0):
+        self.rnd = random.Random(seed)
+        self.instances = {
+            f"i-{i:017x}": {"instanceId": f"i-{i:017x}", "state": "running", "name": f"web-{i}"}
+            for i in range(size)
+        }
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            for key in self.rnd.sample(list(self.instances), min(3, len(self.instances))):
+                inst = dict(self.instances[key])
+                inst["state"] = "stopped" if inst["state"] == "running" else "running"
+                self.instances[key] = inst
+            return {"instances": dict(self.instances)}
+
+
+def run(n_subscribers, seconds, interval):
+    from push.hub import PushHub
+
+    hub = PushHub(interval=interval, queue_size=8)
+    ec2, ai = FakeInventory(), FakeInventory(size=1)
+    hub.register("ec2", ec2)
+    hub.register("ai", ai)
+
+    received = [0] * n_subscribers
+    stop = threading.Event()
+    subscribers = [hub.subscribe(["ec2", "ai"]) for _ in range(n_subscribers)]
+    slow = hub.subscribe(["ec2", "ai"])  # ne lit jamais : resynchronisé à chaque débordement
+
+    def consume(i, subscriber):
+        while not stop.is_set():
+            message = subscriber.get(timeout=0.05)
+            if message is not None:
+                json.loads(message.split("data: ", 1)[1])  # coût de décodage côté client
+                received[i] += 1
+
+    threads = [
+        threading.Thread(target=consume, args=(i, s), daemon=True) for i, s in enumerate(subscribers)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    for s in subscribers + [slow]:
+        hub.unsubscribe(s)
+
+    ticks = seconds / interval
+    return {
+        "subscribers": n_subscribers,
+        "producer_calls": {"ec2": ec2.calls, "ai": ai.calls},
+        "producer_calls_per_tick": round((ec2.calls + ai.calls) / ticks, 2),
+        "polling_calls_per_tick": 2 * (n_subscribers + 1),
+        "messages_per_subscriber": round(sum(received) / n_subscribers, 1),
+        "slow_subscriber_queue": slow.queue.qsize(),
+        "slow_subscriber_resyncs": slow.resyncs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", default="1,10,100,500")
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--interval", type=float, default=0.1)
+    args = parser.parse_args()
+
+    results = [run(int(n), args.seconds, args.interval) for n in args.subscribers.split(",")]
+    for r in results:
+        print(f"subscribers={r['subscribers']:>4}  producer calls/tick={r['producer_calls_per_tick']:<5} "
+              f"(polling: {r['polling_calls_per_tick']:>4})  messages/subscriber={r['messages_per_subscriber']:<6} "
+              f"slow client queue={r['slow_subscriber_queue']} resyncs={r['slow_subscriber_resyncs']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# benchmarks/bench_push_http.py
+"""
+Canal push (/events) servi par gunicorn (gunicorn.conf.py), en HTTP réel : --streams
+clients SSE sur le topic k8s (faux serveur d'API Kubernetes, benchmarks/fake_k8s.py)
+pendant que --rest clients interrogent GET /status.
+
+- avant : producteurs dans chaque worker, flux SSE sans limite (PUSH_SHARED_DIR vide,
+  PUSH_MAX_STREAMS=0) ;
+- apres : producteurs dans le seul leader, PUSH_MAX_STREAMS flux par worker, les
+  clients refusés (503) passent en polling sur /events/snapshot.
+
+Mesures : appels reçus par l'API Kubernetes par seconde, latence de /status, flux
+acceptés / refusés, messages reçus.
+
+    python benchmarks/bench_push_http.py [--streams 1,20,60] [--rest 4] [--seconds 10]
+"""
+import argparse
+import http.client
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_serving import free_port, start_server, wait_ready
+from benchmarks.fake_k8s import FakeKubeServer, build_cluster, write_kubeconfig
+
+SCENARIOS = {
+    "avant": {"PUSH_SHARED_DIR": "", "PUSH_MAX_STREAMS": "0"},
+    "apres": {},
+}
+
+
+def pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] * 1000 if values else 0
+
+
+def stream_client(port, deadline, stats, lock, poll_interval):
+    """Client SSE ; sur 503, polling de /events/snapshot comme frontend/src/api/events.js."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=max(1, deadline - time.time()))
+    try:
+        conn.request("GET", "/events?topics=k8s")
+        resp = conn.getresponse()
+    except OSError:
+        # aucun thread libre pour servir le flux avant la fin de la mesure
+        with lock:
+            stats["starved"] += 1
+        conn.close()
+        return
+    if resp.status == 503:
+        resp.read()
+        with lock:
+            stats["refused"] += 1
+        while time.time() < deadline:
+            conn.request("GET", "/events/snapshot?topics=k8s")
+            r = conn.getresponse()
+            r.read()
+            with lock:
+                stats["polls"] += 1
+            time.sleep(poll_interval)
+        conn.close()
+        return
+    with lock:
+        stats["accepted"] += 1
+    # le premier instantané peut arriver après un intervalle ; un timeout casse la lecture
+    conn.sock.settimeout(max(0.1, deadline - time.time()))
+    while time.time() < deadline:
+        try:
+            line = resp.fp.readline()
+        except OSError:
+            break
+        if not line:
+            break
+        if line.startswith(b"event:"):
+            with lock:
+                stats["messages"] += 1
+    conn.close()
+
+
+def rest_client(port, deadline, latencies, stats, lock):
+    local, timeouts = [], 0
+    while time.time() < deadline:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=max(1, deadline - time.time()))
+        t0 = time.perf_counter()
+        try:
+            conn.request("GET", "/status")
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status == 200:
+                local.append(time.perf_counter() - t0)
+        except OSError:
+            timeouts += 1
+        finally:
+            conn.close()
+        time.sleep(0.05)
+    with lock:
+        latencies.extend(local)
+        stats["rest_timeouts"] += timeouts
+
+
+def run(name, n_streams, args, kube_port, kube):
+    tmp = tempfile.mkdtemp()
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+        "KUBECONFIG": write_kubeconfig(os.path.join(tmp, "kubeconfig"), kube_port),
+        "K8S_INFORMERS": "0",
+        "PUSH_INTERVAL": str(args.interval),
+        "AI_PIPELINE_INTERVAL": "0",
+        "LOG_REQUESTS": "0",
+        "LOG_LEVEL": "WARNING",
+        "PYTHONPATH": ROOT,
+    })
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    env.pop("PUSH_SHARED_DIR", None)
+    env.pop("PUSH_MAX_STREAMS", None)
+    env.update(SCENARIOS[name])
+    proc = start_server("gunicorn", port, env, args)
+    try:
+        wait_ready(port, proc)
+        deadline = time.time() + args.seconds
+        lock = threading.Lock()
+        stats = {"accepted": 0, "refused": 0, "starved": 0, "messages": 0, "polls": 0, "rest_timeouts": 0}
+        latencies = []
+        threads = [threading.Thread(target=stream_client, args=(port, deadline, stats, lock, args.interval))
+                   for _ in range(n_streams)]
+        threads += [threading.Thread(target=rest_client, args=(port, deadline, latencies, stats, lock))
+                    for _ in range(args.rest)]
+        before = kube.requests
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        kube_calls = kube.requests - before
+    finally:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(30)
+
+    print(f"[{name:5}] flux={n_streams:>3}  acceptés={stats['accepted']:>3} refusés={stats['refused']:>3} "
+          f"sans thread={stats['starved']:>3}  appels API k8s={kube_calls / args.seconds:6.1f}/s  "
+          f"/status p50={pct(latencies, 0.5):7.1f} ms p99={pct(latencies, 0.99):7.1f} ms "
+          f"({len(latencies)} ok, {stats['rest_timeouts']} sans réponse)  "
+          f"messages={stats['messages']} polls={stats['polls']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", default="1,20,60")
+    parser.add_argument("--rest", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--interval", type=float, default=1)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--scenario", choices=list(SCENARIOS), action="append")
+    args = parser.parse_args()
+
+    kube_port = free_port()
+    kube = FakeKubeServer(("127.0.0.1", kube_port), build_cluster(300, 10, 30))
+    threading.Thread(target=kube.serve_forever, daemon=True).start()
+    print(f"{os.cpu_count()} cœur(s), gunicorn {args.workers}x{args.threads}, PUSH_INTERVAL={args.interval}s")
+    try:
+        for name in args.scenario or list(SCENARIOS):
+            for n in args.streams.split(","):
+                run(name, int(n), args, kube_port, kube)
+    finally:
+        kube.stopping.set()
+        kube.shutdown()
+
+
+if __name__ == "__main__":
+    main()
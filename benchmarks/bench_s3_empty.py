@@ -0,0 +1,129 @@
+# benchmarks/bench_s3_empty.py
+"""
+Vidage d'un bucket : ancien chemin (bucket.objects.all().delete(), série, sans versions)
+contre BucketEmptier (listing par préfixe + DeleteObjects parallèles), sur un S3 local.
+
+Par défaut un serveur moto est démarré dans le process (pip install "moto[server]") ;
+--endpoint permet de viser un MinIO :
+
+    python benchmarks/bench_s3_empty.py [--objects 20000] [--prefixes 20] [--workers 16]
+    python benchmarks/bench_s3_empty.py --endpoint http://localhost:9000
+
+moto traite les requêtes dans un seul process (GIL) : sans latence réseau le parallélisme
+n'y gagne rien. --latency-ms ajoute un délai par requête pour approcher un vrai S3.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boto3
+from botocore.config import Config
+
+
+def make_session(endpoint):
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    return boto3.Session(region_name="us-east-1"), endpoint
+
+
+def add_latency(client, latency_ms):
+    if latency_ms > 0:
+        client.meta.events.register("before-send.s3.*", lambda **_: time.sleep(latency_ms / 1000))
+    return client
+
+
+def seed(client, bucket, objects, prefixes, versioned, uploads):
+    client.create_bucket(Bucket=bucket)
+    if versioned:
+        client.put_bucket_versioning(Bucket=bucket, VersioningConfiguration={"Status": "Enabled"})
+    keys = [f"p{i % prefixes:03d}/obj-{i:07d}" for i in range(objects)]
+
+    def put(key):
+        client.put_object(Bucket=bucket, Key=key, Body=b"x")
+        if versioned:
+            client.put_object(Bucket=bucket, Key=key, Body=b"y")  # 2e version
+    with ThreadPoolExecutor(32) as pool:
+        list(pool.map(put, keys))
+    if versioned:
+        # delete markers sur 10 % des clés
+        with ThreadPoolExecutor(32) as pool:
+            list(pool.map(lambda k: client.delete_object(Bucket=bucket, Key=k), keys[::10]))
+    for i in range(uploads):
+        client.create_multipart_upload(Bucket=bucket, Key=f"uploads/part-{i}")
+
+
+def remaining(client, bucket):
+    resp = client.list_object_versions(Bucket=bucket, MaxKeys=1000)
+    uploads = client.list_multipart_uploads(Bucket=bucket).get("Uploads", [])
+    return len(resp.get("Versions", [])) + len(resp.get("DeleteMarkers", [])), len(uploads)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--objects", type=int, default=20000)
+    parser.add_argument("--prefixes", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--list-workers", type=int, default=4)
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0, help="délai ajouté à chaque requête S3 mesurée")
+    parser.add_argument("--endpoint", help="S3 compatible (MinIO) ; sinon serveur moto local")
+    args = parser.parse_args()
+
+    server = None
+    endpoint = args.endpoint
+    if not endpoint:
+        try:
+            from moto.server import ThreadedMotoServer
+        except ImportError:
+            sys.exit('moto absent : pip install "moto[server]" ou utiliser --endpoint')
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        server = ThreadedMotoServer(port=0, verbose=False)
+        server.start()
+        host, port = server.get_host_and_port()
+        endpoint = f"http://{host}:{port}"
+
+    session, endpoint = make_session(endpoint)
+    config = Config(max_pool_connections=args.workers + args.list_workers + 32)
+    client = session.client("s3", endpoint_url=endpoint, config=config)
+    timed = add_latency(session.client("s3", endpoint_url=endpoint, config=config), args.latency_ms)
+
+    from deploy.s3_emptier import BucketEmptier
+
+    try:
+        for versioned in (False, True):
+            label = "versioned" if versioned else "unversioned"
+
+            bucket = f"bench-{uuid.uuid4().hex[:8]}"
+            seed(client, bucket, args.objects, args.prefixes, versioned, args.uploads)
+            t0 = time.perf_counter()
+            legacy_bucket = session.resource("s3", endpoint_url=endpoint, config=config).Bucket(bucket)
+            add_latency(legacy_bucket.meta.client, args.latency_ms)
+            legacy_bucket.objects.all().delete()
+            legacy = time.perf_counter() - t0
+            left, uploads = remaining(client, bucket)
+            print(f"[{label}] legacy objects.all().delete(): {legacy:.2f} s  "
+                  f"reste {left}{'+' if left == 1000 else ''} versions/markers, {uploads} uploads")
+
+            bucket = f"bench-{uuid.uuid4().hex[:8]}"
+            seed(client, bucket, args.objects, args.prefixes, versioned, args.uploads)
+            result = BucketEmptier(timed, bucket, workers=args.workers, list_workers=args.list_workers).run()
+            left, uploads = remaining(client, bucket)
+            print(f"[{label}] BucketEmptier: {result['elapsed_seconds']:.2f} s  "
+                  f"{result['objects_per_second']:.0f} obj/s  deleted={result['deleted']} "
+                  f"versions={result['versions']} markers={result['delete_markers']} "
+                  f"uploads={result['uploads_aborted']} errors={result['errors']}  "
+                  f"reste {left} versions/markers, {uploads} uploads")
+            client.delete_bucket(Bucket=bucket)
+    finally:
+        if server:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
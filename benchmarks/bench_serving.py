@@ -0,0 +1,147 @@
+# benchmarks/bench_serving.py
+"""
+Débit HTTP du serveur de développement (flask run : un process, threads) contre
+gunicorn avec gunicorn.conf.py (preload, N workers gthread), sur la même base SQLite
+temporaire et un bundle synthétique.
+
+Charge : --clients connexions keep-alive en parallèle ; chaque itération fait un
+POST /ai/predict/batch (--rows lignes, cache de prédictions désactivé : CPU) et un
+GET /status (lecture SQL). Sur une machine à un seul cœur, les deux serveurs sont
+bornés par le même CPU : l'écart vient du nombre de cœurs.
+
+    python benchmarks/bench_serving.py [--clients 16] [--seconds 15] [--workers 4] [--threads 8]
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import make_rows, use_synthetic_bundle
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, proc, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"le serveur s'est arrêté (code {proc.returncode})")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("le serveur n'a pas répondu à temps")
+
+
+def start_server(mode, port, env, args):
+    if mode == "flask":
+        cmd = [sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(port), "--no-reload"]
+    else:
+        cmd = [
+            sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app",
+            "--bind", f"127.0.0.1:{port}", "--workers", str(args.workers), "--threads", str(args.threads)
+        ]
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            start_new_session=True)
+
+
+def client(port, body, deadline, stats, lock):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    latencies, errors = [], 0
+    while time.time() < deadline:
+        t0 = time.perf_counter()
+        try:
+            statuses = []
+            for method, path, payload in (("POST", "/ai/predict/batch", body), ("GET", "/status", None)):
+                conn.request(method, path, payload, {"Content-Type": "application/json"})
+                resp = conn.getresponse()
+                resp.read()
+                statuses.append(resp.status)
+            if statuses != [200, 200]:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - t0)
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.close()
+    with lock:
+        stats["latencies"].extend(latencies)
+        stats["errors"] += errors
+
+
+def run(mode, args):
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}",
+        "PREDICTION_CACHE_SIZE": "0",
+        "LOG_REQUESTS": "0",
+        "LOG_LEVEL": "WARNING",
+        "K8S_INFORMERS": "0",
+        "PYTHONPATH": ROOT,
+    })
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    proc = start_server(mode, port, env, args)
+    try:
+        wait_ready(port, proc)
+        body = json.dumps({"items": [
+            {"instance_id": f"i-{i:04d}", "metrics": row} for i, row in enumerate(make_rows(args.rows))
+        ]})
+        stats, lock = {"latencies": [], "errors": 0}, threading.Lock()
+        deadline = time.time() + args.seconds
+        threads = [
+            threading.Thread(target=client, args=(port, body, deadline, stats, lock))
+            for _ in range(args.clients)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(30)
+
+    latencies = sorted(stats["latencies"])
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0
+    label = "flask run" if mode == "flask" else f"gunicorn {args.workers}x{args.threads}"
+    print(f"[{label:15}] {args.clients} clients x {args.seconds:g} s : "
+          f"{len(latencies) / args.seconds:7.1f} itérations/s  p50={p(0.5):7.1f} ms  "
+          f"p99={p(0.99):7.1f} ms  erreurs={stats['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--mode", choices=["flask", "gunicorn"], action="append")
+    args = parser.parse_args()
+    os.environ["MODEL_BUNDLE_PATH"] = use_synthetic_bundle()
+    print(f"{os.cpu_count()} cœur(s)")
+    for mode in args.mode or ["flask", "gunicorn"]:
+        run(mode, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# benchmarks/fake_k8s.py
+"""
+Faux serveur d'API Kubernetes pour les benchmarks : assez de l'API core/v1 et de
+metrics.k8s.io pour k8s/k8s_routes.py et les informers (list + watch), avec un
+cluster synthétique de --pods pods, --nodes nœuds et --services services.
+
+Les listes sont sérialisées une fois au démarrage ; un watch reste ouvert sans
+événement jusqu'à timeoutSeconds (le cluster ne bouge pas), précédé d'un BOOKMARK
+si `bookmark_version` est défini et que le client l'accepte (allowWatchBookmarks).
+
+    python benchmarks/fake_k8s.py --port 8001 [--pods 500] [--nodes 20] [--services 50]
+    python benchmarks/fake_k8s.py --kubeconfig /tmp/kubeconfig --port 8001   # écrit le kubeconfig
+"""
+import argparse
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+NAMESPACES = ["default", "kube-system", "monitoring", "payments", "frontend"]
+PHASES = ["Running"] * 90 + ["Pending"] * 6 + ["Failed"] * 2 + ["Succeeded"] * 2
+CREATED = "2024-01-01T00:00:00Z"
+
+
+def build_cluster(pods, nodes, services, seed=0):
+    """{chemin: corps JSON} des listes servies."""
+    rnd = random.Random(seed)
+    node_names = [f"node-{i:03d}" for i in range(nodes)]
+
+    pod_items, pod_metrics = [], []
+    for i in range(pods):
+        ns, name = rnd.choice(NAMESPACES), f"pod-{i:05d}"
+        containers = [f"c{k}" for k in range(rnd.randint(1, 3))]
+        pod_items.append({
+            "metadata": {"name": name, "namespace": ns, "uid": f"uid-{i}",
+                         "resourceVersion": "1", "creationTimestamp": CREATED},
+            "spec": {"nodeName": rnd.choice(node_names) if node_names else None,
+                     "containers": [{"name": c, "image": "nginx:1.25"} for c in containers]},
+            "status": {
+                "phase": rnd.choice(PHASES),
+                "podIP": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+                "containerStatuses": [
+                    {"name": c, "image": "nginx:1.25", "imageID": "", "ready": True,
+                     "restartCount": rnd.choice([0, 0, 0, 1, 5])}
+                    for c in containers
+                ],
+            },
+        })
+        pod_metrics.append({
+            "metadata": {"name": name, "namespace": ns},
+            "containers": [
+                {"name": c, "usage": {"cpu": f"{rnd.randint(1, 500)}m", "memory": f"{rnd.randint(10, 800)}Mi"}}
+                for c in containers
+            ],
+        })
+
+    node_items = [
+        {"metadata": {"name": n, "uid": f"uid-{n}", "resourceVersion": "1", "creationTimestamp": CREATED},
+         "status": {"allocatable": {"cpu": "8", "memory": "32Gi", "pods": "110"}}}
+        for n in node_names
+    ]
+    node_metrics = [
+        {"metadata": {"name": n}, "usage": {"cpu": f"{rnd.randint(200, 7000)}m", "memory": f"{rnd.randint(2, 30)}Gi"}}
+        for n in node_names
+    ]
+    service_items = [
+        {"metadata": {"name": f"svc-{i:04d}", "namespace": rnd.choice(NAMESPACES), "uid": f"uid-svc-{i}",
+                      "resourceVersion": "1", "creationTimestamp": CREATED},
+         "spec": {"type": rnd.choice(["ClusterIP", "ClusterIP", "NodePort"]),
+                  "clusterIP": f"10.96.{i // 256 % 256}.{i % 256}",
+                  "ports": [{"port": 80, "targetPort": 8080, "protocol": "TCP"}]}}
+        for i in range(services)
+    ]
+
+    def as_list(kind, items, api_version="v1"):
+        return json.dumps({"kind": kind, "apiVersion": api_version,
+                           "metadata": {"resourceVersion": "1"}, "items": items}).encode()
+
+    return {
+        "/api/v1/pods": as_list("PodList", pod_items),
+        "/api/v1/nodes": as_list("NodeList", node_items),
+        "/api/v1/services": as_list("ServiceList", service_items),
+        "/apis/metrics.k8s.io/v1beta1/pods": as_list("PodMetricsList", pod_metrics, "metrics.k8s.io/v1beta1"),
+        "/apis/metrics.k8s.io/v1beta1/nodes": as_list("NodeMetricsList", node_metrics, "metrics.k8s.io/v1beta1"),
+    }
+
+
+class FakeKubeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, bodies):
+        super().__init__(address, _Handler)
+        self.bodies = bodies
+        self.stopping = threading.Event()
+        self.requests = 0
+        self.lists = 0
+        self.watch_versions = []  # resourceVersion de chaque watch reçu
+        self.bookmark_version = None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests += 1
+        url = urlsplit(self.path)
+        body = self.server.bodies.get(url.path)
+        if body is None:
+            payload = json.dumps({"kind": "Status", "status": "Failure", "code": 404}).encode()
+            self._send(404, payload)
+            return
+        query = parse_qs(url.query)
+        if query.get("watch", ["false"])[0] in ("true", "1"):
+            self.server.watch_versions.append(query.get("resourceVersion", [None])[0])
+            bookmarks = query.get("allowWatchBookmarks", ["false"])[0] == "true"
+            self._hold_watch(float(query.get("timeoutSeconds", ["300"])[0]), bookmarks)
+            return
+        self.server.lists += 1
+        self._send(200, body)
+
+    def _send(self, status, payload):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _hold_watch(self, timeout, bookmarks=False):
+        # flux ouvert sans événement ; fin propre (chunk vide) au bout de timeoutSeconds
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        if bookmarks and self.server.bookmark_version:
+            event = json.dumps({"type": "BOOKMARK", "object": {
+                "kind": "Pod", "apiVersion": "v1",
+                "metadata": {"resourceVersion": self.server.bookmark_version}
+            }}).encode() + b"\n"
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(event), event))
+        self.wfile.flush()
+        self.server.stopping.wait(timeout)
+        try:
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            pass
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+def write_kubeconfig(path, port):
+    with open(path, "w") as f:
+        f.write(f"""apiVersion: v1
+kind: Config
+clusters:
+- name: bench
+  cluster:
+    server: http://127.0.0.1:{port}
+users:
+- name: bench
+  user:
+    token: bench
+contexts:
+- name: bench
+  context:
+    cluster: bench
+    user: bench
+current-context: bench
+""")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--pods", type=int, default=500)
+    parser.add_argument("--nodes", type=int, default=20)
+    parser.add_argument("--services", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kubeconfig", help="écrit un kubeconfig pointant sur ce serveur")
+    args = parser.parse_args()
+    if args.kubeconfig:
+        write_kubeconfig(args.kubeconfig, args.port)
+    server = FakeKubeServer(("127.0.0.1", args.port), build_cluster(args.pods, args.nodes, args.services, args.seed))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stopping.set()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/synthetic.py
+"""
+Données et modèle synthétiques pour les benchmarks (aucun accès AWS ni bundle réel requis).
+"""
+import os
+import random
+import tempfile
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+FEATURES = [
+    "CPUUtilization", "NetworkIn", "NetworkOut", "DiskReadOps", "DiskWriteOps",
+    "timestamp", "job_type", "scheduler",
+]
+
+LABELS = {
+    "ec2": ["t2.micro", "t3.medium", "m5.large", "c5.xlarge"],
+    "storage": ["gp2", "gp3", "io1"],
+    "scaling": ["scale_in", "keep", "scale_out"],
+}
+
+
+def make_rows(n, seed=0):
+    """n dicts de métriques au format reçu par /ai/predict."""
+    rnd = random.Random(seed)
+    return [
+        {
+            "CPUUtilization": rnd.uniform(0, 100),
+            "NetworkIn": rnd.uniform(0, 1e8),
+            "NetworkOut": rnd.uniform(0, 1e8),
+            "DiskReadOps": rnd.uniform(0, 1e4),
+            "DiskWriteOps": rnd.uniform(0, 1e4),
+            "timestamp": f"2024-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)}T1{rnd.randint(0, 9)}:00:00Z",
+            "job_type": rnd.choice(["service", "batch", "ai_training"]),
+            "scheduler": rnd.choice(["fifo", "batch", "realtime"]),
+        }
+        for _ in range(n)
+    ]
+
+
+def make_bundle(path, n_train=2000, seed=0):
+    """Entraîne un bundle {scaler, models, encoders, features} compatible avec ai.model_utils."""
+    rng = np.random.default_rng(seed)
+    X = rng.random((n_train, len(FEATURES)))
+    scaler = StandardScaler().fit(X)
+    Xs = scaler.transform(X)
+
+    models, encoders = {}, {}
+    for name, labels in LABELS.items():
+        le = LabelEncoder().fit(labels)
+        y = le.transform(rng.choice(labels, n_train))
+        models[name] = RandomForestClassifier(n_estimators=20, max_depth=6, random_state=seed).fit(Xs, y)
+        encoders[name] = le
+
+    joblib.dump({"scaler": scaler, "models": models, "encoders": encoders, "features": FEATURES}, path)
+    return path
+
+
+def use_synthetic_bundle():
+    """Pointe MODEL_BUNDLE_PATH vers un bundle synthétique si aucun n'est déjà configuré."""
+    if not os.getenv("MODEL_BUNDLE_PATH"):
+        path = os.path.join(tempfile.gettempdir(), "cloudnetops_synthetic_bundle.pkl")
+        if not os.path.exists(path):
+            make_bundle(path)
+        os.environ["MODEL_BUNDLE_PATH"] = path
+    return os.environ["MODEL_BUNDLE_PATH"]
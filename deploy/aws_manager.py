@@ -1,43 +1,66 @@
-import boto3
 import os
-from botocore.exceptions import ClientError
-from dotenv import load_dotenv
-
-load_dotenv()
-
-AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
-
-# Session et clients avec région définie
-session = boto3.Session(region_name=AWS_REGION)
-ec2 = session.resource("ec2")
-s3 = session.client("s3", region_name=AWS_REGION)
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import BotoCoreError, ClientError
+from aws_clients import AWS_REGION, get_client
+from deploy.s3_emptier import empty_bucket
+
+# clients boto3 : registre partagé (aws_clients), créés au premier appel
+
+DEFAULT_AMI = "ami-0156001f0548e90b1"
+DEFAULT_INSTANCE_TYPE = "t2.micro"
+# waiter instance_running : un DescribeInstances toutes les DELAY s, au plus ATTEMPTS fois
+EC2_WAIT_DELAY = int(os.getenv("EC2_WAIT_DELAY", "15"))
+EC2_WAIT_ATTEMPTS = int(os.getenv("EC2_WAIT_ATTEMPTS", "40"))
+# opérations groupées : ids par TerminateInstances, threads pour les buckets
+EC2_TERMINATE_CHUNK = int(os.getenv("EC2_TERMINATE_CHUNK", "500"))
+S3_BULK_WORKERS = int(os.getenv("S3_BULK_WORKERS", "8"))
 
 # ------------------------------
 # EC2 FUNCTIONS
 # ------------------------------
 
+def launch_ec2_instances(count=1, instance_type=DEFAULT_INSTANCE_TYPE, name=None, client_token=None):
+    """
+    Un seul RunInstances pour `count` instances (MinCount = MaxCount = count).
+    client_token rend l'appel idempotent : relancé avec le même jeton, AWS renvoie
+    la même réservation au lieu de créer de nouvelles instances.
+    """
+    tags = [{'Key': 'CreatedBy', 'Value': 'CloudNetOps'}]
+    if name:
+        tags.append({'Key': 'Name', 'Value': name})
+    params = dict(
+        ImageId=DEFAULT_AMI,
+        InstanceType=instance_type,
+        MinCount=count,
+        MaxCount=count,
+        TagSpecifications=[{'ResourceType': 'instance', 'Tags': tags}]
+    )
+    if client_token:
+        params["ClientToken"] = client_token
+    resp = get_client("ec2").run_instances(**params)
+    return [inst["InstanceId"] for inst in resp["Instances"]]
+
+
+def wait_ec2_running(instance_ids):
+    """Un seul waiter pour tout le lot (DescribeInstances sur toutes les instances à la fois)."""
+    get_client("ec2").get_waiter("instance_running").wait(
+        InstanceIds=instance_ids,
+        WaiterConfig={"Delay": EC2_WAIT_DELAY, "MaxAttempts": EC2_WAIT_ATTEMPTS}
+    )
+
+
+def enable_ec2_monitoring(instance_ids):
+    """Activer le monitoring détaillé"""
+    return get_client("ec2").monitor_instances(InstanceIds=instance_ids)
+
 
 def create_ec2_instance():
+    """Version synchrone (bloquante) ; l'API passe par deploy.jobs."""
     try:
-        instance = ec2.create_instances(
-            ImageId="ami-0156001f0548e90b1",
-            InstanceType="t2.micro",
-            MinCount=1,
-            MaxCount=1,
-            TagSpecifications=[{
-                'ResourceType': 'instance',
-                'Tags': [{'Key': 'CreatedBy', 'Value': 'CloudNetOps'}]
-            }]
-        )[0]
-
-        instance.wait_until_running()
-        instance.reload()
-
-        # Activer le monitoring détaillé
-        ec2_client = boto3.client('ec2', region_name=AWS_REGION)
-        ec2_client.monitor_instances(InstanceIds=[instance.instance_id])
-
-        return instance.instance_id
+        instance_ids = launch_ec2_instances()
+        wait_ec2_running(instance_ids)
+        enable_ec2_monitoring(instance_ids)
+        return instance_ids[0]
     except Exception as e:
         return {"error": str(e)}
 
@@ -45,11 +68,51 @@ def create_ec2_instance():
 
 def terminate_ec2_instance(instance_id):
     try:
-        instance = ec2.Instance(instance_id)
-        return instance.terminate()
+        return get_client("ec2").terminate_instances(InstanceIds=[instance_id])
     except ClientError as e:
         return {"error": str(e)}
 
+
+def _terminate_chunk(instance_ids, results):
+    try:
+        resp = get_client("ec2").terminate_instances(InstanceIds=instance_ids)
+    except BotoCoreError as e:
+        # réseau, timeout... : rien ne dit quels ids sont fautifs, le lot entier est en échec
+        # sans perdre les résultats des lots précédents
+        for instance_id in instance_ids:
+            results[instance_id] = {"error": str(e)}
+        return
+    except ClientError as e:
+        # TerminateInstances échoue en bloc si un seul id est invalide (InvalidInstanceID.Malformed,
+        # .NotFound) : on coupe le lot en deux pour isoler les ids fautifs. Toute autre erreur
+        # (droits, throttling...) vaut pour tout le lot : le couper multiplierait les appels.
+        code = e.response.get("Error", {}).get("Code", "")
+        if len(instance_ids) == 1 or not code.startswith("InvalidInstanceID"):
+            for instance_id in instance_ids:
+                results[instance_id] = {"error": str(e)}
+            return
+        middle = len(instance_ids) // 2
+        _terminate_chunk(instance_ids[:middle], results)
+        _terminate_chunk(instance_ids[middle:], results)
+        return
+    for change in resp.get("TerminatingInstances", []):
+        results[change["InstanceId"]] = {
+            "previous_state": change["PreviousState"]["Name"],
+            "state": change["CurrentState"]["Name"]
+        }
+
+
+def terminate_ec2_instances(instance_ids, chunk_size=EC2_TERMINATE_CHUNK):
+    """
+    Termine une liste d'instances par lots de `chunk_size` ids par appel.
+    Renvoie {instance_id: {"previous_state", "state"} ou {"error"}}.
+    """
+    instance_ids = list(dict.fromkeys(instance_ids))
+    results = {}
+    for i in range(0, len(instance_ids), chunk_size):
+        _terminate_chunk(instance_ids[i:i + chunk_size], results)
+    return {iid: results.get(iid, {"error": "absent de la réponse TerminateInstances"}) for iid in instance_ids}
+
 # ------------------------------
 # S3 FUNCTIONS
 # ------------------------------
@@ -58,9 +121,9 @@ def create_s3_bucket(bucket_name):
     try:
         # Pour us-east-1, LocationConstraint ne doit pas être fourni
         if AWS_REGION == "us-east-1":
-            return s3.create_bucket(Bucket=bucket_name)
+            return get_client("s3").create_bucket(Bucket=bucket_name)
         else:
-            return s3.create_bucket(
+            return get_client("s3").create_bucket(
                 Bucket=bucket_name,
                 CreateBucketConfiguration={"LocationConstraint": AWS_REGION}
             )
@@ -68,12 +131,37 @@ def create_s3_bucket(bucket_name):
         return {"error": str(e)}
 
 def delete_s3_bucket(bucket_name, force=False):
+    """force=True vide d'abord le bucket (versions, delete markers, multipart) en parallèle."""
     try:
         if force:
-            bucket = session.resource("s3").Bucket(bucket_name)
-            bucket.objects.all().delete()
+            result = empty_bucket(get_client("s3"), bucket_name)
+            if result["errors"]:
+                return {"error": f"{result['errors']} objet(s) non supprimé(s): {result['error_samples'][0]}",
+                        "progress": result}
 
-        return s3.delete_bucket(Bucket=bucket_name)
+        return get_client("s3").delete_bucket(Bucket=bucket_name)
 
     except ClientError as e:
         return {"error": str(e)}
+
+
+def _bulk_s3(fn, bucket_names, workers=S3_BULK_WORKERS):
+    """Applique fn(bucket) sur un pool borné ; renvoie [(bucket, résultat ou {"error"})] dans l'ordre."""
+    bucket_names = list(dict.fromkeys(bucket_names))
+
+    def call(name):
+        try:
+            return fn(name)
+        except Exception as e:
+            return {"error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(bucket_names)))) as pool:
+        return list(zip(bucket_names, pool.map(call, bucket_names)))
+
+
+def create_s3_buckets(bucket_names):
+    return _bulk_s3(create_s3_bucket, bucket_names)
+
+
+def delete_s3_buckets(bucket_names):
+    return _bulk_s3(delete_s3_bucket, bucket_names)
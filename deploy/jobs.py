@@ -0,0 +1,327 @@
+# deploy/jobs.py
+"""
+Jobs de déploiement asynchrones : provisioning EC2 et suppression forcée de buckets S3.
+
+/deploy/ec2/create enregistre un job (table Deployment) et répond tout de suite ;
+un pool dédié de DEPLOY_WORKERS threads enchaîne RunInstances -> waiter
+instance_running -> MonitorInstances. Les threads du serveur HTTP ne sont donc
+jamais bloqués par un lancement, et au plus DEPLOY_MAX_PENDING jobs attendent.
+
+États EC2 : queued -> launching -> waiting -> monitoring -> running (ou failed).
+États S3 (kind "s3-delete") : queued -> emptying -> deleting -> deleted (ou failed) ;
+le vidage tourne sur son propre pool (S3_DELETE_JOBS) et sa progression est lisible
+en direct via /deploy/jobs/<id>.
+
+Bail (lease) : tant qu'un process détient un job (en file ou en cours), il
+rafraîchit son updated_at toutes les DEPLOY_LEASE_HEARTBEAT secondes. Un job actif
+dont updated_at a plus de DEPLOY_LEASE_TTL secondes a perdu son process (worker
+gunicorn recyclé ou tué, ancien master après USR2...) : le leader le reprend
+(start_reclaimer), après l'avoir réservé par compare-and-set sur updated_at pour
+qu'un seul process le reprenne. Le ClientToken de RunInstances évite de lancer deux
+fois les mêmes instances, et revider un bucket déjà partiellement vidé est sans risque.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from botocore.exceptions import ClientError
+
+from extensions import db
+from auth.models import Deployment
+from deploy.aws_manager import (
+    DEFAULT_INSTANCE_TYPE,
+    launch_ec2_instances,
+    wait_ec2_running,
+    enable_ec2_monitoring
+)
+from aws_clients import get_client
+from deploy.s3_emptier import EmptyProgress, empty_bucket
+from monitoring import inventory
+
+logger = logging.getLogger(__name__)
+
+DEPLOY_WORKERS = int(os.getenv("DEPLOY_WORKERS", "4"))
+DEPLOY_MAX_PENDING = int(os.getenv("DEPLOY_MAX_PENDING", "50"))
+EC2_MAX_COUNT = int(os.getenv("EC2_MAX_COUNT", "20"))
+# vidages de buckets simultanés (chacun utilise S3_EMPTY_WORKERS threads)
+S3_DELETE_JOBS = int(os.getenv("S3_DELETE_JOBS", "2"))
+
+# bail des jobs : rafraîchi par le process qui les détient, repris par le leader à expiration
+DEPLOY_LEASE_HEARTBEAT = float(os.getenv("DEPLOY_LEASE_HEARTBEAT", "15"))
+DEPLOY_LEASE_TTL = float(os.getenv("DEPLOY_LEASE_TTL", "120"))
+DEPLOY_LEASE_CHECK = float(os.getenv("DEPLOY_LEASE_CHECK", "30"))
+
+ACTIVE_STATES = ("queued", "launching", "waiting", "monitoring", "emptying", "deleting")
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def job_to_dict(dep):
+    return {
+        "id": dep.id,
+        "name": dep.name,
+        "kind": dep.kind,
+        "status": dep.status,
+        "instance_type": dep.instance_type,
+        "count": dep.count,
+        "instance_ids": json.loads(dep.instance_ids) if dep.instance_ids else [],
+        "error": dep.error,
+        "progress": json.loads(dep.progress) if dep.progress else None,
+        "created_at": dep.created_at.isoformat() if dep.created_at else None,
+        "updated_at": dep.updated_at.isoformat() if dep.updated_at else None,
+        "finished_at": dep.finished_at.isoformat() if dep.finished_at else None,
+    }
+
+
+class DeployJobs:
+    def __init__(self, workers=DEPLOY_WORKERS, max_pending=DEPLOY_MAX_PENDING):
+        self.app = None
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="deploy")
+        self._s3_pool = ThreadPoolExecutor(max_workers=S3_DELETE_JOBS, thread_name_prefix="s3-job")
+        self._live = {}  # job_id -> EmptyProgress des vidages en cours
+        self._owned = set()  # jobs détenus par ce process (en file ou en cours) : bail rafraîchi
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._heartbeat = None
+        self._reclaimer = None
+
+    def init_app(self, app):
+        self.app = app
+        if self._heartbeat is None:
+            self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="deploy-lease", daemon=True)
+            self._heartbeat.start()
+
+    def submit_ec2(self, count=1, instance_type=DEFAULT_INSTANCE_TYPE, name=None):
+        """Crée le job (status queued) et le confie au pool ; renvoie son dict."""
+        self._reserve()
+        try:
+            dep = Deployment(
+                name=name or f"cloudnetops-{instance_type}",
+                status="queued",
+                kind="ec2",
+                instance_type=instance_type,
+                count=count,
+                client_token=uuid.uuid4().hex,
+                updated_at=datetime.utcnow()
+            )
+            db.session.add(dep)
+            db.session.commit()
+            job = job_to_dict(dep)
+            self._dispatch(dep.id, dep.kind)
+        except Exception:
+            self._release()
+            raise
+        return job
+
+    def submit_s3_delete(self, bucket_name):
+        """Suppression forcée d'un bucket (vidage parallèle puis DeleteBucket) en arrière-plan."""
+        self._reserve()
+        try:
+            dep = Deployment(
+                name=bucket_name,
+                status="queued",
+                kind="s3-delete",
+                updated_at=datetime.utcnow()
+            )
+            db.session.add(dep)
+            db.session.commit()
+            job = job_to_dict(dep)
+            self._dispatch(dep.id, dep.kind)
+        except Exception:
+            self._release()
+            raise
+        return job
+
+    def get(self, job_id):
+        dep = Deployment.query.get(job_id)
+        if dep is None:
+            return None
+        job = job_to_dict(dep)
+        live = self._live.get(job_id)
+        if live is not None:
+            job["progress"] = live.snapshot()
+        return job
+
+    def resume(self, stale_only=False):
+        """
+        Reprend les jobs restés actifs : tous (process unique qui redémarre) ou, avec
+        stale_only, ceux dont le bail a expiré. Chaque job est réservé par
+        compare-and-set sur updated_at : un seul process le reprend.
+        """
+        now = datetime.utcnow()
+        resumed = 0
+        with self.app.app_context():
+            query = Deployment.query.filter(
+                Deployment.kind.in_(("ec2", "s3-delete")), Deployment.status.in_(ACTIVE_STATES)
+            )
+            if stale_only:
+                cutoff = now - timedelta(seconds=DEPLOY_LEASE_TTL)
+                query = query.filter(db.or_(Deployment.updated_at.is_(None), Deployment.updated_at < cutoff))
+            rows = [(d.id, d.kind, d.updated_at) for d in query.all()]
+            for job_id, kind, updated_at in rows:
+                with self._lock:
+                    if job_id in self._owned:
+                        continue
+                claimed = Deployment.query.filter(
+                    Deployment.id == job_id,
+                    Deployment.updated_at.is_(None) if updated_at is None else Deployment.updated_at == updated_at
+                ).update({"updated_at": now}, synchronize_session=False)
+                db.session.commit()
+                if not claimed:
+                    continue  # repris entre-temps par un autre process
+                with self._lock:
+                    self._pending += 1
+                self._dispatch(job_id, kind)
+                resumed += 1
+        return resumed
+
+    def start_reclaimer(self, interval=DEPLOY_LEASE_CHECK):
+        """Leader : reprend périodiquement les jobs dont le bail a expiré."""
+        if self._reclaimer is None:
+            self._reclaimer = threading.Thread(
+                target=self._reclaim_loop, args=(interval,), name="deploy-reclaim", daemon=True
+            )
+            self._reclaimer.start()
+        return self._reclaimer
+
+    def _reclaim_loop(self, interval):
+        while True:
+            try:
+                resumed = self.resume(stale_only=True)
+                if resumed:
+                    logger.info("🔁 %s job(s) de déploiement repris (bail expiré)", resumed)
+            except Exception:
+                logger.exception("Reprise des jobs de déploiement")
+            time.sleep(interval)
+
+    def _heartbeat_loop(self):
+        while True:
+            time.sleep(DEPLOY_LEASE_HEARTBEAT)
+            with self._lock:
+                owned = list(self._owned)
+            if not owned:
+                continue
+            try:
+                with self.app.app_context():
+                    Deployment.query.filter(
+                        Deployment.id.in_(owned), Deployment.status.in_(ACTIVE_STATES)
+                    ).update({"updated_at": datetime.utcnow()}, synchronize_session=False)
+                    db.session.commit()
+            except Exception:
+                logger.exception("Renouvellement du bail des jobs de déploiement")
+
+    def _dispatch(self, job_id, kind):
+        with self._lock:
+            self._owned.add(job_id)
+        pool = self._s3_pool if kind == "s3-delete" else self._pool
+        pool.submit(self._run, job_id)
+
+    def _reserve(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull()
+            self._pending += 1
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def _set(self, dep, status, **fields):
+        dep.status = status
+        dep.updated_at = datetime.utcnow()
+        for key, value in fields.items():
+            setattr(dep, key, value)
+        db.session.commit()
+
+    def _run(self, job_id):
+        try:
+            with self.app.app_context():
+                dep = Deployment.query.get(job_id)
+                if dep is None:
+                    return
+                try:
+                    if dep.kind == "s3-delete":
+                        self._drive_s3_delete(dep)
+                    else:
+                        self._drive(dep)
+                except Exception as e:
+                    logger.exception("Job de déploiement %s en échec", job_id)
+                    db.session.rollback()
+                    fields = {}
+                    live = self._live.get(job_id)
+                    if live is not None:
+                        fields["progress"] = json.dumps(live.snapshot())
+                    self._set(dep, "failed", error=str(e), finished_at=datetime.utcnow(), **fields)
+        finally:
+            self._live.pop(job_id, None)
+            with self._lock:
+                self._owned.discard(job_id)
+            self._release()
+
+    def _drive(self, dep):
+        instance_ids = json.loads(dep.instance_ids) if dep.instance_ids else []
+
+        if dep.status in ("queued", "launching"):
+            self._set(dep, "launching")
+            instance_ids = launch_ec2_instances(
+                count=dep.count or 1,
+                instance_type=dep.instance_type or DEFAULT_INSTANCE_TYPE,
+                name=dep.name,
+                client_token=dep.client_token
+            )
+            inventory.invalidate("ec2")
+            self._set(dep, "waiting", instance_ids=json.dumps(instance_ids))
+
+        if dep.status == "waiting":
+            # un seul waiter pour tout le lot MinCount/MaxCount
+            wait_ec2_running(instance_ids)
+            self._set(dep, "monitoring")
+
+        if dep.status == "monitoring":
+            enable_ec2_monitoring(instance_ids)
+            inventory.invalidate("ec2")
+            self._set(dep, "running", finished_at=datetime.utcnow())
+
+    def _drive_s3_delete(self, dep):
+        progress = self._live[dep.id] = EmptyProgress()
+        self._set(dep, "emptying")
+        result = empty_bucket(get_client("s3"), dep.name, progress=progress)
+        if result["errors"]:
+            raise RuntimeError(f"{result['errors']} objet(s) non supprimé(s): {result['error_samples'][0]}")
+        self._set(dep, "deleting", progress=json.dumps(result))
+        try:
+            get_client("s3").delete_bucket(Bucket=dep.name)
+        except ClientError as e:
+            # job repris après la suppression : le bucket n'existe déjà plus
+            if e.response.get("Error", {}).get("Code") != "NoSuchBucket":
+                raise
+        inventory.invalidate("s3")
+        self._set(dep, "deleted", finished_at=datetime.utcnow())
+
+jobs = DeployJobs()
+
+
+def start_jobs(app, resume=True):
+    """
+    Pool et bail des jobs du process ; avec `resume` (process unique, ou leader
+    gunicorn), reprise immédiate des jobs actifs puis reprise périodique des baux expirés.
+    """
+    jobs.init_app(app)
+    if not resume:
+        return jobs
+    try:
+        resumed = jobs.resume()
+        if resumed:
+            logger.info("🔁 %s job(s) de déploiement repris", resumed)
+    except Exception:
+        logger.exception("Reprise des jobs de déploiement")
+    jobs.start_reclaimer()
+    return jobs
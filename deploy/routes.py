@@ -2,20 +2,51 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from deploy.aws_manager import (
-    create_ec2_instance,
+    DEFAULT_INSTANCE_TYPE,
     terminate_ec2_instance,
+    terminate_ec2_instances,
     create_s3_bucket,
-    delete_s3_bucket
+    create_s3_buckets,
+    delete_s3_bucket,
+    delete_s3_buckets
 )
-import os
-import boto3
+from deploy.jobs import jobs, JobQueueFull, EC2_MAX_COUNT
+from aws_clients import resolve_accounts, resolve_regions, resolve_targets
+from monitoring import inventory
 
-AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
+deploy_bp = Blueprint('deploy', __name__)
 
-ec2_client = boto3.client('ec2', region_name=AWS_REGION)
-s3_client = boto3.client('s3', region_name=AWS_REGION)
+# taille max des listes acceptées par les routes /batch
+BULK_MAX_ITEMS = 1000
 
-deploy_bp = Blueprint('deploy', __name__)
+
+def _require_admin():
+    """Réponse 403 si l'utilisateur JWT n'est pas admin, sinon None."""
+    identity = get_jwt_identity()
+    if not identity or identity.get('role') != 'admin':
+        return jsonify({"error": "Accès réservé aux administrateurs"}), 403
+    return None
+
+
+def _name_list(data, key):
+    """Liste de chaînes non vides sous `key`, ou None si le body est invalide."""
+    values = data.get(key)
+    if not values or not isinstance(values, list) or len(values) > BULK_MAX_ITEMS:
+        return None
+    if not all(isinstance(v, str) and v for v in values):
+        return None
+    return values
+
+
+def _bulk_response(results):
+    """200 si tout a réussi, 207 en cas d'échec partiel."""
+    failed = sum(1 for r in results if "error" in r)
+    return jsonify({
+        "results": results,
+        "total": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed
+    }), 207 if failed else 200
 
 # ------------------------------
 # EC2 ROUTES
@@ -27,35 +58,50 @@ def deploy_ec2():
     if request.method == "OPTIONS":
         return '', 200  # preflight CORS
 
-    identity = get_jwt_identity()
-    if not identity or identity.get('role') != 'admin':
-        return jsonify({"error": "Accès réservé aux administrateurs"}), 403
+    denied = _require_admin()
+    if denied:
+        return denied
 
-    instance_id = create_ec2_instance()
+    data = request.get_json(silent=True) or {}
+    count = data.get('count', 1)
+    if not isinstance(count, int) or isinstance(count, bool) or not 1 <= count <= EC2_MAX_COUNT:
+        return jsonify({"error": f"count invalide (1 à {EC2_MAX_COUNT})"}), 400
 
-    # Si c'est un dict avec "error" mais instance_id existe, renvoyer quand même
-    if isinstance(instance_id, dict):
-        if "error" in instance_id and "instance_id" in instance_id:
-            return jsonify({
-                "message": "Instance EC2 créée malgré un warning",
-                "instance_id": instance_id["instance_id"],
-                "warning": instance_id["error"]
-            }), 200
-        elif "error" in instance_id:
-            return jsonify({"error": instance_id["error"]}), 500
+    # le lancement (RunInstances + attente running) tourne dans le pool de jobs
+    try:
+        job = jobs.submit_ec2(
+            count=count,
+            instance_type=data.get('type') or DEFAULT_INSTANCE_TYPE,
+            name=data.get('name') or None
+        )
+    except JobQueueFull:
+        return jsonify({"error": "Trop de déploiements en attente, réessayez plus tard"}), 429
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-    # Cas normal
-    return jsonify({"message": "Instance EC2 créée avec succès", "instance_id": instance_id}), 200
+    return jsonify({
+        "message": "Déploiement EC2 lancé",
+        "job_id": job["id"],
+        "status": job["status"],
+        "job": job
+    }), 202
 
 
+@deploy_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job introuvable"}), 404
+    return jsonify(job)
 
 
 @deploy_bp.route('/ec2/terminate', methods=['POST'])
 @jwt_required()
 def terminate_ec2():
-    identity = get_jwt_identity()
-    if not identity or identity.get('role') != 'admin':
-        return jsonify({"error": "Accès réservé aux administrateurs"}), 403
+    denied = _require_admin()
+    if denied:
+        return denied
 
     data = request.get_json(silent=True) or {}
     instance_id = data.get('instance_id')
@@ -64,6 +110,7 @@ def terminate_ec2():
 
     try:
         resp = terminate_ec2_instance(instance_id)
+        inventory.invalidate("ec2")
         if isinstance(resp, dict) and "error" in resp:
             return jsonify(resp), 400
         return jsonify({"message": "Instance EC2 terminée", "details": resp})
@@ -71,6 +118,30 @@ def terminate_ec2():
         return jsonify({"error": str(e)}), 500
 
 
+@deploy_bp.route('/ec2/terminate/batch', methods=['POST'])
+@jwt_required()
+def terminate_ec2_batch():
+    """
+    Body: {"instance_ids": ["i-...", ...]}
+    Un TerminateInstances par lot d'ids ; résultat par instance.
+    """
+    denied = _require_admin()
+    if denied:
+        return denied
+
+    data = request.get_json(silent=True) or {}
+    instance_ids = _name_list(data, 'instance_ids')
+    if instance_ids is None:
+        return jsonify({"error": f"instance_ids manquant ou invalide (liste de 1 à {BULK_MAX_ITEMS} ids)"}), 400
+
+    try:
+        results = terminate_ec2_instances(instance_ids)
+        inventory.invalidate("ec2")
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return _bulk_response([{"instance_id": iid, **r} for iid, r in results.items()])
+
+
 # ------------------------------
 # S3 ROUTES
 # ------------------------------
@@ -85,6 +156,7 @@ def s3_create():
 
     try:
         resp = create_s3_bucket(bucket_name)
+        inventory.invalidate("s3")
         if isinstance(resp, dict) and "error" in resp:
             return jsonify(resp), 400
         return jsonify({"message": f"Bucket S3 '{bucket_name}' créé", "details": resp})
@@ -101,8 +173,24 @@ def s3_delete():
     if not bucket_name:
         return jsonify({"error": "bucket_name manquant"}), 400
 
+    if force:
+        # vidage potentiellement long : job en arrière-plan, progression via /deploy/jobs/<id>
+        try:
+            job = jobs.submit_s3_delete(bucket_name)
+        except JobQueueFull:
+            return jsonify({"error": "Trop de déploiements en attente, réessayez plus tard"}), 429
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+        return jsonify({
+            "message": f"Suppression du bucket S3 '{bucket_name}' lancée",
+            "job_id": job["id"],
+            "status": job["status"],
+            "job": job
+        }), 202
+
     try:
-        resp = delete_s3_bucket(bucket_name, force=force)
+        resp = delete_s3_bucket(bucket_name, force=False)
+        inventory.invalidate("s3")
         if isinstance(resp, dict) and "error" in resp:
             return jsonify(resp), 400
         return jsonify({"message": f"Bucket S3 '{bucket_name}' supprimé", "details": resp})
@@ -112,16 +200,108 @@ def s3_delete():
 @deploy_bp.route('/summary', methods=['GET'])
 @jwt_required(optional=True)
 def deploy_summary():
-    ec2s = ec2_client.describe_instances()
-    running_instances = [
-        inst for res in ec2s['Reservations']
-        for inst in res['Instances']
-        if inst['State']['Name'] == 'running'
-    ]
-    ec2_count = len(running_instances)
+    """
+    Query optionnelle : regions=a,b|all, accounts=prod,dev|all — cibles interrogées en
+    parallèle, totaux + détail par compte/région, "errors" pour les cibles sans réponse.
+    """
+    if 'regions' not in request.args and 'accounts' not in request.args:
+        # filtre instance-state-name=running appliqué côté AWS
+        ec2_count = len(inventory.list_ec2_instances(state='running'))
+
+        s3_count = len(inventory.list_s3_buckets())
+
+        return jsonify({"ec2": ec2_count, "s3": s3_count})
+
+    try:
+        targets = resolve_targets(request.args.get('regions'), request.args.get('accounts'))
+        accounts = resolve_accounts(request.args.get('accounts'))
+        regions = resolve_regions(request.args['regions']) if 'regions' in request.args else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    instances, ec2_errors = inventory.list_ec2_instances_multi(targets, state='running')
+    buckets, s3_errors = inventory.list_s3_buckets_multi(accounts, regions)
 
-    s3s = s3_client.list_buckets()
-    s3_count = len(s3s['Buckets'])
+    # cibles en échec absentes du détail (pas de 0 trompeur)
+    failed_targets = {(e["account"], e["region"]) for e in ec2_errors}
+    failed_accounts = {e["account"] for e in s3_errors}
+    by_target = {
+        (t.account, t.region): {"account": t.account, "region": t.region, "ec2": 0}
+        for t in targets if (t.account, t.region) not in failed_targets
+    }
+    for inst in instances:
+        by_target[(inst["account"], inst["region"])]["ec2"] += 1
+    by_account = {a: 0 for a in accounts if a not in failed_accounts}
+    for bucket in buckets:
+        by_account[bucket["account"]] += 1
+
+    body = {
+        "ec2": len(instances),
+        "s3": len(buckets),
+        "ec2_by_target": list(by_target.values()),
+        "s3_by_account": by_account
+    }
+    errors = [{"resource": "ec2", **e} for e in ec2_errors] + [{"resource": "s3", **e} for e in s3_errors]
+    if errors:
+        body["errors"] = errors
+    failed = len(failed_targets) == len(targets) and len(failed_accounts) == len(accounts)
+    return jsonify(body), 502 if failed else 200
+
+
+@deploy_bp.route('/s3/create/batch', methods=['POST'])
+@jwt_required()
+def s3_create_batch():
+    """Body: {"bucket_names": [...]} — créations en parallèle (pool borné), résultat par bucket."""
+    denied = _require_admin()
+    if denied:
+        return denied
+
+    data = request.get_json(silent=True) or {}
+    bucket_names = _name_list(data, 'bucket_names')
+    if bucket_names is None:
+        return jsonify({"error": f"bucket_names manquant ou invalide (liste de 1 à {BULK_MAX_ITEMS} noms)"}), 400
+
+    results = create_s3_buckets(bucket_names)
+    inventory.invalidate("s3")
+    return _bulk_response([
+        {"bucket_name": name, "error": resp["error"]} if isinstance(resp, dict) and "error" in resp
+        else {"bucket_name": name, "status": "created"}
+        for name, resp in results
+    ])
+
+
+@deploy_bp.route('/s3/delete/batch', methods=['POST'])
+@jwt_required()
+def s3_delete_batch():
+    """
+    Body: {"bucket_names": [...], "force": false} — suppressions en parallèle, résultat par bucket.
+    force=true : un job de vidage + suppression par bucket (réponse 202 avec les job_id).
+    """
+    denied = _require_admin()
+    if denied:
+        return denied
+
+    data = request.get_json(silent=True) or {}
+    bucket_names = _name_list(data, 'bucket_names')
+    if bucket_names is None:
+        return jsonify({"error": f"bucket_names manquant ou invalide (liste de 1 à {BULK_MAX_ITEMS} noms)"}), 400
 
-    return jsonify({"ec2": ec2_count, "s3": s3_count})
+    if data.get('force', False):
+        # un job de vidage par bucket (pool S3_DELETE_JOBS), suivi via /deploy/jobs/<id>
+        results = []
+        for name in dict.fromkeys(bucket_names):
+            try:
+                job = jobs.submit_s3_delete(name)
+                results.append({"bucket_name": name, "job_id": job["id"], "status": job["status"]})
+            except JobQueueFull:
+                results.append({"bucket_name": name, "error": "Trop de déploiements en attente"})
+        response, code = _bulk_response(results)
+        return response, 202 if code == 200 else code
 
+    results = delete_s3_buckets(bucket_names)
+    inventory.invalidate("s3")
+    return _bulk_response([
+        {"bucket_name": name, "error": resp["error"]} if isinstance(resp, dict) and "error" in resp
+        else {"bucket_name": name, "status": "deleted"}
+        for name, resp in results
+    ])
@@ -0,0 +1,235 @@
+# deploy/s3_emptier.py
+"""
+Vidage parallèle d'un bucket S3 avant suppression.
+
+- listing : le premier niveau (Delimiter="/") est listé une fois, puis chaque
+  préfixe commun est parcouru en parallèle sur S3_LIST_WORKERS threads ;
+- suppression : lots de 1 000 clés par DeleteObjects, envoyés au fil du listing
+  sur un pool de S3_EMPTY_WORKERS threads (au plus 2 lots en attente par thread) ;
+- buckets versionnés : toutes les versions et tous les delete markers sont supprimés ;
+- les uploads multipart incomplets sont annulés (AbortMultipartUpload).
+
+La progression (EmptyProgress) peut être lue pendant le vidage depuis un autre thread.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+S3_EMPTY_WORKERS = int(os.getenv("S3_EMPTY_WORKERS", "16"))
+S3_LIST_WORKERS = int(os.getenv("S3_LIST_WORKERS", "4"))
+# maximum accepté par DeleteObjects
+DELETE_BATCH = 1000
+# un préfixe dont le listing échoue est repris après la dernière page traitée
+LIST_ATTEMPTS = 3
+MAX_ERROR_SAMPLES = 5
+
+
+class EmptyProgress:
+    def __init__(self):
+        self.phase = "pending"
+        self.started_at = None
+        self.finished_at = None
+        self.prefixes = 0
+        self.listed = 0
+        self.deleted = 0
+        self.versions = 0
+        self.delete_markers = 0
+        self.uploads_aborted = 0
+        self.errors = 0
+        self.error_samples = []
+        self._lock = threading.Lock()
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def error(self, count, message):
+        with self._lock:
+            self.errors += count
+            if len(self.error_samples) < MAX_ERROR_SAMPLES:
+                self.error_samples.append(message)
+
+    def snapshot(self):
+        with self._lock:
+            end = self.finished_at or time.time()
+            elapsed = end - self.started_at if self.started_at else 0.0
+            return {
+                "phase": self.phase,
+                "prefixes": self.prefixes,
+                "listed": self.listed,
+                "deleted": self.deleted,
+                "versions": self.versions,
+                "delete_markers": self.delete_markers,
+                "uploads_aborted": self.uploads_aborted,
+                "errors": self.errors,
+                "error_samples": list(self.error_samples),
+                "elapsed_seconds": round(elapsed, 3),
+                "objects_per_second": round(self.deleted / elapsed, 1) if elapsed > 0 else 0.0,
+            }
+
+
+class BucketEmptier:
+    def __init__(self, client, bucket, workers=S3_EMPTY_WORKERS, list_workers=S3_LIST_WORKERS,
+                 progress=None):
+        self.client = client
+        self.bucket = bucket
+        self.workers = workers
+        self.list_workers = list_workers
+        self.progress = progress or EmptyProgress()
+        self._delete_pool = None
+        self._inflight = None
+        self._batch = []
+        self._batch_lock = threading.Lock()
+
+    def run(self):
+        """Vide le bucket (sans le supprimer) ; renvoie le dernier état de progression."""
+        progress = self.progress
+        progress.started_at = time.time()
+        progress.phase = "listing"
+        try:
+            versioned = self._versioned()
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "NoSuchBucket":
+                raise
+            # job repris après la suppression du bucket : rien à vider
+            progress.finished_at = time.time()
+            progress.phase = "done"
+            return progress.snapshot()
+
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="s3-delete") as delete_pool, \
+                ThreadPoolExecutor(self.list_workers, thread_name_prefix="s3-list") as list_pool:
+            self._delete_pool = delete_pool
+            # borne la mémoire : le listing attend si trop de lots sont en file
+            self._inflight = threading.BoundedSemaphore(self.workers * 2)
+
+            uploads = list_pool.submit(self._abort_uploads)
+            prefixes = self._drain_retry(versioned, Delimiter="/")
+            progress.add(prefixes=len(prefixes))
+            futures = [list_pool.submit(self._drain_retry, versioned, Prefix=p) for p in prefixes]
+            for future in futures + [uploads]:
+                future.result()
+            self._flush()
+            progress.phase = "deleting"
+        # sortie du with : tous les DeleteObjects sont terminés
+
+        progress.finished_at = time.time()
+        progress.phase = "done"
+        return progress.snapshot()
+
+    def _versioned(self):
+        status = self.client.get_bucket_versioning(Bucket=self.bucket).get("Status")
+        return status in ("Enabled", "Suspended")
+
+    def _pages(self, versioned, **kwargs):
+        """
+        (objets à supprimer, préfixes communs, paramètres de la page suivante) page par page ;
+        les paramètres (None sur la dernière page) permettent de reprendre le listing après elle.
+        """
+        if versioned:
+            paginator = self.client.get_paginator("list_object_versions")
+            for page in paginator.paginate(Bucket=self.bucket, **kwargs):
+                versions = page.get("Versions", [])
+                markers = page.get("DeleteMarkers", [])
+                self.progress.add(versions=len(versions), delete_markers=len(markers))
+                objects = [{"Key": v["Key"], "VersionId": v["VersionId"]} for v in versions + markers]
+                following = None
+                if page.get("IsTruncated"):
+                    following = {"KeyMarker": page["NextKeyMarker"]}
+                    if page.get("NextVersionIdMarker"):
+                        following["VersionIdMarker"] = page["NextVersionIdMarker"]
+                yield objects, page.get("CommonPrefixes", []), following
+        else:
+            paginator = self.client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket, **kwargs):
+                objects = [{"Key": o["Key"]} for o in page.get("Contents", [])]
+                following = {"ContinuationToken": page["NextContinuationToken"]} if page.get("IsTruncated") else None
+                yield objects, page.get("CommonPrefixes", []), following
+
+    def _drain(self, versioned, prefixes, position, **kwargs):
+        """
+        Liste un préfixe et envoie ses objets au lot partagé ; ajoute à `prefixes` les préfixes
+        communs rencontrés. `position` garde les paramètres de la page suivante : une nouvelle
+        tentative reprend là, sans recompter ni renvoyer les objets déjà listés.
+        """
+        for objects, common, following in self._pages(versioned, **kwargs, **position):
+            prefixes.extend(c["Prefix"] for c in common)
+            self.progress.add(listed=len(objects))
+            self._enqueue(objects)
+            position.clear()
+            position.update(following or {})
+
+    def _enqueue(self, objects):
+        # lot commun à tous les threads de listing : des DeleteObjects pleins (1 000 clés)
+        # même quand les préfixes sont petits
+        ready = []
+        with self._batch_lock:
+            self._batch.extend(objects)
+            while len(self._batch) >= DELETE_BATCH:
+                ready.append(self._batch[:DELETE_BATCH])
+                del self._batch[:DELETE_BATCH]
+        for batch in ready:
+            self._submit_delete(batch)
+
+    def _flush(self):
+        with self._batch_lock:
+            batch, self._batch = self._batch, []
+        if batch:
+            self._submit_delete(batch)
+
+    def _drain_retry(self, versioned, **kwargs):
+        """Préfixes communs du préfixe listé (sans doublon si une reprise en relit)."""
+        prefixes, position = [], {}
+        for attempt in range(1, LIST_ATTEMPTS + 1):
+            try:
+                self._drain(versioned, prefixes, position, **kwargs)
+                return list(dict.fromkeys(prefixes))
+            except Exception as e:
+                if attempt == LIST_ATTEMPTS:
+                    raise
+                logger.warning(
+                    "⚠️ Listing s3://%s/%s (%s/%s): %s",
+                    self.bucket, kwargs.get('Prefix', ''), attempt, LIST_ATTEMPTS, e
+                )
+                time.sleep(attempt)
+
+    def _submit_delete(self, objects):
+        self._inflight.acquire()
+        future = self._delete_pool.submit(self._delete_batch, objects)
+        future.add_done_callback(lambda _: self._inflight.release())
+
+    def _delete_batch(self, objects):
+        try:
+            resp = self.client.delete_objects(
+                Bucket=self.bucket, Delete={"Objects": objects, "Quiet": True}
+            )
+        except Exception as e:
+            self.progress.error(len(objects), str(e))
+            return
+        errors = resp.get("Errors", [])
+        self.progress.add(deleted=len(objects) - len(errors))
+        if errors:
+            first = errors[0]
+            self.progress.error(len(errors), f"{first.get('Key')}: {first.get('Code')} {first.get('Message')}")
+
+    def _abort_uploads(self):
+        paginator = self.client.get_paginator("list_multipart_uploads")
+        for page in paginator.paginate(Bucket=self.bucket):
+            for upload in page.get("Uploads", []):
+                self._delete_pool.submit(self._abort_upload, upload["Key"], upload["UploadId"])
+
+    def _abort_upload(self, key, upload_id):
+        try:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            self.progress.add(uploads_aborted=1)
+        except Exception as e:
+            self.progress.error(1, str(e))
+
+def empty_bucket(client, bucket, progress=None, **kwargs):
+    return BucketEmptier(client, bucket, progress=progress, **kwargs).run()
@@ -1,5 +1,57 @@
+import os
+import sqlite3
+
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
+from prometheus_flask_exporter import PrometheusMetrics
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
 
 db = SQLAlchemy()
-jwt = JWTManager()
\ No newline at end of file
+jwt = JWTManager()
+metrics = PrometheusMetrics.for_app_factory()
+
+# --- MOTEUR SQL ---
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# WAL : les lectures ne bloquent plus l'écriture ; NORMAL : pas de fsync à chaque commit (sûr en WAL)
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+# attente du verrou d'écriture avant "database is locked" (secondes)
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))
+
+
+def engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS selon la base : pool borné, connexions vérifiées et recyclées."""
+    url = make_url(uri)
+    if url.get_backend_name() != "sqlite":
+        return {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": True
+        }
+    options = {"connect_args": {"timeout": SQLITE_BUSY_TIMEOUT}}
+    if url.database not in (None, "", ":memory:") and DB_POOL_SIZE > 0:
+        # pool de connexions réutilisées (Flask-SQLAlchemy passe sinon en NullPool pour SQLite)
+        options["poolclass"] = QueuePool
+        options["connect_args"]["check_same_thread"] = False
+        options["pool_size"] = DB_POOL_SIZE
+        options["max_overflow"] = DB_MAX_OVERFLOW
+        options["pool_timeout"] = DB_POOL_TIMEOUT
+    return options
+
+
+@event.listens_for(Engine, "connect")
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT * 1000)}")
+    cursor.close()
@@ -1,6 +1,6 @@
 import axios from 'axios';
 
-const BASE = import.meta.env.VITE_API_BASE || 'http://localhost:5000';
+export const BASE = import.meta.env.VITE_API_BASE || 'http://localhost:5000';
 
 const api = axios.create({
   baseURL: BASE,
@@ -26,4 +26,46 @@ export async function signup(email, password, role) {
   return res.data;
 }
 
+// Collections versionnées côté serveur (http_cache.py) : clé des éléments pour ?since=
+const COLLECTIONS = {
+  '/monitor/ec2/list': ['instances', (i) => i.instanceId],
+  '/monitor/s3/list': ['buckets', (b) => b.name],
+  '/k8s/pods': ['pods', (p) => `${p.namespace}/${p.name}`],
+  '/k8s/services': ['services', (s) => `${s.namespace}/${s.name}`]
+};
+
+// dernière réponse par URL : { version, data }
+const snapshots = new Map();
+
+// Applique {added, changed, removed} à la liste connue ; les nouveaux éléments vont en fin de liste
+function applyDelta(previous, delta, itemsKey, key) {
+  const items = new Map((previous[itemsKey] || []).map((item) => [key(item), item]));
+  for (const k of delta.removed) items.delete(k);
+  for (const item of [...delta.changed, ...delta.added]) items.set(key(item), item);
+  const { delta: _delta, since, version, added, changed, removed, ...rest } = delta;
+  return { ...rest, [itemsKey]: [...items.values()] };
+}
+
+// GET conditionnel : If-None-Match (304 = rien retransféré) et, pour les listes,
+// ?since=<version> pour ne recevoir que les éléments ajoutés / modifiés / supprimés.
+// Renvoie les données complètes, comme api.get(url).data. La compression gzip/br est
+// négociée par le navigateur.
+export async function getFresh(url) {
+  const previous = snapshots.get(url);
+  const collection = COLLECTIONS[url];
+  const cfg = { validateStatus: (s) => (s >= 200 && s < 300) || s === 304 };
+  if (previous) {
+    cfg.headers = { 'If-None-Match': `W/"${previous.version}"` };
+    if (collection) cfg.params = { since: previous.version };
+  }
+  const res = await api.get(url, cfg);
+  if (res.status === 304) return previous.data;
+
+  let data = res.data;
+  if (data.delta && previous && collection) data = applyDelta(previous.data, data, ...collection);
+  const version = res.headers['x-snapshot-version'];
+  if (version) snapshots.set(url, { version, data });
+  return data;
+}
+
 export default api;
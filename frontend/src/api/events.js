@@ -0,0 +1,85 @@
+import { BASE } from './Api';
+
+// JSON merge patch (RFC 7386) : null supprime la clé, les objets sont fusionnés récursivement
+export function applyPatch(target, patch) {
+  if (patch === null || typeof patch !== 'object' || Array.isArray(patch)) return patch;
+  const out = (target && typeof target === 'object' && !Array.isArray(target)) ? { ...target } : {};
+  for (const [key, value] of Object.entries(patch)) {
+    if (value === null) delete out[key];
+    else out[key] = applyPatch(out[key], value);
+  }
+  return out;
+}
+
+// Polling de repli quand le serveur refuse le flux (503 : trop de flux ouverts sur le worker)
+const FALLBACK_POLL_MS = 10000;
+// nouvel essai du flux SSE pendant le repli
+const STREAM_RETRY_MS = 60000;
+
+// Abonnement au flux /events (Server-Sent Events) à la place du polling toutes les 10 s.
+// onUpdate(topic, data) reçoit l'état complet du topic après chaque snapshot / patch.
+// Si le flux est refusé, interroge /events/snapshot toutes les FALLBACK_POLL_MS et
+// retente le flux toutes les STREAM_RETRY_MS.
+// Renvoie une fonction de désabonnement (à appeler dans le cleanup du useEffect).
+export function subscribe(topics, onUpdate, onError) {
+  const query = `topics=${encodeURIComponent(topics.join(','))}`;
+  const state = {};
+  let source = null;
+  let pollTimer = null;
+  let retryTimer = null;
+  let closed = false;
+
+  const handle = (kind) => (e) => {
+    const { topic, data } = JSON.parse(e.data);
+    state[topic] = kind === 'snapshot' ? data : applyPatch(state[topic], data);
+    onUpdate(topic, state[topic]);
+  };
+
+  async function poll() {
+    try {
+      const res = await fetch(`${BASE}/events/snapshot?${query}`);
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      const snapshot = await res.json();
+      for (const [topic, data] of Object.entries(snapshot)) {
+        if (data !== null && !closed) {
+          state[topic] = data;
+          onUpdate(topic, data);
+        }
+      }
+    } catch (e) {
+      if (onError) onError(e);
+    }
+  }
+
+  function fallback() {
+    if (closed || pollTimer) return;
+    poll();
+    pollTimer = setInterval(poll, FALLBACK_POLL_MS);
+    retryTimer = setTimeout(() => {
+      clearInterval(pollTimer);
+      pollTimer = null;
+      open();
+    }, STREAM_RETRY_MS);
+  }
+
+  function open() {
+    if (closed) return;
+    source = new EventSource(`${BASE}/events?${query}`);
+    source.addEventListener('snapshot', handle('snapshot'));
+    source.addEventListener('patch', handle('patch'));
+    source.onerror = (e) => {
+      // EventSource se reconnecte tout seul (délai "retry" envoyé par le serveur), sauf
+      // si le serveur a refusé le flux (réponse non 200) : il passe alors à CLOSED
+      if (source.readyState === EventSource.CLOSED) fallback();
+      else if (onError) onError(e);
+    };
+  }
+
+  open();
+  return () => {
+    closed = true;
+    if (source) source.close();
+    clearInterval(pollTimer);
+    clearTimeout(retryTimer);
+  };
+}
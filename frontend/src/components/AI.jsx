@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
-import api from '../api/Api';
+import api, { getFresh } from '../api/Api';
+import { subscribe } from '../api/events';
 
 export default function AI() {
   const [instances, setInstances] = useState([]);
@@ -17,8 +18,8 @@ export default function AI() {
     setError(null);
     setLoadingInstances(true);
     try {
-      const r = await api.get('/monitor/ec2/list');
-      setInstances((r.data.instances || []).filter(i => i.state === "running"));
+      const data = await getFresh('/monitor/ec2/list');
+      setInstances((data.instances || []).filter(i => i.state === "running"));
     } catch (e) {
       console.error('Erreur chargement instances', e);
       setError("Impossible de charger la liste des instances EC2.");
@@ -29,8 +30,10 @@ export default function AI() {
 
   useEffect(() => {
     loadInstances();
-    const interval = setInterval(loadInstances, 10000);
-    return () => clearInterval(interval);
+    // liste poussée par le serveur (SSE) à chaque changement
+    return subscribe(['ec2'], (topic, data) => {
+      setInstances(Object.values(data.instances || {}).filter(i => i.state === "running"));
+    });
   }, []);
 
   // Collecter les métriques pour l'instance sélectionnée
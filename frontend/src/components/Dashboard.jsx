@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from 'react'
-import api from '../api/Api'
+import { getFresh } from '../api/Api'
+import { subscribe } from '../api/events'
 
 export default function Dashboard(){
   const [stats, setStats] = useState({ec2:0,s3:0,ai:'—',status:'unknown'})
@@ -24,21 +25,21 @@ export default function Dashboard(){
     let bucketCount = 0;
 
     try {
-      const statusRes = await api.get('/status');
-      status = statusRes?.data?.status || 'ok';
-      lastAI = statusRes?.data?.last_ai || '—';
+      const statusData = await getFresh('/status');
+      status = statusData?.status || 'ok';
+      lastAI = statusData?.last_ai || '—';
     } catch (e) {
       console.error('Erreur /status', e);
       status = 'offline';
     }
 
     try {
-      const ec2Res = await api.get('/monitor/ec2/list');
-      const instances = ec2Res?.data?.instances || [];
+      const ec2Data = await getFresh('/monitor/ec2/list');
+      const instances = ec2Data?.instances || [];
       runningCount = instances.filter(i => String(i.state).toLowerCase() === 'running').length;
 
-      const s3Res = await api.get('/monitor/s3/list');
-      const buckets = s3Res?.data?.buckets || [];
+      const s3Data = await getFresh('/monitor/s3/list');
+      const buckets = s3Data?.buckets || [];
       bucketCount = buckets.length;
     } catch (e) {
       console.error('Erreur EC2/S3', e);
@@ -56,8 +57,18 @@ export default function Dashboard(){
 
   useEffect(() => {
     refresh();
-    const interval = setInterval(refresh, 10000);
-    return () => clearInterval(interval);
+    // mises à jour poussées par le serveur (SSE) au lieu d'un refresh() toutes les 10 s
+    return subscribe(['ai', 'ec2', 's3'], (topic, data) => {
+      if (topic === 'ai') {
+        setStats(s => ({ ...s, status: data.status || 'ok', ai: data.last_ai || '—' }));
+      } else if (topic === 'ec2') {
+        const instances = Object.values(data.instances || {});
+        setStats(s => ({ ...s, ec2: instances.filter(i => String(i.state).toLowerCase() === 'running').length }));
+      } else if (topic === 's3') {
+        setStats(s => ({ ...s, s3: Object.keys(data.buckets || {}).length }));
+      }
+      setLastUpdated(new Date());
+    }, () => setStats(s => ({ ...s, status: 'offline' })));
   }, []);
 
   return (
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
-import api from '../api/Api';
+import api, { getFresh } from '../api/Api';
+import { subscribe } from '../api/events';
 
 export default function EC2() {
   const [name, setName] = useState('');
@@ -11,8 +12,8 @@ export default function EC2() {
   // Charger les instances EC2
   async function load() {
     try {
-      const r = await api.get('/monitor/ec2/list');
-      setInstances(r.data.instances || []);
+      const data = await getFresh('/monitor/ec2/list');
+      setInstances(data.instances || []);
     } catch (e) {
       console.error('Erreur chargement instances', e);
     }
@@ -20,8 +21,8 @@ export default function EC2() {
 
   useEffect(() => {
     load();
-    const interval = setInterval(load, 10000); // Refresh toutes les 10s
-    return () => clearInterval(interval);
+    // liste poussée par le serveur (SSE) à chaque changement
+    return subscribe(['ec2'], (topic, data) => setInstances(Object.values(data.instances || {})));
   }, []);
 
   // Créer une instance EC2
@@ -1,6 +1,8 @@
 import React, { useState, useEffect } from 'react';
 import { ArrowLeft, RefreshCw, Server, Box, Activity, Zap, Database, Cpu, HardDrive, Network, AlertTriangle, CheckCircle, Clock, LogOut } from 'lucide-react';
 import { useNavigate } from 'react-router-dom';
+import { subscribe } from '../api/events';
+import { getFresh } from '../api/Api';
 
 export default function KubernetesInterface() {
   const navigate = useNavigate();
@@ -29,15 +31,16 @@ export default function KubernetesInterface() {
     
     try {
       // Récupérer les pods
-      const podsResponse = await fetch('http://localhost:5000/k8s/pods');
-      if (!podsResponse.ok) throw new Error('Erreur lors de la récupération des pods');
-      const podsData = await podsResponse.json();
+      // GET conditionnels (ETag, ?since=) : seuls les pods / services modifiés sont retransférés
+      const podsData = await getFresh('/k8s/pods').catch(() => {
+        throw new Error('Erreur lors de la récupération des pods');
+      });
       setPods(podsData.pods || []);
 
       // Récupérer les services
-      const servicesResponse = await fetch('http://localhost:5000/k8s/services');
-      if (!servicesResponse.ok) throw new Error('Erreur lors de la récupération des services');
-      const servicesData = await servicesResponse.json();
+      const servicesData = await getFresh('/k8s/services').catch(() => {
+        throw new Error('Erreur lors de la récupération des services');
+      });
       setServices(servicesData.services || []);
 
       // Récupérer les métriques du cluster
@@ -60,12 +63,21 @@ export default function KubernetesInterface() {
     }
   };
 
-  // Rafraîchir automatiquement toutes les 10 secondes
+  // Mises à jour poussées par le serveur (SSE, topic k8s) au lieu d'un polling toutes les 10 secondes
   useEffect(() => {
     if (view === 'kubernetes') {
       fetchKubernetesData();
-      const interval = setInterval(fetchKubernetesData, 10000);
-      return () => clearInterval(interval);
+      return subscribe(['k8s'], (topic, data) => {
+        if (data.error) {
+          setError(data.error);
+          return;
+        }
+        setError(null);
+        setPods(Object.values(data.pods || {}));
+        setServices(Object.values(data.services || {}));
+        setMetrics(data.metrics || null);
+        setRecommendation(data.recommendation || null);
+      });
     }
   }, [view]);
 
@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from 'react';
-import api from '../api/Api';
+import api, { getFresh } from '../api/Api';
+import { subscribe } from '../api/events';
 import { Line } from 'react-chartjs-2';
 import { Chart, registerables } from 'chart.js';
 Chart.register(...registerables);
@@ -11,8 +12,8 @@ export default function Monitoring() {
 
   async function loadInstances() {
     try {
-      const r = await api.get('/monitor/ec2/list');
-      setInstances(r.data.instances || []);
+      const data = await getFresh('/monitor/ec2/list');
+      setInstances(data.instances || []);
     } catch (e) {
       console.error('Erreur chargement instances', e);
     }
@@ -20,38 +21,31 @@ export default function Monitoring() {
 
   useEffect(() => {
     loadInstances();
-    const interval = setInterval(loadInstances, 10000);
-    return () => clearInterval(interval);
+    // liste poussée par le serveur (SSE) à chaque changement
+    return subscribe(['ec2'], (topic, data) => setInstances(Object.values(data.instances || {})));
   }, []);
 
+  async function loadHistory(id) {
+    // dernière heure par pas de 5 min, servie par le stockage local du backend
+    const r = await api.get(`/monitor/ec2/${id}`, { params: { step: 300 } });
+    const { timestamps = [], series = {} } = r.data || {};
+    setMetrics({
+      cpu: series.CPUUtilization || [],
+      in: series.NetworkIn || [],
+      out: series.NetworkOut || [],
+      read: series.DiskReadOps || [],
+      write: series.DiskWriteOps || [],
+      labels: timestamps.map((t) => new Date(t).toLocaleTimeString())
+    });
+  }
+
   useEffect(() => {
     if (!selected) return;
-    let mounted = true;
-
-    async function fetchLoop() {
-      try {
-        const r = await api.get(`/monitor/ec2/${selected}`);
-        if (mounted) {
-          setMetrics({
-            cpu: [r.data.CPUUtilization || 0],
-            in: [r.data.NetworkIn || 0],
-            out: [r.data.NetworkOut || 0],
-            read: [r.data.DiskReadOps || 0],
-            write: [r.data.DiskWriteOps || 0],
-            labels: [new Date().toLocaleTimeString()]
-          });
-        }
-      } catch (e) {
-        console.error('Erreur récupération métriques', e);
-      }
-    }
 
-    fetchLoop();
-    const t = setInterval(fetchLoop, 10000);
-    return () => {
-      mounted = false;
-      clearInterval(t);
-    };
+    const onError = (e) => console.error('Erreur récupération métriques', e);
+    loadHistory(selected).catch(onError);
+    // le topic metrics:<id> signale un nouveau point : l'historique est relu
+    return subscribe([`metrics:${selected}`], () => loadHistory(selected).catch(onError), onError);
   }, [selected]);
 
   const chartFor = (label, data) => ({
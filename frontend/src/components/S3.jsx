@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react'
-import api from '../api/Api'
+import api, { getFresh } from '../api/Api'
+import { subscribe } from '../api/events'
 
 export default function S3(){
   const [name,setName]=useState('')
@@ -10,8 +11,8 @@ export default function S3(){
 
   async function load(){ 
     try{ 
-      const r = await api.get('/monitor/s3/list'); 
-      setBuckets(r.data.buckets||[]) 
+      const data = await getFresh('/monitor/s3/list'); 
+      setBuckets(data.buckets||[]) 
     }catch(e){
       console.error('Erreur chargement buckets:', e)
     } 
@@ -19,8 +20,8 @@ export default function S3(){
 
   useEffect(()=>{ 
     load();
-    const interval = setInterval(load, 10000);
-    return () => clearInterval(interval);
+    // liste poussée par le serveur (SSE) à chaque changement
+    return subscribe(['s3'], (topic, data) => setBuckets(Object.values(data.buckets || {})));
   },[])
 
   async function create(e){
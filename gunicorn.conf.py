@@ -0,0 +1,112 @@
+# gunicorn.conf.py
+"""
+Configuration gunicorn de production (dockerfile : gunicorn -c gunicorn.conf.py wsgi:app).
+
+- GUNICORN_WORKERS process x GUNICORN_THREADS threads (worker gthread) : un appel AWS
+  lent (describe_instances, waiter...) n'immobilise qu'un thread, et les workers
+  utilisent tous les cœurs.
+- preload_app : l'application et le modèle sont chargés une fois dans le master (wsgi.py)
+  puis partagés copy-on-write ; chaque worker démarre ses propres threads après le fork.
+- Recyclage : un worker est remplacé après GUNICORN_MAX_REQUESTS requêtes (+ jitter pour
+  ne pas tous les recycler en même temps), ce qui borne les fuites mémoire.
+- Rechargement sans coupure : `kill -HUP <master>` relit la configuration et remplace
+  les workers un par un ; les requêtes en cours ont GUNICORN_GRACEFUL_TIMEOUT secondes.
+  Avec preload_app le code est celui du master : pour déployer du nouveau code,
+  `kill -USR2 <master>` (nouveau master) puis `kill -TERM <ancien master>`.
+
+Le pipeline IA planifié et les producteurs du canal push (/events) ne tournent que dans
+un worker à la fois, le leader (verrou fichier, repris par un autre worker quand le sien
+s'arrête, y compris un worker du nouveau master après USR2) ; les autres workers lisent les instantanés qu'il publie dans PUSH_SHARED_DIR.
+Un flux SSE occupe un thread : PUSH_MAX_STREAMS (défaut : la moitié des threads) flux
+par worker au plus, les autres clients passent en polling sur /events/snapshot.
+Les jobs de déploiement ont un bail (deploy/jobs.py) : ceux d'un worker recyclé ou
+tué, ou d'un ancien master, sont repris par le leader une fois le bail expiré.
+
+Métriques Prometheus : si PROMETHEUS_MULTIPROC_DIR est défini (dockerfile), /metrics
+agrège tous les workers.
+"""
+import fcntl
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", str(multiprocessing.cpu_count() * 2 + 1)))
+worker_class = "gthread"
+# un flux SSE (/events) occupe un thread pendant toute la connexion : au plus la moitié
+# des threads d'un worker, le reste reste disponible pour les routes REST
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+accesslog = os.getenv("GUNICORN_ACCESSLOG") or None
+errorlog = "-"
+
+# clé stable par répertoire d'application (pas le pid du master) : après USR2, l'ancien et
+# le nouveau master se disputent le même verrou, il n'y a qu'un leader ; un autre
+# déploiement sur la machine (autre répertoire) a le sien
+_APP_KEY = hashlib.sha1(os.path.dirname(os.path.abspath(__file__)).encode()).hexdigest()[:12]
+LEADER_LOCK = os.getenv(
+    "GUNICORN_LEADER_LOCK",
+    os.path.join(tempfile.gettempdir(), f"cloudnetops-leader-{_APP_KEY}.lock")
+)
+# instantanés du canal push publiés par le leader ; lu par push/hub.py au preload.
+# Même clé que le verrou : pendant un USR2, les workers du nouveau master lisent ce que
+# publie le leader de l'ancien
+PUSH_SHARED_DIR = os.environ.setdefault(
+    "PUSH_SHARED_DIR", os.path.join(tempfile.gettempdir(), f"cloudnetops-push-{_APP_KEY}")
+)
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if PROMETHEUS_MULTIPROC_DIR:
+    # doit exister avant le preload (import des métriques dans le master)
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+
+def on_starting(server):
+    # fichiers de métriques d'un lancement précédent (autres pid) : compteurs repartis de zéro
+    if PROMETHEUS_MULTIPROC_DIR:
+        for name in os.listdir(PROMETHEUS_MULTIPROC_DIR):
+            if not name.endswith(f"_{os.getpid()}.db"):
+                os.remove(os.path.join(PROMETHEUS_MULTIPROC_DIR, name))
+
+
+def post_fork(server, worker):
+    from app import start_background
+    from push import hub
+    from wsgi import app
+
+    if "PUSH_MAX_STREAMS" not in os.environ:
+        # worker.cfg : tient compte de --threads passé en ligne de commande
+        hub.max_streams = max(1, worker.cfg.threads // 2)
+
+    # pas de reprise globale : d'autres workers (ou l'ancien master après USR2) peuvent
+    # encore détenir des jobs actifs ; le leader ne reprend que les baux expirés
+    start_background(app, leader=False, resume_jobs=False)
+    threading.Thread(target=_lead, args=(app,), name="leader-election", daemon=True).start()
+
+
+def _lead(app):
+    from ai.pipeline import start_pipeline
+    from deploy.jobs import jobs
+    from push import hub
+
+    # le fichier n'est jamais supprimé (ni le répertoire PUSH_SHARED_DIR) : un worker en
+    # attente garderait le verrou d'un fichier détaché pendant qu'un autre en créerait un nouveau
+    fd = os.open(LEADER_LOCK, os.O_CREAT | os.O_RDWR, 0o600)
+    # bloque tant qu'un autre worker tient le verrou ; le noyau le libère à sa sortie
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    start_pipeline(app)
+    jobs.start_reclaimer()
+    hub.run_publisher()
+
+
+def child_exit(server, worker):
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
@@ -0,0 +1,178 @@
+# http_cache.py
+"""
+Réponses conditionnelles, deltas et compression pour les routes relues en boucle
+(/monitor/ec2/list, /monitor/s3/list, /status, /k8s/pods, /k8s/services).
+
+- conditional_json(payload) : ETag faible = empreinte du JSON, Cache-Control: no-cache ;
+  If-None-Match identique -> 304 sans corps.
+- Pour une collection (items_key + key), ?since=<version> renvoie seulement les éléments
+  ajoutés, modifiés et supprimés depuis cette version ("delta": true), si elle fait partie
+  des SNAPSHOT_HISTORY dernières versions vues par le process ; sinon la réponse complète.
+  La version (X-Snapshot-Version, valeur de l'ETag) est l'empreinte du contenu et non un
+  compteur : tous les workers gunicorn donnent la même version pour le même inventaire.
+- init_compression(app) : gzip, ou br si le module brotli est installé, négocié via
+  Accept-Encoding pour les corps d'au moins COMPRESS_MIN_SIZE octets (pas les flux).
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from flask import current_app, jsonify, request
+from prometheus_client import Counter
+
+from extensions import metrics
+
+try:
+    import brotli
+except ImportError:  # br non proposé, gzip seulement
+    brotli = None
+
+SNAPSHOT_HISTORY = int(os.getenv("SNAPSHOT_HISTORY", "16"))
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+# qualité 11 (défaut de brotli) : trop lent pour une compression à chaque requête
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+COMPRESS_MIMETYPES = {
+    "application/json", "text/plain", "text/html", "text/css", "application/javascript"
+}
+
+CONDITIONAL_RESPONSES = Counter(
+    "http_conditional_responses_total",
+    "Réponses des routes versionnées : full, not_modified, delta, delta_miss (version inconnue)",
+    ["route", "result"],
+    registry=metrics.registry
+)
+COMPRESSION_BYTES = Counter(
+    "http_compression_bytes_total",
+    "Octets des réponses compressées, avant (raw) et après (sent) compression",
+    ["encoding", "stage"],
+    registry=metrics.registry
+)
+
+_histories = {}
+_histories_lock = threading.Lock()
+
+
+def _digest(data):
+    return hashlib.blake2b(data.encode(), digest_size=16).hexdigest()
+
+
+class Snapshots:
+    """Dernières versions d'une collection : {version: {clé: empreinte de l'élément}}."""
+
+    def __init__(self, size=SNAPSHOT_HISTORY):
+        self.size = size
+        self._versions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, version, items, key):
+        with self._lock:
+            digests = self._versions.get(version)
+            if digests is not None:
+                self._versions.move_to_end(version)
+                return digests
+        dumps = current_app.json.dumps
+        digests = {key(item): _digest(dumps(item)) for item in items}
+        with self._lock:
+            self._versions[version] = digests
+            while len(self._versions) > self.size:
+                self._versions.popitem(last=False)
+        return digests
+
+    def get(self, version):
+        with self._lock:
+            return self._versions.get(version)
+
+
+def _history(route):
+    with _histories_lock:
+        history = _histories.get(route)
+        if history is None:
+            history = _histories[route] = Snapshots()
+        return history
+
+
+def _delta(payload, items_key, key, old, new, since, version):
+    items = {key(item): item for item in payload[items_key]}
+    data = {k: v for k, v in payload.items() if k != items_key}
+    data.update({
+        "delta": True,
+        "since": since,
+        "version": version,
+        "added": [items[k] for k in new if k not in old],
+        "changed": [items[k] for k in new if k in old and old[k] != new[k]],
+        "removed": [k for k in old if k not in new]
+    })
+    return data
+
+
+def conditional_json(payload, items_key=None, key=None):
+    """
+    jsonify(payload) avec ETag / 304 ; si payload[items_key] est une liste d'éléments
+    identifiés par key(élément), ?since=<version> renvoie un delta.
+    """
+    body = current_app.json.dumps(payload)
+    version = _digest(body)
+    route = request.url_rule.rule if request.url_rule else request.path
+
+    since = request.args.get("since")
+    result = "full"
+    response = None
+    if items_key is not None:
+        new = _history(route).remember(version, payload[items_key], key)
+        if since:
+            old = _history(route).get(since)
+            if old is None:
+                result = "delta_miss"
+            else:
+                result = "delta"
+                response = jsonify(_delta(payload, items_key, key, old, new, since, version))
+    if response is None:
+        response = current_app.response_class(f"{body}\n", mimetype=current_app.json.mimetype)
+
+    response.set_etag(version, weak=True)
+    response.headers["X-Snapshot-Version"] = version
+    response.cache_control.no_cache = True
+    response.make_conditional(request)
+    if response.status_code == 304:
+        result = "not_modified"
+    CONDITIONAL_RESPONSES.labels(route, result).inc()
+    return response
+
+
+def _encoding():
+    offers = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return request.accept_encodings.best_match(offers)
+
+
+def _compress(response):
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESS_MIMETYPES
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = _encoding()
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    if encoding == "br":
+        compressed = brotli.compress(data, quality=COMPRESS_BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(data, COMPRESS_GZIP_LEVEL, mtime=0)
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    COMPRESSION_BYTES.labels(encoding, "raw").inc(len(data))
+    COMPRESSION_BYTES.labels(encoding, "sent").inc(len(compressed))
+    return response
+
+
+def init_compression(app):
+    app.after_request(_compress)
@@ -0,0 +1,264 @@
+# k8s/informer.py
+"""
+Informers : une liste initiale puis un watch (resourceVersion) par type d'objet,
+pour servir pods / services / nodes depuis la mémoire au lieu de relister le cluster
+à chaque requête. À la fin normale d'un watch (timeoutSeconds), reprise du watch
+depuis le dernier resourceVersion vu (événements et BOOKMARK) ; liste complète
+seulement au démarrage et sur 410 Gone (resourceVersion expiré).
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+from prometheus_client import Counter, Gauge
+
+from extensions import metrics
+
+logger = logging.getLogger(__name__)
+
+K8S_INFORMERS = os.getenv("K8S_INFORMERS", "1") == "1"
+K8S_WATCH_TIMEOUT = int(os.getenv("K8S_WATCH_TIMEOUT", "300"))
+K8S_SYNC_TIMEOUT = float(os.getenv("K8S_SYNC_TIMEOUT", "10"))
+
+INFORMER_CACHE_AGE = Gauge(
+    "k8s_informer_cache_age_seconds",
+    "Secondes depuis la dernière liste ou le dernier événement watch",
+    ["resource"],
+    registry=metrics.registry
+)
+INFORMER_ITEMS = Gauge(
+    "k8s_informer_items",
+    "Objets présents dans le cache de l'informer",
+    ["resource"],
+    registry=metrics.registry
+)
+INFORMER_RELISTS = Counter(
+    "k8s_informer_relists_total",
+    "Listes complètes effectuées par les informers",
+    ["resource", "reason"],
+    registry=metrics.registry
+)
+
+
+def _key(obj):
+    return (obj.metadata.namespace, obj.metadata.name)
+
+
+class IndexedStore:
+    """Objets par (namespace, nom) + index secondaires {nom_index: {valeur: {clés}}}."""
+
+    def __init__(self, indexers=None):
+        self.indexers = indexers or {}
+        self._items = {}
+        self._indexes = {name: {} for name in self.indexers}
+        self._values = {}  # clé -> {nom_index: valeur} (pour désindexer lors d'un MODIFIED)
+        self._lock = threading.RLock()
+
+    def replace(self, objs):
+        with self._lock:
+            self._items.clear()
+            self._values.clear()
+            self._indexes = {name: {} for name in self.indexers}
+            for obj in objs:
+                self._add(obj)
+
+    def upsert(self, obj):
+        with self._lock:
+            self._remove(_key(obj))
+            self._add(obj)
+
+    def delete(self, obj):
+        with self._lock:
+            self._remove(_key(obj))
+
+    def list(self):
+        with self._lock:
+            return list(self._items.values())
+
+    def by_index(self, index, value):
+        with self._lock:
+            keys = self._indexes[index].get(value, ())
+            return [self._items[k] for k in keys]
+
+    def count(self, index, value):
+        with self._lock:
+            return len(self._indexes[index].get(value, ()))
+
+    def counts(self, index):
+        """{valeur: nombre d'objets} pour un index."""
+        with self._lock:
+            return {value: len(keys) for value, keys in self._indexes[index].items() if keys}
+
+    def __len__(self):
+        return len(self._items)
+
+    def _add(self, obj):
+        key = _key(obj)
+        self._items[key] = obj
+        values = {}
+        for name, fn in self.indexers.items():
+            value = fn(obj)
+            values[name] = value
+            self._indexes[name].setdefault(value, set()).add(key)
+        self._values[key] = values
+
+    def _remove(self, key):
+        if self._items.pop(key, None) is None:
+            return
+        for name, value in self._values.pop(key, {}).items():
+            keys = self._indexes[name].get(value)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._indexes[name][value]
+
+
+class Informer:
+    def __init__(self, resource, list_fn, indexers=None):
+        self.resource = resource
+        self.list_fn = list_fn
+        self.store = IndexedStore(indexers)
+        self.synced = threading.Event()
+        self.last_sync = None
+        self._sync_deadline = None
+        self._resource_version = None  # dernier vu : point de reprise du watch
+        self._stop = threading.Event()
+        self._watch = None
+        self._thread = None
+        INFORMER_CACHE_AGE.labels(resource).set_function(self.age)
+        INFORMER_ITEMS.labels(resource).set_function(lambda: len(self.store))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name=f"informer-{self.resource}", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._watch is not None:
+            self._watch.stop()
+        if timeout is not None and self._thread is not None:
+            self._thread.join(timeout)
+
+    def age(self):
+        return time.monotonic() - self.last_sync if self.last_sync else float("inf")
+
+    def wait_synced(self, timeout=K8S_SYNC_TIMEOUT):
+        """
+        Attend la première liste au plus `timeout` secondes après le premier appel ; passé
+        ce délai (watch/list interdit, API injoignable), réponse immédiate : l'appelant
+        repasse tout de suite en appel direct au lieu d'attendre à chaque requête.
+        """
+        if self.synced.is_set():
+            return True
+        if self._sync_deadline is None:
+            self._sync_deadline = time.monotonic() + timeout
+        remaining = self._sync_deadline - time.monotonic()
+        return self.synced.wait(remaining) if remaining > 0 else False
+
+    def _touch(self):
+        self.last_sync = time.monotonic()
+
+    def _run(self):
+        reason, backoff = "initial", 1
+        while not self._stop.is_set():
+            try:
+                if self._resource_version is None:
+                    self._resource_version = self._relist(reason)
+                self._watch_from(self._resource_version)
+                backoff = 1
+                continue
+            except ApiException as e:
+                if e.status == 410:
+                    # resourceVersion trop ancien : on repart d'une liste
+                    reason, self._resource_version = "gone", None
+                    continue
+                logger.warning("⚠️ Informer %s: %s %s", self.resource, e.status, e.reason)
+            except Exception:
+                logger.exception("Informer %s", self.resource)
+            reason = "error"
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 30)
+
+    def _relist(self, reason):
+        INFORMER_RELISTS.labels(self.resource, reason).inc()
+        result = self.list_fn(watch=False)
+        self.store.replace(result.items)
+        self._touch()
+        self.synced.set()
+        return result.metadata.resource_version
+
+    def _watch_from(self, resource_version):
+        self._watch = watch.Watch()
+        stream = self._watch.stream(
+            self.list_fn,
+            resource_version=resource_version,
+            timeout_seconds=K8S_WATCH_TIMEOUT,
+            allow_watch_bookmarks=True
+        )
+        for event in stream:
+            if self._stop.is_set():
+                self._watch.stop()
+                break
+            kind = event["type"]
+            if kind in ("ADDED", "MODIFIED"):
+                self.store.upsert(event["object"])
+            elif kind == "DELETED":
+                self.store.delete(event["object"])
+            # objet brut : les BOOKMARK ne sont pas désérialisés
+            version = (event.get("raw_object") or {}).get("metadata", {}).get("resourceVersion")
+            if version:
+                self._resource_version = version
+            self._touch()
+
+
+class ClusterInformers:
+    """Pods (index namespace / phase / node), services (namespace) et nodes."""
+
+    def __init__(self, v1):
+        self.pods = Informer("pods", v1.list_pod_for_all_namespaces, {
+            "namespace": lambda p: p.metadata.namespace,
+            "phase": lambda p: p.status.phase if p.status else None,
+            "node": lambda p: p.spec.node_name if p.spec else None,
+        })
+        self.services = Informer("services", v1.list_service_for_all_namespaces, {
+            "namespace": lambda s: s.metadata.namespace,
+        })
+        self.nodes = Informer("nodes", v1.list_node)
+
+    def start(self):
+        for informer in (self.pods, self.services, self.nodes):
+            informer.start()
+        return self
+
+    def stop(self, timeout=None):
+        for informer in (self.pods, self.services, self.nodes):
+            informer.stop()
+        if timeout is not None:
+            # laisser les threads sortir avant la finalisation de l'interpréteur
+            for informer in (self.pods, self.services, self.nodes):
+                informer.stop(timeout)
+
+
+_informers = None
+_informers_lock = threading.Lock()
+
+
+def get_informers(v1):
+    """Informers démarrés au premier usage (None si désactivés ou Kubernetes absent)."""
+    global _informers
+    if not K8S_INFORMERS or v1 is None:
+        return None
+    if _informers is None:
+        with _informers_lock:
+            if _informers is None:
+                _informers = ClusterInformers(v1).start()
+                atexit.register(_informers.stop, 2)
+    return _informers
@@ -2,8 +2,17 @@
 from flask import Blueprint, jsonify, request
 from kubernetes import client, config
 from kubernetes.client.rest import ApiException
+from collections import Counter
+import numpy as np
+from .informer import get_informers
+from .quantity import parse_quantities
+from observability import span
+from http_cache import conditional_json
 import subprocess
 import os
+import logging
+
+logger = logging.getLogger(__name__)
 
 k8s_bp = Blueprint('k8s', __name__, url_prefix='/k8s')
 
@@ -12,120 +21,227 @@ try:
     config.load_kube_config()
     v1 = client.CoreV1Api()
     apps_v1 = client.AppsV1Api()
-    print("✅ Connexion Kubernetes établie")
+    custom_api = client.CustomObjectsApi()
+    logger.info("✅ Connexion Kubernetes établie")
 except Exception as e:
-    print(f"⚠️ Erreur connexion Kubernetes: {e}")
+    logger.warning("⚠️ Erreur connexion Kubernetes: %s", e)
     v1 = None
     apps_v1 = None
+    custom_api = None
+
+EMPTY_POD_METRICS = {"cpu": "0m", "memory": "0Mi"}
+
+def _object_key(item):
+    # même clé que le topic k8s de /events
+    return f"{item['namespace']}/{item['name']}"
+
+# ------------------------------
+# LECTURES (cache informer, sinon appel direct)
+# ------------------------------
+
+def _synced(resource):
+    informers = get_informers(v1)
+    if informers is None:
+        return None
+    informer = getattr(informers, resource)
+    return informer if informer.wait_synced() else None
+
+def list_pods():
+    informer = _synced("pods")
+    if informer:
+        return informer.store.list()
+    with span("kubernetes", "list pods"):
+        return v1.list_pod_for_all_namespaces(watch=False).items
+
+def list_services():
+    informer = _synced("services")
+    if informer:
+        return informer.store.list()
+    with span("kubernetes", "list services"):
+        return v1.list_service_for_all_namespaces(watch=False).items
+
+def list_nodes():
+    informer = _synced("nodes")
+    if informer:
+        return informer.store.list()
+    with span("kubernetes", "list nodes"):
+        return v1.list_node().items
+
+def pod_counts():
+    """
+    (total, {phase: nombre}, {nœud: nombre}) depuis les index de l'informer, ou sinon
+    depuis une seule liste de pods.
+    """
+    informer = _synced("pods")
+    if informer:
+        return len(informer.store), informer.store.counts("phase"), informer.store.counts("node")
+    with span("kubernetes", "list pods"):
+        pods = v1.list_pod_for_all_namespaces(watch=False).items
+    phases = Counter(p.status.phase if p.status else None for p in pods)
+    nodes = Counter(p.spec.node_name for p in pods if p.spec and p.spec.node_name)
+    return len(pods), dict(phases), dict(nodes)
+
+def pod_phase_counts():
+    """(total, {phase: nombre})."""
+    total, phases, _ = pod_counts()
+    return total, phases
 
 @k8s_bp.route('/pods', methods=['GET'])
 def get_pods():
-    """Récupérer la liste des pods"""
+    """Récupérer la liste des pods (ETag, ?since=<version> : delta par namespace/nom)"""
     if not v1:
         return jsonify({"error": "Kubernetes non configuré"}), 500
     
     try:
-        pods_list = v1.list_pod_for_all_namespaces(watch=False)
-        pods = []
-        
-        for pod in pods_list.items:
-            pod_info = {
-                "name": pod.metadata.name,
-                "namespace": pod.metadata.namespace,
-                "status": pod.status.phase,
-                "ip": pod.status.pod_ip,
-                "node": pod.spec.node_name,
-                "restarts": sum([container.restart_count for container in pod.status.container_statuses]) if pod.status.container_statuses else 0,
-                "age": str(pod.metadata.creation_timestamp) if pod.metadata.creation_timestamp else "—",
-            }
-            
-            # Ajouter les métriques si disponibles
-            try:
-                metrics = get_pod_metrics(pod.metadata.name, pod.metadata.namespace)
-                pod_info["metrics"] = metrics
-            except:
-                pod_info["metrics"] = {"cpu": "0m", "memory": "0Mi"}
-            
-            pods.append(pod_info)
-        
-        return jsonify({"pods": pods, "total": len(pods)}), 200
+        return conditional_json(pods_payload(), "pods", _object_key)
     
     except ApiException as e:
         return jsonify({"error": str(e)}), 500
 
+def pods_payload():
+    """Pods + métriques (partagé entre /k8s/pods et le canal push)."""
+    pods_list = list_pods()
+    # une seule requête metrics.k8s.io pour tous les pods, jointe par (namespace, nom)
+    pod_metrics = get_all_pod_metrics()
+    pods = []
+    
+    for pod in pods_list:
+        pod_info = {
+            "name": pod.metadata.name,
+            "namespace": pod.metadata.namespace,
+            "status": pod.status.phase,
+            "ip": pod.status.pod_ip,
+            "node": pod.spec.node_name,
+            "restarts": sum([container.restart_count for container in pod.status.container_statuses]) if pod.status.container_statuses else 0,
+            "age": str(pod.metadata.creation_timestamp) if pod.metadata.creation_timestamp else "—",
+        }
+        
+        # Ajouter les métriques si disponibles
+        pod_info["metrics"] = pod_metrics.get(
+            (pod.metadata.namespace, pod.metadata.name), EMPTY_POD_METRICS
+        )
+        
+        pods.append(pod_info)
+    
+    return {"pods": pods, "total": len(pods)}
+
 @k8s_bp.route('/services', methods=['GET'])
 def get_services():
-    """Récupérer la liste des services"""
+    """Récupérer la liste des services (ETag, ?since=<version> : delta par namespace/nom)"""
     if not v1:
         return jsonify({"error": "Kubernetes non configuré"}), 500
     
     try:
-        services_list = v1.list_service_for_all_namespaces(watch=False)
-        services = []
+        return conditional_json(services_payload(), "services", _object_key)
+    
+    except ApiException as e:
+        return jsonify({"error": str(e)}), 500
+
+def services_payload():
+    services_list = list_services()
+    services = []
+    
+    for svc in services_list:
+        service_info = {
+            "name": svc.metadata.name,
+            "namespace": svc.metadata.namespace,
+            "type": svc.spec.type,
+            "clusterIP": svc.spec.cluster_ip,
+            "ports": []
+        }
         
-        for svc in services_list.items:
-            service_info = {
-                "name": svc.metadata.name,
-                "namespace": svc.metadata.namespace,
-                "type": svc.spec.type,
-                "clusterIP": svc.spec.cluster_ip,
-                "ports": []
-            }
-            
-            if svc.spec.ports:
-                for port in svc.spec.ports:
-                    port_info = {
-                        "port": port.port,
-                        "targetPort": port.target_port if hasattr(port, 'target_port') else None,
-                        "nodePort": port.node_port if hasattr(port, 'node_port') else None,
-                        "protocol": port.protocol
-                    }
-                    service_info["ports"].append(port_info)
-                
-                # Simplifier pour l'affichage
-                service_info["port"] = svc.spec.ports[0].port
-                if svc.spec.ports[0].node_port:
-                    service_info["nodePort"] = svc.spec.ports[0].node_port
+        if svc.spec.ports:
+            for port in svc.spec.ports:
+                port_info = {
+                    "port": port.port,
+                    "targetPort": port.target_port if hasattr(port, 'target_port') else None,
+                    "nodePort": port.node_port if hasattr(port, 'node_port') else None,
+                    "protocol": port.protocol
+                }
+                service_info["ports"].append(port_info)
             
-            services.append(service_info)
+            # Simplifier pour l'affichage
+            service_info["port"] = svc.spec.ports[0].port
+            if svc.spec.ports[0].node_port:
+                service_info["nodePort"] = svc.spec.ports[0].node_port
         
-        return jsonify({"services": services, "total": len(services)}), 200
+        services.append(service_info)
     
-    except ApiException as e:
-        return jsonify({"error": str(e)}), 500
+    return {"services": services, "total": len(services)}
 
 @k8s_bp.route('/metrics', methods=['GET'])
 def get_cluster_metrics():
-    """Récupérer les métriques du cluster"""
+    """Récupérer les métriques du cluster (NodeMetrics metrics.k8s.io vs allocatable des nœuds)"""
     if not v1:
         return jsonify({"error": "Kubernetes non configuré"}), 500
     
     try:
-        # Compter les pods
-        pods_list = v1.list_pod_for_all_namespaces(watch=False)
-        total_pods = len(pods_list.items)
-        running_pods = sum(1 for pod in pods_list.items if pod.status.phase == "Running")
-        
-        # Récupérer les métriques des nœuds
-        nodes = v1.list_node()
-        
-        # Calculer l'utilisation (pour une vraie solution, utiliser metrics-server)
-        cpu_usage = "25%"
-        memory_usage = "40%"
-        network_io = "2.3 MB/s"
-        
-        return jsonify({
-            "totalPods": total_pods,
-            "runningPods": running_pods,
-            "cpuUsage": cpu_usage,
-            "memoryUsage": memory_usage,
-            "networkIO": network_io,
-            "nodes": len(nodes.items)
-        }), 200
+        return jsonify(cluster_metrics_payload()), 200
     
     except ApiException as e:
         return jsonify({"error": str(e)}), 500
 
+def cluster_metrics_payload():
+    # Compter les pods par phase et par nœud (index de l'informer, ou une seule liste)
+    total_pods, phases, node_pods = pod_counts()
+    
+    # Nœuds (cache informer) + leur consommation réelle (metrics-server)
+    nodes = list_nodes()
+    node_usage = get_node_usage()
+    
+    return build_cluster_metrics(nodes, node_usage, total_pods, phases, node_pods)
+
+def _percent(used, total):
+    return f"{used / total * 100:.1f}%" if total > 0 else "N/A"
+
+def build_cluster_metrics(nodes, node_usage, total_pods, phases, node_pods=None):
+    """
+    Utilisation CPU / mémoire du cluster et détail par nœud.
+    nodes: objets V1Node ; node_usage: {nom: {"cpu": "...", "memory": "..."}} (metrics.k8s.io)
+    Le pourcentage global ne compte que les nœuds qui remontent des métriques.
+    """
+    node_pods = node_pods or {}
+    names = [n.metadata.name for n in nodes]
+    allocatable = [(n.status.allocatable or {}) if n.status else {} for n in nodes]
+    usage = [node_usage.get(name, {}) for name in names]
+
+    alloc_cpu = parse_quantities([a.get("cpu", "0") for a in allocatable])
+    alloc_mem = parse_quantities([a.get("memory", "0") for a in allocatable])
+    used_cpu = parse_quantities([u.get("cpu", "0") for u in usage])
+    used_mem = parse_quantities([u.get("memory", "0") for u in usage])
+    reporting = np.array([name in node_usage for name in names], dtype=bool)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cpu_pct = np.where(alloc_cpu > 0, used_cpu / alloc_cpu * 100, 0.0)
+        mem_pct = np.where(alloc_mem > 0, used_mem / alloc_mem * 100, 0.0)
+
+    per_node = [
+        {
+            "name": name,
+            "cpuUsage": f"{cpu_pct[i]:.1f}%" if reporting[i] else "N/A",
+            "memoryUsage": f"{mem_pct[i]:.1f}%" if reporting[i] else "N/A",
+            "cpuCores": round(float(used_cpu[i]), 3),
+            "allocatableCpuCores": round(float(alloc_cpu[i]), 3),
+            "memoryBytes": int(used_mem[i]),
+            "allocatableMemoryBytes": int(alloc_mem[i]),
+            "pods": node_pods.get(name, 0),
+        }
+        for i, name in enumerate(names)
+    ]
+
+    return {
+        "totalPods": total_pods,
+        "runningPods": phases.get("Running", 0),
+        "podPhases": phases,
+        "cpuUsage": _percent(used_cpu[reporting].sum(), alloc_cpu[reporting].sum()),
+        "memoryUsage": _percent(used_mem[reporting].sum(), alloc_mem[reporting].sum()),
+        # metrics.k8s.io n'expose pas le réseau
+        "networkIO": "N/A",
+        "nodes": len(names),
+        "nodesReporting": int(reporting.sum()),
+        "nodeMetrics": per_node
+    }
+
 @k8s_bp.route('/recommendation', methods=['GET'])
 def get_recommendation():
     """Générer des recommandations IA pour le cluster"""
@@ -133,51 +249,53 @@ def get_recommendation():
         return jsonify({"error": "Kubernetes non configuré"}), 500
     
     try:
-        pods_list = v1.list_pod_for_all_namespaces(watch=False)
-        services_list = v1.list_service_for_all_namespaces(watch=False)
-        
-        recommendations = []
-        
-        # Analyser les pods
-        pending_pods = [p for p in pods_list.items if p.status.phase == "Pending"]
-        failed_pods = [p for p in pods_list.items if p.status.phase == "Failed"]
-        
-        if pending_pods:
-            recommendations.append({
-                "type": "warning",
-                "title": "Pods en attente",
-                "message": f"{len(pending_pods)} pod(s) sont en attente. Vérifiez les ressources disponibles.",
-                "action": "Augmenter la capacité du cluster ou ajuster les requests/limits"
-            })
-        
-        if failed_pods:
-            recommendations.append({
-                "type": "error",
-                "title": "Pods en échec",
-                "message": f"{len(failed_pods)} pod(s) ont échoué. Consultez les logs pour plus de détails.",
-                "action": "kubectl logs <pod-name> pour diagnostiquer"
-            })
-        
-        if not recommendations:
-            recommendations.append({
-                "type": "success",
-                "title": "Cluster en bonne santé",
-                "message": "Aucun problème détecté. Tous les pods sont opérationnels.",
-                "action": "Continuez à surveiller les métriques"
-            })
-        
-        return jsonify({
-            "recommendations": recommendations,
-            "summary": {
-                "totalPods": len(pods_list.items),
-                "healthyPods": len([p for p in pods_list.items if p.status.phase == "Running"]),
-                "issues": len([r for r in recommendations if r["type"] in ["warning", "error"]])
-            }
-        }), 200
+        return jsonify(recommendation_payload()), 200
     
     except ApiException as e:
         return jsonify({"error": str(e)}), 500
 
+def recommendation_payload():
+    total_pods, phases = pod_phase_counts()
+    
+    recommendations = []
+    
+    # Analyser les pods
+    pending_pods = phases.get("Pending", 0)
+    failed_pods = phases.get("Failed", 0)
+    
+    if pending_pods:
+        recommendations.append({
+            "type": "warning",
+            "title": "Pods en attente",
+            "message": f"{pending_pods} pod(s) sont en attente. Vérifiez les ressources disponibles.",
+            "action": "Augmenter la capacité du cluster ou ajuster les requests/limits"
+        })
+    
+    if failed_pods:
+        recommendations.append({
+            "type": "error",
+            "title": "Pods en échec",
+            "message": f"{failed_pods} pod(s) ont échoué. Consultez les logs pour plus de détails.",
+            "action": "kubectl logs <pod-name> pour diagnostiquer"
+        })
+    
+    if not recommendations:
+        recommendations.append({
+            "type": "success",
+            "title": "Cluster en bonne santé",
+            "message": "Aucun problème détecté. Tous les pods sont opérationnels.",
+            "action": "Continuez à surveiller les métriques"
+        })
+    
+    return {
+        "recommendations": recommendations,
+        "summary": {
+            "totalPods": total_pods,
+            "healthyPods": phases.get("Running", 0),
+            "issues": len([r for r in recommendations if r["type"] in ["warning", "error"]])
+        }
+    }
+
 @k8s_bp.route('/deploy', methods=['POST'])
 def deploy_application():
     """Déployer une application depuis deployment.yaml"""
@@ -189,11 +307,12 @@ def deploy_application():
             return jsonify({"error": "Fichier deployment.yaml introuvable"}), 404
         
         # Appliquer le deployment avec kubectl
-        result = subprocess.run(
-            ['kubectl', 'apply', '-f', yaml_path],
-            capture_output=True,
-            text=True
-        )
+        with span("subprocess", "kubectl apply"):
+            result = subprocess.run(
+                ['kubectl', 'apply', '-f', yaml_path],
+                capture_output=True,
+                text=True
+            )
         
         if result.returncode != 0:
             return jsonify({
@@ -210,21 +329,65 @@ def deploy_application():
         return jsonify({"error": str(e)}), 500
 
 # Fonctions utilitaires
-def get_pod_metrics(pod_name, namespace):
-    """Récupérer les métriques d'un pod"""
+def _format_usage(cpu_cores, memory_bytes):
+    """Même format que `kubectl top` : millicores et MiB."""
+    return {"cpu": f"{round(cpu_cores * 1000)}m", "memory": f"{round(memory_bytes / 2**20)}Mi"}
+
+def get_node_usage():
+    """{nœud: {"cpu": "...", "memory": "..."}} depuis metrics.k8s.io ({} si metrics-server absent)."""
+    if not custom_api:
+        return {}
     try:
-        result = subprocess.run(
-            ['kubectl', 'top', 'pod', pod_name, '-n', namespace],
-            capture_output=True,
-            text=True
-        )
-        
+        with span("kubernetes", "list nodes.metrics"):
+            resp = custom_api.list_cluster_custom_object("metrics.k8s.io", "v1beta1", "nodes")
+    except Exception as e:
+        logger.warning("⚠️ metrics.k8s.io (nodes) indisponible: %s", e)
+        return {}
+    return {item["metadata"]["name"]: item.get("usage", {}) for item in resp.get("items", [])}
+
+def get_all_pod_metrics():
+    """
+    Métriques de tous les pods en un appel : {(namespace, nom): {"cpu": "..m", "memory": "..Mi"}}.
+    Source : API metrics.k8s.io (metrics-server), sinon un seul `kubectl top pods -A`.
+    """
+    if custom_api:
+        try:
+            with span("kubernetes", "list pods.metrics"):
+                resp = custom_api.list_cluster_custom_object("metrics.k8s.io", "v1beta1", "pods")
+            keys, owners, cpu, memory = [], [], [], []
+            for item in resp.get("items", []):
+                meta = item.get("metadata", {})
+                keys.append((meta.get("namespace"), meta.get("name")))
+                for container in item.get("containers", []):
+                    usage = container.get("usage", {})
+                    owners.append(len(keys) - 1)
+                    cpu.append(usage.get("cpu", "0"))
+                    memory.append(usage.get("memory", "0"))
+            # somme des conteneurs par pod, en un passage numpy
+            pod_cpu = np.bincount(owners, weights=parse_quantities(cpu), minlength=len(keys))
+            pod_mem = np.bincount(owners, weights=parse_quantities(memory), minlength=len(keys))
+            return {key: _format_usage(pod_cpu[i], pod_mem[i]) for i, key in enumerate(keys)}
+        except Exception as e:
+            logger.warning("⚠️ metrics.k8s.io indisponible, repli sur kubectl top: %s", e)
+    return _pod_metrics_from_kubectl()
+
+def _pod_metrics_from_kubectl():
+    """Repli : un seul `kubectl top pods -A` pour tout le cluster."""
+    metrics = {}
+    try:
+        with span("subprocess", "kubectl top"):
+            result = subprocess.run(
+                ['kubectl', 'top', 'pods', '-A', '--no-headers'],
+                capture_output=True,
+                text=True,
+                timeout=30
+            )
         if result.returncode == 0:
-            lines = result.stdout.strip().split('\n')
-            if len(lines) > 1:
-                parts = lines[1].split()
-                if len(parts) >= 3:
-                    return {"cpu": parts[1], "memory": parts[2]}
-    except:
+            for line in result.stdout.splitlines():
+                parts = line.split()
+                # NAMESPACE NAME CPU MEMORY
+                if len(parts) >= 4:
+                    metrics[(parts[0], parts[1])] = {"cpu": parts[2], "memory": parts[3]}
+    except Exception:
         pass
-    return {"cpu": "0m", "memory": "0Mi"}
\ No newline at end of file
+    return metrics
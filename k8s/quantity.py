@@ -0,0 +1,42 @@
+# k8s/quantity.py
+"""
+Parseur vectorisé des quantités Kubernetes ("250m", "1500000n", "512Mi", "8Gi", "2")
+vers des float64 (cores pour le CPU, octets pour la mémoire).
+"""
+import numpy as np
+
+# suffixes binaires avant décimaux : "Mi" doit être testé avant "M"
+_BINARY = {"Ki": 2**10, "Mi": 2**20, "Gi": 2**30, "Ti": 2**40, "Pi": 2**50, "Ei": 2**60}
+_DECIMAL = {"n": 1e-9, "u": 1e-6, "m": 1e-3, "k": 1e3, "M": 1e6, "G": 1e9, "T": 1e12, "P": 1e15, "E": 1e18}
+_SUFFIX_CHARS = "".join(sorted(set("".join(_BINARY) + "".join(_DECIMAL))))
+
+
+def parse_quantities(values):
+    """Tableau de quantités -> np.ndarray float64 ; les valeurs vides ou invalides valent 0."""
+    q = np.asarray(values, dtype=np.str_)
+    if q.size == 0:
+        return np.zeros(q.shape)
+    q = np.char.strip(q)
+
+    factor = np.ones(q.shape)
+    matched = np.zeros(q.shape, dtype=bool)
+    for suffixes in (_BINARY, _DECIMAL):
+        for suffix, mult in suffixes.items():
+            mask = ~matched & np.char.endswith(q, suffix)
+            factor[mask] = mult
+            matched |= mask
+
+    numbers = np.char.rstrip(q, _SUFFIX_CHARS)
+    try:
+        parsed = numbers.astype(np.float64)
+    except ValueError:
+        # au moins une valeur invalide : repli élément par élément
+        parsed = np.array([_to_float(n) for n in numbers.ravel()]).reshape(q.shape)
+    return parsed * factor
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
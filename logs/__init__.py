@@ -0,0 +1,5 @@
+# logs/__init__.py
+from .routes import logs_bp
+from .handler import init_logging, start_log_writer
+
+__all__ = ['logs_bp', 'init_logging', 'start_log_writer']
@@ -0,0 +1,234 @@
+# logs/handler.py
+"""
+Journalisation structurée vers la table Log.
+
+DatabaseLogHandler est branché sur le logger racine : tous les modules loggent via
+logging.getLogger(__name__). emit() ne fait que mettre un dict en file (jamais bloquant) ;
+un thread écrit les enregistrements par INSERT groupés dès que LOG_BATCH_SIZE sont en
+attente ou au plus tard LOG_FLUSH_INTERVAL secondes après le premier.
+
+Surcharge : au-delà de LOG_SAMPLE_THRESHOLD de remplissage, seule une fraction
+LOG_SAMPLE_RATE des DEBUG/INFO est gardée ; file pleine : l'enregistrement est abandonné.
+WARNING et plus ne sont jamais échantillonnés.
+
+Chaque requête HTTP produit un enregistrement (logger cloudnetops.request) avec route,
+méthode, statut et latence ; les logs émis pendant une requête portent sa route.
+"""
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import traceback
+from datetime import datetime
+
+from flask import g, has_request_context, request
+from prometheus_client import Counter, Histogram
+
+from extensions import db, metrics
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_DB_LEVEL = os.getenv("LOG_DB_LEVEL", "INFO")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "500"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "1"))
+LOG_SAMPLE_THRESHOLD = float(os.getenv("LOG_SAMPLE_THRESHOLD", "0.5"))
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+LOG_REQUESTS = os.getenv("LOG_REQUESTS", "1") == "1"
+# requêtes non journalisées (scrape Prometheus, flux SSE)
+LOG_SKIP_PATHS = {p for p in os.getenv("LOG_SKIP_PATHS", "/metrics,/events").split(",") if p}
+MAX_MESSAGE_LENGTH = 4000
+
+LOG_RECORDS = Counter(
+    "log_records_total",
+    "Enregistrements de log par devenir (queued, sampled, dropped, written, failed)",
+    ["result"],
+    registry=metrics.registry
+)
+LOG_FLUSH_SECONDS = Histogram(
+    "log_flush_seconds",
+    "Durée d'un INSERT groupé dans la table Log",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    registry=metrics.registry
+)
+
+request_logger = logging.getLogger("cloudnetops.request")
+
+
+class DatabaseLogHandler(logging.Handler):
+    def __init__(self, level=LOG_DB_LEVEL, queue_size=LOG_QUEUE_SIZE, batch_size=LOG_BATCH_SIZE,
+                 flush_interval=LOG_FLUSH_INTERVAL, sample_threshold=LOG_SAMPLE_THRESHOLD,
+                 sample_rate=LOG_SAMPLE_RATE):
+        super().__init__(level)
+        self.queue = queue.Queue(queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sample_above = int(queue_size * sample_threshold)
+        self.sample_rate = sample_rate
+        self.app = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    # ------------------------------
+    # THREADS APPELANTS
+    # ------------------------------
+
+    def emit(self, record):
+        # les logs émis pendant l'écriture (SQLAlchemy...) ne reviennent pas dans la file
+        if threading.current_thread() is self._thread:
+            return
+        try:
+            if (record.levelno < logging.WARNING and self.queue.qsize() > self.sample_above
+                    and random.random() >= self.sample_rate):
+                LOG_RECORDS.labels("sampled").inc()
+                return
+            self.queue.put_nowait(self._row(record))
+            LOG_RECORDS.labels("queued").inc()
+        except queue.Full:
+            LOG_RECORDS.labels("dropped").inc()
+        except Exception:
+            self.handleError(record)
+
+    def _row(self, record):
+        route = getattr(record, "route", None)
+        method = getattr(record, "method", None)
+        if route is None and has_request_context():
+            route = request.url_rule.rule if request.url_rule else request.path
+            method = request.method
+        exception = None
+        if record.exc_info:
+            exception = "".join(traceback.format_exception(*record.exc_info))
+        return {
+            "message": record.getMessage()[:MAX_MESSAGE_LENGTH],
+            "level": record.levelname,
+            "logger": record.name[:100],
+            "route": route[:200] if route else None,
+            "method": method,
+            "status": getattr(record, "status", None),
+            "latency_ms": getattr(record, "latency_ms", None),
+            "exception": exception,
+            "created_at": datetime.utcfromtimestamp(record.created)
+        }
+
+    # ------------------------------
+    # THREAD D'ÉCRITURE
+    # ------------------------------
+
+    def start(self, app):
+        self.app = app
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+
+    def _collect(self):
+        try:
+            batch = [self.queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        from auth.models import Log
+
+        t0 = time.perf_counter()
+        with self.app.app_context():
+            try:
+                db.session.bulk_insert_mappings(Log, batch)
+                db.session.commit()
+                LOG_RECORDS.labels("written").inc(len(batch))
+            except Exception:
+                db.session.rollback()
+                LOG_RECORDS.labels("failed").inc(len(batch))
+                # pas de logging ici : l'erreur reviendrait dans la file
+                traceback.print_exc()
+        LOG_FLUSH_SECONDS.observe(time.perf_counter() - t0)
+
+    def flush(self):
+        """Écrit tout de suite ce qui est en file (master gunicorn avant le fork, arrêt)."""
+        if self.app is None:
+            return
+        rest = []
+        while True:
+            try:
+                rest.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        for i in range(0, len(rest), self.batch_size):
+            self._write(rest[i:i + self.batch_size])
+
+    def close(self):
+        """Arrêt (logging.shutdown à la sortie) : écrit ce qui reste en file."""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(self.flush_interval * 2)
+        self.flush()
+        super().close()
+
+
+def _not_access_log(record):
+    # les lignes d'accès werkzeug doublonnent les enregistrements cloudnetops.request
+    return not (record.name == "werkzeug" and record.levelno < logging.WARNING)
+
+
+handler = None
+
+
+def init_logging(app):
+    """
+    Console + table Log pour tout le process (une fois), hooks de requête pour `app`.
+    Les enregistrements restent en file jusqu'à start_log_writer (schéma à jour).
+    """
+    global handler
+    if handler is None:
+        logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+        handler = DatabaseLogHandler()
+        handler.addFilter(_not_access_log)
+        logging.getLogger().addHandler(handler)
+    handler.app = app
+
+    if LOG_REQUESTS:
+        app.before_request(_start_timer)
+        app.after_request(_log_request)
+    return handler
+
+
+def start_log_writer(app):
+    """Démarre l'écriture en base (après upgrade_schema)."""
+    return handler.start(app) if handler else None
+
+
+def _start_timer():
+    g.log_started = time.perf_counter()
+
+
+def _log_request(response):
+    started = g.get("log_started")
+    if started is None or request.path in LOG_SKIP_PATHS:
+        return response
+    latency_ms = (time.perf_counter() - started) * 1000
+    status = response.status_code
+    level = logging.ERROR if status >= 500 else logging.WARNING if status >= 400 else logging.INFO
+    request_logger.log(level, "%s %s %s %.1f ms", request.method, request.path, status, latency_ms, extra={
+        "route": request.url_rule.rule if request.url_rule else request.path,
+        "method": request.method,
+        "status": status,
+        "latency_ms": round(latency_ms, 2)
+    })
+    return response
@@ -0,0 +1,86 @@
+# logs/routes.py
+import logging
+
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from auth.models import Log, keyset_page
+from time_utils import parse_time
+
+logs_bp = Blueprint("logs", __name__)
+logger = logging.getLogger(__name__)
+
+# taille max d'une page
+LOGS_MAX_LIMIT = 500
+LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+
+
+def _levels(args):
+    """level=ERROR,WARNING (liste exacte) ou min_level=WARNING (ce niveau et au-dessus)."""
+    if "min_level" in args:
+        min_level = args["min_level"].upper()
+        if min_level not in LEVELS:
+            raise ValueError(f"min_level invalide (parmi {', '.join(LEVELS)})")
+        return LEVELS[LEVELS.index(min_level):]
+    levels = [l.strip().upper() for l in args.get("level", "").split(",") if l.strip()]
+    unknown = [l for l in levels if l not in LEVELS]
+    if unknown:
+        raise ValueError(f"level invalide : {', '.join(unknown)}")
+    return levels
+
+
+def _to_dict(row):
+    return {
+        "id": row.id,
+        "created_at": row.created_at.isoformat() + "Z" if row.created_at else None,
+        "level": row.level,
+        "logger": row.logger,
+        "message": row.message,
+        "route": row.route,
+        "method": row.method,
+        "status": row.status,
+        "latency_ms": row.latency_ms,
+        "exception": row.exception
+    }
+
+
+@logs_bp.route("/logs", methods=["GET"])
+@jwt_required()
+def list_logs():
+    """
+    Journaux applicatifs, du plus récent au plus ancien (pagination par clé sur id).
+    Query: level=ERROR,WARNING | min_level=WARNING, from=<ISO|epoch>, to=<ISO|epoch>,
+           route=/deploy/ec2/create, logger=cloudnetops.request, limit=N (défaut 100),
+           cursor=<valeur "cursor" de la page précédente>
+    """
+    identity = get_jwt_identity()
+    if not identity or identity.get('role') != 'admin':
+        return jsonify({"error": "Accès réservé aux administrateurs"}), 403
+
+    limit = request.args.get("limit", 100, type=int)
+    cursor = request.args.get("cursor", type=int)
+    if not 1 <= limit <= LOGS_MAX_LIMIT:
+        return jsonify({"error": f"limit invalide (1 à {LOGS_MAX_LIMIT})"}), 400
+
+    query = Log.query
+    try:
+        levels = _levels(request.args)
+        if levels:
+            query = query.filter(Log.level.in_(levels))
+        if "from" in request.args:
+            query = query.filter(Log.created_at >= parse_time(request.args["from"]))
+        if "to" in request.args:
+            query = query.filter(Log.created_at < parse_time(request.args["to"]))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if request.args.get("route"):
+        query = query.filter(Log.route == request.args["route"])
+    if request.args.get("logger"):
+        query = query.filter(Log.logger == request.args["logger"])
+
+    try:
+        rows, next_cursor = keyset_page(query, Log.id, limit, cursor)
+    except Exception as e:
+        logger.exception("Lecture des logs")
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"logs": [_to_dict(r) for r in rows], "cursor": next_cursor})
@@ -1,81 +1,216 @@
-import boto3
-import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
+from aws_clients import DEFAULT_TARGET, fan_out, get_client, target_tags
 load_dotenv()
 
 
-session = boto3.Session()
+# GetMetricData accepte au plus 500 requêtes par appel
+MAX_QUERIES_PER_REQUEST = 500
 
-cloudwatch = session.client("cloudwatch")
+# (clé renvoyée, MetricName, statistique)
+EC2_METRICS = [
+    ("CPUUtilization", "CPUUtilization", "Average"),
+    ("NetworkIn", "NetworkIn", "Sum"),
+    ("NetworkOut", "NetworkOut", "Sum"),
+    ("DiskReadOps", "DiskReadOps", "Sum"),
+    ("DiskWriteOps", "DiskWriteOps", "Sum"),
+]
 
+# (clé renvoyée, MetricName, StorageType)
+S3_METRICS = [
+    ("object_count", "NumberOfObjects", "AllStorageTypes"),
+    ("bucket_size_bytes", "BucketSizeBytes", "StandardStorage"),
+]
 
 
-def get_ec2_metrics(instance_id):
-    end = datetime.utcnow()
-    start = end - timedelta(minutes=10)
-    metrics = {}
+def _unique(values):
+    return list(dict.fromkeys(v for v in values if v))
 
-    def fetch_metric(name, stat):
-        resp = cloudwatch.get_metric_statistics(
-            Namespace='AWS/EC2',
-            MetricName=name,
-            Dimensions=[{'Name': 'InstanceId', 'Value': instance_id}],
-            StartTime=start,
-            EndTime=end,
-            Period=300,
-            Statistics=[stat]
-        )
-        return resp["Datapoints"][0][stat] if resp["Datapoints"] else 0
 
-    metrics["CPUUtilization"] = fetch_metric('CPUUtilization', 'Average')
-    metrics["NetworkIn"] = fetch_metric('NetworkIn', 'Sum')
-    metrics["NetworkOut"] = fetch_metric('NetworkOut', 'Sum')
-    metrics["DiskReadOps"] = fetch_metric('DiskReadOps', 'Sum')
-    metrics["DiskWriteOps"] = fetch_metric('DiskWriteOps', 'Sum')
+def _client(client, target):
+    return client or get_client("cloudwatch", target.region, target.account)
 
-    return metrics
 
+def fetch_metric_data(queries, start, end, client=None):
+    """
+    Exécute des MetricDataQueries via GetMetricData, par lots de 500 et pagination NextToken.
+    Renvoie {Id: valeur la plus récente} (les Id sans datapoint sont absents).
+    """
+    client = client or get_client("cloudwatch")
+    paginator = client.get_paginator("get_metric_data")
+    latest = {}
 
-def get_s3_metrics(bucket_name):
-    try:
-        metrics = {}
-
-        # Nombre total d’objets
-        response = cloudwatch.get_metric_statistics(
-            Namespace='AWS/S3',
-            MetricName='NumberOfObjects',
-            Dimensions=[
-                {'Name': 'BucketName', 'Value': bucket_name},
-                {'Name': 'StorageType', 'Value': 'AllStorageTypes'}
-            ],
-            StartTime=datetime.utcnow() - timedelta(hours=1),
-            EndTime=datetime.utcnow(),
-            Period=3600,
-            Statistics=['Average']
+    for i in range(0, len(queries), MAX_QUERIES_PER_REQUEST):
+        chunk = queries[i:i + MAX_QUERIES_PER_REQUEST]
+        pages = paginator.paginate(
+            MetricDataQueries=chunk,
+            StartTime=start,
+            EndTime=end,
+            ScanBy="TimestampDescending"
         )
-
-        if response["Datapoints"]:
-            metrics["object_count"] = response["Datapoints"][0]["Average"]
-
-        # Taille totale
-        size_resp = cloudwatch.get_metric_statistics(
-            Namespace='AWS/S3',
-            MetricName='BucketSizeBytes',
-            Dimensions=[
-                {'Name': 'BucketName', 'Value': bucket_name},
-                {'Name': 'StorageType', 'Value': 'StandardStorage'}
-            ],
-            StartTime=datetime.utcnow() - timedelta(hours=1),
-            EndTime=datetime.utcnow(),
-            Period=3600,
-            Statistics=['Average']
+        for page in pages:
+            for res in page.get("MetricDataResults", []):
+                # tri décroissant : la première valeur vue est la plus récente
+                if res.get("Values") and res["Id"] not in latest:
+                    latest[res["Id"]] = res["Values"][0]
+
+    return latest
+
+
+def fetch_metric_series(queries, start, end, client=None, target=DEFAULT_TARGET):
+    """
+    Comme fetch_metric_data, mais renvoie toutes les valeurs de la fenêtre :
+    {Id: [(timestamp UTC naïf, valeur), ...]} par ordre chronologique.
+    """
+    client = _client(client, target)
+    paginator = client.get_paginator("get_metric_data")
+    series = {}
+
+    for i in range(0, len(queries), MAX_QUERIES_PER_REQUEST):
+        chunk = queries[i:i + MAX_QUERIES_PER_REQUEST]
+        pages = paginator.paginate(
+            MetricDataQueries=chunk,
+            StartTime=start,
+            EndTime=end,
+            ScanBy="TimestampAscending"
         )
+        for page in pages:
+            for res in page.get("MetricDataResults", []):
+                points = series.setdefault(res["Id"], [])
+                for ts, value in zip(res.get("Timestamps", []), res.get("Values", [])):
+                    points.append((ts.astimezone(timezone.utc).replace(tzinfo=None), value))
+
+    for points in series.values():
+        points.sort()
+    return series
+
+
+def ec2_series_queries(instance_id, period):
+    """Une requête par métrique de EC2_METRICS pour une instance ; Id = index dans EC2_METRICS."""
+    return [
+        {
+            "Id": f"m{j}",
+            "MetricStat": {
+                "Metric": {
+                    "Namespace": "AWS/EC2",
+                    "MetricName": name,
+                    "Dimensions": [{"Name": "InstanceId", "Value": instance_id}]
+                },
+                "Period": period,
+                "Stat": stat
+            },
+            "ReturnData": True
+        }
+        for j, (key, name, stat) in enumerate(EC2_METRICS)
+    ]
+
+
+def get_ec2_metrics_batch(instance_ids, client=None, target=DEFAULT_TARGET):
+    """
+    Métriques EC2 de plusieurs instances d'une cible (compte, région) en un minimum d'appels GetMetricData.
+    Renvoie {instance_id: {"CPUUtilization": ..., "NetworkIn": ..., ...}} (0 si pas de donnée).
+    """
+    instance_ids = _unique(instance_ids)
+    end = datetime.utcnow()
+    start = end - timedelta(minutes=10)
 
-        if size_resp["Datapoints"]:
-            metrics["bucket_size_bytes"] = size_resp["Datapoints"][0]["Average"]
-
-        return metrics
-
+    queries, targets = [], {}
+    for i, instance_id in enumerate(instance_ids):
+        for j, (key, name, stat) in enumerate(EC2_METRICS):
+            query_id = f"ec2_{i}_{j}"
+            targets[query_id] = (instance_id, key)
+            queries.append({
+                "Id": query_id,
+                "MetricStat": {
+                    "Metric": {
+                        "Namespace": "AWS/EC2",
+                        "MetricName": name,
+                        "Dimensions": [{"Name": "InstanceId", "Value": instance_id}]
+                    },
+                    "Period": 300,
+                    "Stat": stat
+                },
+                "ReturnData": True
+            })
+
+    results = {iid: {key: 0 for key, _, _ in EC2_METRICS} for iid in instance_ids}
+    if not queries:
+        return results
+
+    for query_id, value in fetch_metric_data(queries, start, end, client=_client(client, target)).items():
+        instance_id, key = targets[query_id]
+        results[instance_id][key] = value
+
+    return results
+
+
+def get_ec2_metrics(instance_id, target=DEFAULT_TARGET):
+    return get_ec2_metrics_batch([instance_id], target=target)[instance_id]
+
+
+def get_s3_metrics_batch(bucket_names, client=None, target=DEFAULT_TARGET):
+    """
+    Métriques S3 (nombre d'objets, taille) de plusieurs buckets en un minimum d'appels.
+    CloudWatch publie ces métriques dans la région du bucket : `target` doit la désigner.
+    Renvoie {bucket_name: {...}} ; une clé est absente si CloudWatch n'a pas de donnée.
+    """
+    bucket_names = _unique(bucket_names)
+    end = datetime.utcnow()
+    start = end - timedelta(hours=1)
+
+    queries, targets = [], {}
+    for i, bucket_name in enumerate(bucket_names):
+        for j, (key, name, storage_type) in enumerate(S3_METRICS):
+            query_id = f"s3_{i}_{j}"
+            targets[query_id] = (bucket_name, key)
+            queries.append({
+                "Id": query_id,
+                "MetricStat": {
+                    "Metric": {
+                        "Namespace": "AWS/S3",
+                        "MetricName": name,
+                        "Dimensions": [
+                            {"Name": "BucketName", "Value": bucket_name},
+                            {"Name": "StorageType", "Value": storage_type}
+                        ]
+                    },
+                    "Period": 3600,
+                    "Stat": "Average"
+                },
+                "ReturnData": True
+            })
+
+    results = {name: {} for name in bucket_names}
+    if not queries:
+        return results
+
+    for query_id, value in fetch_metric_data(queries, start, end, client=_client(client, target)).items():
+        bucket_name, key = targets[query_id]
+        results[bucket_name][key] = value
+
+    return results
+
+
+def get_s3_metrics(bucket_name, target=DEFAULT_TARGET):
+    try:
+        return get_s3_metrics_batch([bucket_name], target=target)[bucket_name]
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+
+def get_metrics_multi(fetch_batch, items):
+    """
+    items : [(nom, Target)] ; un lot GetMetricData par cible, cibles interrogées en parallèle.
+    fetch_batch : get_ec2_metrics_batch ou get_s3_metrics_batch.
+    Renvoie ({nom: {...métriques, account, region}}, erreurs).
+    """
+    groups = {}
+    for name, target in items:
+        groups.setdefault(target, []).append(name)
+
+    results, errors = fan_out(lambda t: fetch_batch(groups[t], target=t), list(groups))
+    merged = {}
+    for target, part in results:
+        for name, values in part.items():
+            merged[name] = {**values, **target_tags(target)}
+    return merged, errors
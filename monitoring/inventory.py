@@ -0,0 +1,301 @@
+# monitoring/inventory.py
+"""
+Cache d'inventaire AWS partagé (describe_instances / list_buckets).
+
+Toutes les pages du frontend interrogent l'inventaire toutes les 10 s : le cache
+sert les lectures depuis la mémoire pendant INVENTORY_CACHE_TTL secondes, puis
+continue de servir la valeur périmée pendant INVENTORY_CACHE_STALE secondes tout
+en la rafraîchissant en arrière-plan. Un seul rafraîchissement par clé est en
+cours à la fois : les appelants concurrents attendent son résultat.
+
+Chaque entrée est propre à une cible (compte, région) ; les fonctions *_multi
+interrogent plusieurs cibles en parallèle (aws_clients.fan_out) et étiquettent
+chaque élément avec son compte et sa région.
+
+invalidate() (après une création / suppression) prévient aussi les abonnés enregistrés
+par on_invalidate() : le canal push republie alors l'inventaire sans attendre.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from prometheus_client import Counter
+
+from aws_clients import DEFAULT_ACCOUNT, DEFAULT_TARGET, Target, fan_out, get_client, target_tags
+from extensions import metrics
+from observability import propagate
+
+INVENTORY_CACHE_TTL = float(os.getenv("INVENTORY_CACHE_TTL", "15"))
+INVENTORY_CACHE_STALE = float(os.getenv("INVENTORY_CACHE_STALE", "60"))
+S3_LOCATION_WORKERS = int(os.getenv("S3_LOCATION_WORKERS", "8"))
+
+CACHE_EVENTS = Counter(
+    "inventory_cache_events_total",
+    "Événements du cache d'inventaire AWS (hit, stale, miss, refresh, error)",
+    ["resource", "event"],
+    registry=metrics.registry
+)
+
+
+def _resource(key):
+    return key[0] if isinstance(key, tuple) else key
+
+
+class _Flight:
+    """Rafraîchissement en cours pour une clé (single-flight)."""
+    __slots__ = ("done", "value", "error", "epoch")
+
+    def __init__(self, epoch):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.epoch = epoch
+
+
+class InventoryCache:
+    def __init__(self, ttl=INVENTORY_CACHE_TTL, stale_ttl=INVENTORY_CACHE_STALE):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = {}    # key -> (value, fetched_at)
+        self._inflight = {}   # key -> _Flight
+        self._epochs = {}     # resource -> compteur d'invalidation
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """Renvoie la valeur de `key`, en appelant `loader()` au plus une fois en parallèle."""
+        resource = _resource(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            age = time.monotonic() - entry[1] if entry else None
+
+            if entry and age < self.ttl:
+                CACHE_EVENTS.labels(resource, "hit").inc()
+                return entry[0]
+
+            if entry and age < self.ttl + self.stale_ttl:
+                # stale-while-revalidate : on répond tout de suite, refresh en fond
+                CACHE_EVENTS.labels(resource, "stale").inc()
+                if key not in self._inflight:
+                    flight = self._start_flight(key)
+                    threading.Thread(
+                        target=self._refresh, args=(key, loader, flight), daemon=True
+                    ).start()
+                return entry[0]
+
+            CACHE_EVENTS.labels(resource, "miss").inc()
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._start_flight(key)
+
+        if leader:
+            self._refresh(key, loader, flight)
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def invalidate(self, resource):
+        """Oublie toutes les entrées d'une ressource ('ec2', 's3') après une mutation."""
+        with self._lock:
+            self._epochs[resource] = self._epochs.get(resource, 0) + 1
+            for key in [k for k in self._entries if _resource(k) == resource]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            for resource in {_resource(k) for k in self._entries}:
+                self._epochs[resource] = self._epochs.get(resource, 0) + 1
+            self._entries.clear()
+
+    def _start_flight(self, key):
+        flight = _Flight(self._epochs.get(_resource(key), 0))
+        self._inflight[key] = flight
+        return flight
+
+    def _refresh(self, key, loader, flight):
+        resource = _resource(key)
+        CACHE_EVENTS.labels(resource, "refresh").inc()
+        try:
+            flight.value = loader()
+        except Exception as e:
+            CACHE_EVENTS.labels(resource, "error").inc()
+            flight.error = e
+
+        with self._lock:
+            # une invalidation pendant l'appel AWS rend le résultat douteux : on ne le garde pas
+            if flight.error is None and self._epochs.get(resource, 0) == flight.epoch:
+                self._entries[key] = (flight.value, time.monotonic())
+            self._inflight.pop(key, None)
+        flight.done.set()
+
+
+cache = InventoryCache()
+_listeners = []
+
+
+def on_invalidate(fn):
+    """fn(resource) appelée à chaque invalidate() notifiée."""
+    _listeners.append(fn)
+
+
+def invalidate(resource, notify=True):
+    cache.invalidate(resource)
+    if resource == "s3":
+        with _locations_lock:
+            _locations.clear()
+    if notify:
+        for fn in _listeners:
+            fn(resource)
+
+
+# ------------------------------
+# LOADERS
+# ------------------------------
+
+# bornes de MaxResults pour DescribeInstances
+EC2_PAGE_MIN = 5
+EC2_PAGE_MAX = 1000
+
+
+def build_ec2_filters(state=None, tag=None):
+    """
+    Filtres DescribeInstances côté serveur.
+    state: "running" ou "running,stopped" ; tag: "Clé=Valeur" ou "Clé" (présence du tag)
+    """
+    filters = []
+    if state:
+        filters.append({"Name": "instance-state-name", "Values": state.split(",")})
+    if tag:
+        key, _, value = tag.partition("=")
+        if value:
+            filters.append({"Name": f"tag:{key}", "Values": [value]})
+        else:
+            filters.append({"Name": "tag-key", "Values": [key]})
+    return filters
+
+
+def _instance_summary(inst):
+    return {
+        "instanceId": inst["InstanceId"],
+        "state": inst["State"]["Name"],
+        "name": next((t["Value"] for t in inst.get("Tags", []) if t["Key"] == "Name"), None)
+    }
+
+
+def iter_ec2_pages(filters=None, page_size=None, cursor=None, target=DEFAULT_TARGET):
+    """
+    Parcourt DescribeInstances page par page via le paginator boto3, pour une cible (compte, région).
+    Produit (instances, next_cursor) ; next_cursor est le NextToken AWS (None en fin de liste).
+    """
+    config = {}
+    if page_size:
+        config["PageSize"] = max(EC2_PAGE_MIN, min(int(page_size), EC2_PAGE_MAX))
+    if cursor:
+        config["StartingToken"] = cursor
+
+    paginator = get_client("ec2", target.region, target.account).get_paginator("describe_instances")
+    for page in paginator.paginate(Filters=filters or [], PaginationConfig=config):
+        instances = [
+            _instance_summary(inst)
+            for res in page.get("Reservations", [])
+            for inst in res.get("Instances", [])
+        ]
+        yield instances, page.get("NextToken")
+
+
+def iter_ec2_instances(filters=None, target=DEFAULT_TARGET):
+    """Toutes les instances correspondant aux filtres, sans tout garder en mémoire."""
+    for instances, _ in iter_ec2_pages(filters, target=target):
+        yield from instances
+
+
+def page_ec2_instances(filters=None, limit=None, cursor=None, target=DEFAULT_TARGET):
+    """Une seule page : renvoie (instances, next_cursor)."""
+    for instances, next_cursor in iter_ec2_pages(filters, page_size=limit, cursor=cursor, target=target):
+        return instances, next_cursor
+    return [], None
+
+
+def _load_s3_buckets(account):
+    s3s = get_client("s3", account=account).list_buckets()
+    return [{"name": b["Name"]} for b in s3s.get("Buckets", [])]
+
+
+def list_ec2_instances(state=None, tag=None, target=DEFAULT_TARGET):
+    """
+    Instances EC2 [{instanceId, state, name}] filtrées côté AWS, mises en cache par filtre
+    et par cible (partagé entre /monitor/ec2/list et /deploy/summary).
+    """
+    filters = build_ec2_filters(state, tag)
+    return cache.get(("ec2", state, tag, target), lambda: list(iter_ec2_instances(filters, target)))
+
+
+def list_s3_buckets(account=DEFAULT_ACCOUNT):
+    """Buckets S3 [{name}] d'un compte (ListBuckets est global : toutes régions confondues)."""
+    return cache.get(("s3", account), lambda: _load_s3_buckets(account))
+
+
+# région d'un bucket : ne change pas tant qu'il existe, gardée jusqu'à invalidate("s3")
+_locations = {}
+_locations_lock = threading.Lock()
+_location_pool = ThreadPoolExecutor(S3_LOCATION_WORKERS, thread_name_prefix="s3-location")
+
+
+def _bucket_region(account, name):
+    with _locations_lock:
+        region = _locations.get((account, name))
+    if region is None:
+        resp = get_client("s3", account=account).get_bucket_location(Bucket=name)
+        # us-east-1 renvoie une contrainte vide, les très anciens buckets eu-west-1 "EU"
+        region = {None: "us-east-1", "": "us-east-1", "EU": "eu-west-1"}.get(
+            resp.get("LocationConstraint"), resp.get("LocationConstraint")
+        )
+        with _locations_lock:
+            _locations[(account, name)] = region
+    return region
+
+
+# ------------------------------
+# FAN-OUT
+# ------------------------------
+
+def list_ec2_instances_multi(targets, state=None, tag=None):
+    """Instances de plusieurs cibles en parallèle : (instances étiquetées account/region, erreurs)."""
+    results, errors = fan_out(lambda t: list_ec2_instances(state, tag, t), targets)
+    instances = [
+        {**inst, **target_tags(target)}
+        for target, part in results
+        for inst in part
+    ]
+    return instances, errors
+
+
+def list_s3_buckets_multi(accounts, regions=None):
+    """
+    Buckets de plusieurs comptes en parallèle : (buckets étiquetés account[/region], erreurs).
+    Avec `regions`, chaque bucket est localisé (GetBucketLocation, mis en cache) et filtré.
+    """
+    def load(target):
+        buckets = list_s3_buckets(target.account)
+        if regions is None:
+            return buckets
+        # une copie de contexte par appel : spans GetBucketLocation rattachés à la requête
+        located = [
+            _location_pool.submit(propagate(_bucket_region), target.account, b["name"]) for b in buckets
+        ]
+        return [{**b, "region": f.result()} for b, f in zip(buckets, located) if f.result() in regions]
+
+    # ListBuckets est global : une cible par compte, la région ne sert qu'au tag
+    results, errors = fan_out(load, [Target(a, "global") for a in accounts])
+    buckets = [
+        {**b, "account": target.account}
+        for target, part in results
+        for b in part
+    ]
+    for error in errors:
+        error.pop("region", None)
+    return buckets, errors
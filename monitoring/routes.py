@@ -1,49 +1,222 @@
 
 # monitoring/routes.py
-from flask import Blueprint, request, jsonify
-from monitoring.cloudwatch_manager import get_ec2_metrics, get_s3_metrics
-import os
-import boto3
-import app_state  # <-- lire la reco partagée
-
-AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
-ec2_client = boto3.client('ec2', region_name=AWS_REGION)
-s3_client = boto3.client('s3', region_name=AWS_REGION)
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from monitoring.cloudwatch_manager import (
+    get_ec2_metrics,
+    get_s3_metrics,
+    get_ec2_metrics_batch,
+    get_s3_metrics_batch,
+    get_metrics_multi
+)
+from monitoring.inventory import (
+    list_ec2_instances,
+    list_s3_buckets,
+    list_ec2_instances_multi,
+    list_s3_buckets_multi,
+    build_ec2_filters,
+    iter_ec2_pages,
+    page_ec2_instances
+)
+from monitoring.timeseries import store, METRIC_KEYS
+from aws_clients import INSTANCE_ID_RE, resolve_accounts, resolve_regions, resolve_targets
+from datetime import datetime, timedelta
+import json
+from ai.recommendations import latest_recommendation
+from http_cache import conditional_json
+from time_utils import parse_time
 
 monitor_bp = Blueprint("monitor", __name__)
 status_bp = Blueprint("status", __name__)
 
+def _single_target(regions, accounts):
+    """Une seule cible (compte, région) : pour les routes qui ne fusionnent pas."""
+    targets = resolve_targets(regions, accounts)
+    if len(targets) != 1:
+        raise ValueError("une seule région et un seul compte pour cette requête")
+    return targets[0]
+
+
+def _batch_items(data, key, item_key):
+    """
+    Entrées d'un body batch : chaînes (cible par défaut du body : "region"/"account")
+    ou objets {item_key, "region", "account"}. Renvoie [(nom, Target)].
+    """
+    values = data.get(key)
+    if not values or not isinstance(values, list):
+        raise ValueError(f"{key} manquant")
+    default = _single_target(data.get("region"), data.get("account"))
+    items = []
+    for value in values:
+        if isinstance(value, dict):
+            name = value.get(item_key)
+            target = _single_target(value.get("region", default.region), value.get("account", default.account))
+        else:
+            name, target = value, default
+        if not name or not isinstance(name, str):
+            raise ValueError(f"{key} invalide")
+        items.append((name, target))
+    return items
+
+
+def _multi_response(payload, errors, targets, items_key=None, key=None):
+    """
+    Résultats fusionnés ; erreurs par cible en plus, 502 si aucune cible n'a répondu.
+    Avec items_key : réponse conditionnelle (ETag, ?since=) sur cette collection.
+    """
+    if errors:
+        payload["errors"] = errors
+    if len(errors) == len(targets):
+        return jsonify(payload), 502
+    if items_key is None:
+        return jsonify(payload), 200
+    return conditional_json(payload, items_key, key)
+
+
+def _instance_key(inst):
+    return inst["instanceId"]
+
+
+def _bucket_key(bucket):
+    return bucket["name"]
+
+
+def _fanout_requested():
+    return "regions" in request.args or "accounts" in request.args
+
+
 # ------------------------------
 # EC2 METRICS
 # ------------------------------
 
 @monitor_bp.route("/metrics/ec2", methods=["POST"])
 def metrics_ec2():
-    instance_id = request.json.get("instance_id")
+    data = request.get_json(silent=True) or {}
+    instance_id = data.get("instance_id")
     if not instance_id:
         return jsonify({"error": "instance_id manquant"}), 400
-    result = get_ec2_metrics(instance_id)
+    try:
+        target = _single_target(data.get("region"), data.get("account"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    result = get_ec2_metrics(instance_id, target=target)
     return jsonify(result)
 
+@monitor_bp.route("/metrics/ec2/batch", methods=["POST"])
+def metrics_ec2_batch():
+    """
+    Métriques de plusieurs instances : un appel GetMetricData (pagination incluse) par cible,
+    cibles interrogées en parallèle.
+    Body: {"instance_ids": ["i-...", {"instance_id": "i-...", "region": "eu-west-1", "account": "prod"}],
+           "region": ..., "account": ...}   (region/account : cible par défaut des chaînes)
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        items = _batch_items(data, "instance_ids", "instance_id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        metrics, errors = get_metrics_multi(get_ec2_metrics_batch, items)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return _multi_response({"metrics": metrics}, errors, {t for _, t in items})
+
 # ⚠️ Corrige: pas d'entités HTML ici
 @monitor_bp.route("/ec2/<instance_id>", methods=["GET"])
 def monitor_ec2(instance_id):
-    result = get_ec2_metrics(instance_id)
-    return jsonify(result)
+    """
+    Valeurs courantes, ou historique avec from/to/step — servis par le stockage local
+    (monitoring/timeseries.py), qui ne demande à CloudWatch que les points manquants.
+    Query: from=<ISO|epoch> (défaut to - 1 h), to=<ISO|epoch> (défaut maintenant),
+           step=<secondes> (multiple de METRICS_PERIOD), metrics=CPUUtilization,NetworkIn,
+           region=..., account=...
+    """
+    if not INSTANCE_ID_RE.match(instance_id):
+        # ni appel CloudWatch ni série en mémoire pour un id qui ne peut pas exister
+        return jsonify({"error": "instance_id invalide"}), 400
+    try:
+        target = _single_target(request.args.get("region"), request.args.get("account"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not any(k in request.args for k in ("from", "to", "step")):
+        return jsonify(store.latest(instance_id, target=target))
+
+    try:
+        end = parse_time(request.args["to"]) if "to" in request.args else datetime.utcnow()
+        start = parse_time(request.args["from"]) if "from" in request.args else end - timedelta(hours=1)
+        step = request.args.get("step", type=int)
+        keys = [k for k in request.args.get("metrics", "").split(",") if k] or None
+        if start >= end:
+            raise ValueError("from doit précéder to")
+        if step is not None and step <= 0:
+            raise ValueError("step invalide")
+        if keys and any(k not in METRIC_KEYS for k in keys):
+            raise ValueError(f"metrics inconnue (parmi {', '.join(METRIC_KEYS)})")
+        result = store.range(instance_id, start, end, step=step, keys=keys, target=target)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"instance_id": instance_id, **result})
 
 @monitor_bp.route("/ec2/list", methods=["GET"])
 def list_ec2():
-    ec2s = ec2_client.describe_instances()
-    instances = [
-        {
-            "instanceId": inst["InstanceId"],
-            "state": inst["State"]["Name"],
-            "name": next((t["Value"] for t in inst.get("Tags", []) if t["Key"] == "Name"), None)
-        }
-        for res in ec2s.get("Reservations", [])
-        for inst in res.get("Instances", [])
-    ]
-    return jsonify({"instances": instances})
+    """
+    Inventaire EC2 (paginator boto3, filtres appliqués côté AWS).
+    Query: state=running[,stopped], tag=Clé[=Valeur], limit=N, cursor=<token>, format=ndjson
+    - sans limit/cursor : liste complète, servie par le cache d'inventaire
+    - avec limit/cursor : une page + "cursor" pour la page suivante
+    - format=ndjson (ou Accept: application/x-ndjson) : une instance par ligne, en streaming
+    - regions=a,b|all, accounts=prod,dev|all : cibles interrogées en parallèle, instances
+      étiquetées account/region, "errors" pour les cibles en échec ou trop lentes
+      (limit/cursor/ndjson : une seule cible)
+    - liste complète : ETag (If-None-Match -> 304) et ?since=<version> pour ne recevoir
+      que les instances ajoutées/modifiées/supprimées (http_cache.py)
+    """
+    state = request.args.get("state")
+    tag = request.args.get("tag")
+    limit = request.args.get("limit", type=int)
+    cursor = request.args.get("cursor")
+    if limit is not None and limit <= 0:
+        return jsonify({"error": "limit invalide"}), 400
+
+    try:
+        targets = resolve_targets(request.args.get("regions"), request.args.get("accounts"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    ndjson = (
+        request.args.get("format") == "ndjson"
+        or request.accept_mimetypes.best == "application/x-ndjson"
+    )
+    if (ndjson or limit or cursor) and len(targets) > 1:
+        return jsonify({"error": "pagination et ndjson : une seule région et un seul compte"}), 400
+    target = targets[0]
+
+    if ndjson:
+        filters = build_ec2_filters(state, tag)
+
+        def generate():
+            for instances, next_cursor in iter_ec2_pages(filters, page_size=limit, cursor=cursor, target=target):
+                for inst in instances:
+                    yield json.dumps(inst) + "\n"
+                if limit:
+                    # mode paginé : dernière ligne = curseur de la page suivante
+                    yield json.dumps({"cursor": next_cursor}) + "\n"
+                    return
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    if limit or cursor:
+        instances, next_cursor = page_ec2_instances(build_ec2_filters(state, tag), limit, cursor, target=target)
+        return jsonify({"instances": instances, "cursor": next_cursor})
+
+    if _fanout_requested():
+        instances, errors = list_ec2_instances_multi(targets, state=state, tag=tag)
+        return _multi_response({"instances": instances}, errors, targets, "instances", _instance_key)
+
+    return conditional_json({"instances": list_ec2_instances(state=state, tag=tag)}, "instances", _instance_key)
 
 # ------------------------------
 # S3 METRICS
@@ -51,23 +224,63 @@ def list_ec2():
 
 @monitor_bp.route("/metrics/s3", methods=["POST"])
 def metrics_s3():
-    bucket_name = request.json.get("bucket_name")
+    data = request.get_json(silent=True) or {}
+    bucket_name = data.get("bucket_name")
     if not bucket_name:
         return jsonify({"error": "bucket_name manquant"}), 400
-    result = get_s3_metrics(bucket_name)
+    try:
+        target = _single_target(data.get("region"), data.get("account"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    result = get_s3_metrics(bucket_name, target=target)
     return jsonify(result)
 
+@monitor_bp.route("/metrics/s3/batch", methods=["POST"])
+def metrics_s3_batch():
+    """
+    Métriques de plusieurs buckets : un appel GetMetricData par cible (région du bucket),
+    cibles interrogées en parallèle.
+    Body: {"bucket_names": ["bucket-a", {"bucket_name": "bucket-b", "region": "eu-west-1"}], "region": ..., "account": ...}
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        items = _batch_items(data, "bucket_names", "bucket_name")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        metrics, errors = get_metrics_multi(get_s3_metrics_batch, items)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return _multi_response({"metrics": metrics}, errors, {t for _, t in items})
+
 # ⚠️ Corrige: pas d'entités HTML ici
 @monitor_bp.route("/s3/<bucket_name>", methods=["GET"])
 def monitor_s3(bucket_name):
-    result = get_s3_metrics(bucket_name)
+    try:
+        target = _single_target(request.args.get("region"), request.args.get("account"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    result = get_s3_metrics(bucket_name, target=target)
     return jsonify(result)
 
 @monitor_bp.route("/s3/list", methods=["GET"])
 def list_s3():
-    s3s = s3_client.list_buckets()
-    buckets = [{"name": b["Name"]} for b in s3s.get("Buckets", [])]
-    return jsonify({"buckets": buckets})
+    """
+    Query: accounts=prod,dev|all : comptes interrogés en parallèle, buckets étiquetés account ;
+    regions=a,b|all : filtre sur la région de chaque bucket (GetBucketLocation, mis en cache).
+    ETag (If-None-Match -> 304) et ?since=<version> comme /monitor/ec2/list.
+    """
+    if not _fanout_requested():
+        return conditional_json({"buckets": list_s3_buckets()}, "buckets", _bucket_key)
+
+    try:
+        accounts = resolve_accounts(request.args.get("accounts"))
+        regions = resolve_regions(request.args["regions"]) if "regions" in request.args else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    buckets, errors = list_s3_buckets_multi(accounts, regions)
+    return _multi_response({"buckets": buckets}, errors, accounts, "buckets", _bucket_key)
 
 # ------------------------------
 # STATUS (Dashboard)
@@ -75,7 +288,7 @@ def list_s3():
 
 @status_bp.route("/status", methods=["GET"])
 def status():
-    return jsonify({
+    return conditional_json({
         "status": "ok",
-        "last_ai": app_state.last_ai_recommendation  # ✅ lit le store partagé
+        "last_ai": latest_recommendation()  # ✅ lecture indexée de la table Recommendation
     })
@@ -0,0 +1,332 @@
+# monitoring/timeseries.py
+"""
+Séries CloudWatch EC2 conservées localement (table metric_point) et remplies de façon incrémentale.
+
+- premier accès à une instance : METRICS_BACKFILL secondes d'historique en un GetMetricData ;
+- ensuite au plus un GetMetricData par instance toutes les METRICS_REFRESH secondes, limité
+  à l'intervalle depuis le dernier point stocké (moins METRICS_SETTLE : CloudWatch publie
+  avec retard et peut compléter les dernières périodes) ;
+- une plage demandée plus ancienne que l'historique déclenche le remplissage du seul trou ;
+- les METRICS_RING_SIZE derniers points de chaque série restent en mémoire : la valeur
+  courante et les plages récentes ne lisent pas la base. Au plus METRICS_MAX_SERIES
+  instances sont gardées (LRU) ; une instance oubliée est rechargée depuis la base.
+
+Les points sont à la résolution METRICS_PERIOD (300 s, statistiques de EC2_METRICS) ;
+range() rééchantillonne côté serveur (moyenne pour Average, somme pour Sum).
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+from prometheus_client import Counter
+
+from auth.models import MetricPoint
+from aws_clients import DEFAULT_TARGET
+from extensions import db, metrics
+from monitoring.cloudwatch_manager import EC2_METRICS, ec2_series_queries, fetch_metric_series
+
+METRICS_PERIOD = int(os.getenv("METRICS_PERIOD", "300"))
+METRICS_REFRESH = float(os.getenv("METRICS_REFRESH", "60"))
+METRICS_BACKFILL = int(os.getenv("METRICS_BACKFILL", "10800"))
+METRICS_SETTLE = int(os.getenv("METRICS_SETTLE", "900"))
+METRICS_RING_SIZE = int(os.getenv("METRICS_RING_SIZE", "288"))
+# instances gardées en mémoire (l'id vient de l'URL : sans borne, le dict grossit sans fin)
+METRICS_MAX_SERIES = int(os.getenv("METRICS_MAX_SERIES", "2048"))
+METRICS_RETENTION_DAYS = float(os.getenv("METRICS_RETENTION_DAYS", "30"))
+# la valeur courante doit dater de moins de 10 min, comme l'ancienne fenêtre de get_ec2_metrics
+METRICS_LATEST_WINDOW = int(os.getenv("METRICS_LATEST_WINDOW", "600"))
+# nombre maximal de points par série renvoyés par range()
+MAX_RANGE_POINTS = 1440
+PRUNE_INTERVAL = 3600
+
+METRIC_KEYS = [key for key, _, _ in EC2_METRICS]
+_STATS = {key: stat for key, _, stat in EC2_METRICS}
+
+STORE_FETCHES = Counter(
+    "metrics_store_fetches_total",
+    "GetMetricData émis par le stockage local, par motif (initial, forward, backfill)",
+    ["reason"],
+    registry=metrics.registry
+)
+STORE_READS = Counter(
+    "metrics_store_reads_total",
+    "Lectures de séries servies par le stockage local, par source (ring, db)",
+    ["source"],
+    registry=metrics.registry
+)
+
+
+def _floor(dt, step):
+    epoch = dt.timestamp() if dt.tzinfo else (dt - datetime(1970, 1, 1)).total_seconds()
+    return datetime(1970, 1, 1) + timedelta(seconds=math.floor(epoch / step) * step)
+
+
+class _Series:
+    """État d'une instance : couverture déjà récupérée + anneaux des derniers points par métrique."""
+    __slots__ = ("lock", "low", "last_ts", "fetched_to", "fetched_at", "rings", "ring_from")
+
+    def __init__(self, ring_size):
+        self.lock = threading.Lock()
+        self.low = None          # début de la plage récupérée
+        self.last_ts = None      # dernier point stocké
+        self.fetched_to = None   # fin du dernier GetMetricData
+        self.fetched_at = 0.0    # time.monotonic() du dernier GetMetricData vers le présent
+        self.rings = {key: deque(maxlen=ring_size) for key in METRIC_KEYS}
+        self.ring_from = None    # les anneaux contiennent tous les points depuis cette date
+
+    def ring_start(self):
+        # un anneau plein a perdu ses plus anciens points
+        full = [ring[0][0] for ring in self.rings.values() if len(ring) == ring.maxlen]
+        if self.ring_from is None:
+            return None
+        return max([self.ring_from] + full)
+
+
+class MetricStore:
+    def __init__(self, period=METRICS_PERIOD, refresh=METRICS_REFRESH, backfill=METRICS_BACKFILL,
+                 settle=METRICS_SETTLE, ring_size=METRICS_RING_SIZE, max_series=METRICS_MAX_SERIES):
+        self.period = period
+        self.refresh = refresh
+        self.backfill = timedelta(seconds=backfill)
+        self.settle = timedelta(seconds=settle)
+        self.ring_size = ring_size
+        self.max_series = max_series
+        self._series = OrderedDict()   # (target, instance_id) -> _Series, du moins au plus récent
+        self._lock = threading.Lock()
+        self._pruned_at = 0.0
+
+    # ------------------------------
+    # LECTURES
+    # ------------------------------
+
+    def latest(self, instance_id, target=DEFAULT_TARGET):
+        """Même forme que get_ec2_metrics : dernière valeur de chaque métrique (0 si pas de donnée récente)."""
+        series = self.sync(instance_id, target)
+        recent = datetime.utcnow() - timedelta(seconds=METRICS_LATEST_WINDOW)
+        STORE_READS.labels("ring").inc()
+        with series.lock:
+            return {
+                key: ring[-1][1] if ring and ring[-1][0] >= recent else 0
+                for key, ring in series.rings.items()
+            }
+
+    def range(self, instance_id, start, end, step=None, keys=None, target=DEFAULT_TARGET):
+        """
+        Séries rééchantillonnées sur [start, end[ par pas de `step` secondes (multiple de la période).
+        Renvoie {"timestamps": [...], "series": {métrique: [valeur ou None, ...]}}.
+        """
+        keys = keys or METRIC_KEYS
+        step = max(self.period, int(math.ceil((step or self.period) / self.period)) * self.period)
+        start = _floor(start, step)
+        if (end - start).total_seconds() / step > MAX_RANGE_POINTS:
+            raise ValueError(f"plage trop longue pour ce pas (max {MAX_RANGE_POINTS} points)")
+
+        series = self.sync(instance_id, target, start)
+        points = self._points_from_ring(series, keys, start, end)
+        if points is None:
+            points = self._points_from_db(instance_id, target, keys, start, end)
+
+        buckets = []
+        t = start
+        while t < end:
+            buckets.append(t)
+            t += timedelta(seconds=step)
+        index = {b: i for i, b in enumerate(buckets)}
+
+        out = {}
+        for key in keys:
+            sums = [None] * len(buckets)
+            counts = [0] * len(buckets)
+            for ts, value in points.get(key, []):
+                i = index.get(_floor(ts, step))
+                if i is None:
+                    continue
+                sums[i] = (sums[i] or 0) + value
+                counts[i] += 1
+            if _STATS[key] == "Average":
+                sums = [s / c if c else None for s, c in zip(sums, counts)]
+            out[key] = sums
+
+        return {
+            "timestamps": [b.isoformat() + "Z" for b in buckets],
+            "step": step,
+            "series": out
+        }
+
+    def _points_from_ring(self, series, keys, start, end):
+        with series.lock:
+            ring_start = series.ring_start()
+            if ring_start is None or ring_start > start:
+                return None
+            points = {
+                key: [(ts, v) for ts, v in series.rings[key] if start <= ts < end]
+                for key in keys
+            }
+        STORE_READS.labels("ring").inc()
+        return points
+
+    def _points_from_db(self, instance_id, target, keys, start, end):
+        rows = db.session.query(MetricPoint.metric, MetricPoint.ts, MetricPoint.value).filter(
+            MetricPoint.instance_id == instance_id,
+            MetricPoint.region == target.region,
+            MetricPoint.account == target.account,
+            MetricPoint.metric.in_(keys),
+            MetricPoint.ts >= start,
+            MetricPoint.ts < end
+        ).order_by(MetricPoint.ts).all()
+        STORE_READS.labels("db").inc()
+        points = {}
+        for metric, ts, value in rows:
+            points.setdefault(metric, []).append((ts, value))
+        return points
+
+    # ------------------------------
+    # SYNCHRONISATION
+    # ------------------------------
+
+    def sync(self, instance_id, target=DEFAULT_TARGET, start=None):
+        """Récupère ce qui manque (trou vers le passé jusqu'à `start`, et/ou points récents)."""
+        series = self._get_series(instance_id, target)
+        now = datetime.utcnow()
+        if start is not None:
+            start = max(start, now - timedelta(days=METRICS_RETENTION_DAYS))
+        with series.lock:
+            windows = []
+            if series.low is None:
+                low = _floor(min(start or now, now - self.backfill), self.period)
+                windows.append(("initial", low, now))
+            else:
+                if start is not None and start < series.low:
+                    windows.append(("backfill", _floor(start, self.period), series.low))
+                if time.monotonic() - series.fetched_at >= self.refresh:
+                    forward = max(series.last_ts or series.low, series.fetched_to - self.settle)
+                    windows.append(("forward", _floor(forward, self.period), now))
+
+            for reason, window_start, window_end in windows:
+                self._fetch(series, instance_id, target, reason, window_start, window_end)
+        self._maybe_prune()
+        return series
+
+    def _fetch(self, series, instance_id, target, reason, start, end):
+        STORE_FETCHES.labels(reason).inc()
+        fetched = fetch_metric_series(
+            ec2_series_queries(instance_id, self.period), start, end, target=target
+        )
+        points = {key: fetched.get(f"m{j}", []) for j, key in enumerate(METRIC_KEYS)}
+        self._write(instance_id, target, start, end, points)
+
+        previous_low = series.low
+        series.low = start if series.low is None else min(series.low, start)
+        if reason != "backfill":
+            series.fetched_to = end
+            series.fetched_at = time.monotonic()
+        newest = max((p[-1][0] for p in points.values() if p), default=None)
+        if newest and (series.last_ts is None or newest > series.last_ts):
+            series.last_ts = newest
+
+        if reason == "initial":
+            series.ring_from = start
+        elif reason == "backfill":
+            # l'anneau n'est prolongé vers le passé que s'il couvrait déjà tout l'historique
+            if series.ring_from != previous_low:
+                return
+            series.ring_from = start
+
+        for key, new in points.items():
+            ring = series.rings[key]
+            if reason == "backfill":
+                merged = new + list(ring)
+            else:
+                merged = [p for p in ring if p[0] < start] + new
+            ring.clear()
+            ring.extend(merged)
+
+    def _write(self, instance_id, target, start, end, points):
+        """Remplace les points de la fenêtre (les dernières périodes peuvent avoir été complétées)."""
+        rows = [
+            {
+                "account": target.account,
+                "region": target.region,
+                "instance_id": instance_id,
+                "metric": key,
+                "ts": ts,
+                "value": value
+            }
+            for key, values in points.items()
+            for ts, value in values
+        ]
+        try:
+            MetricPoint.query.filter(
+                MetricPoint.instance_id == instance_id,
+                MetricPoint.region == target.region,
+                MetricPoint.account == target.account,
+                MetricPoint.ts >= start,
+                MetricPoint.ts < end
+            ).delete(synchronize_session=False)
+            if rows:
+                db.session.bulk_insert_mappings(MetricPoint, rows)
+            db.session.commit()
+        except sa.exc.IntegrityError:
+            # un autre process a écrit la même fenêtre entre-temps
+            db.session.rollback()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def _get_series(self, instance_id, target):
+        key = (target, instance_id)
+        with self._lock:
+            series = self._series.get(key)
+            if series is not None:
+                self._series.move_to_end(key)
+                return series
+            series = self._series[key] = _Series(self.ring_size)
+            while len(self._series) > self.max_series:
+                # les points restent en base : une instance évincée est rechargée par _load
+                self._series.popitem(last=False)
+            self._load(series, instance_id, target)
+        return series
+
+    def _load(self, series, instance_id, target):
+        """Reprend la couverture et les derniers points déjà en base (redémarrage)."""
+        low, high = db.session.query(sa.func.min(MetricPoint.ts), sa.func.max(MetricPoint.ts)).filter(
+            MetricPoint.instance_id == instance_id,
+            MetricPoint.region == target.region,
+            MetricPoint.account == target.account
+        ).one()
+        if low is None:
+            return
+        series.low, series.last_ts, series.fetched_to = low, high, high
+        since = high - timedelta(seconds=self.period * self.ring_size)
+        series.ring_from = max(low, since)
+        for metric, ts, value in db.session.query(MetricPoint.metric, MetricPoint.ts, MetricPoint.value).filter(
+            MetricPoint.instance_id == instance_id,
+            MetricPoint.region == target.region,
+            MetricPoint.account == target.account,
+            MetricPoint.ts >= series.ring_from
+        ).order_by(MetricPoint.ts):
+            if metric in series.rings:
+                series.rings[metric].append((ts, value))
+
+    def _maybe_prune(self):
+        if time.monotonic() - self._pruned_at < PRUNE_INTERVAL:
+            return
+        self._pruned_at = time.monotonic()
+        cutoff = datetime.utcnow() - timedelta(days=METRICS_RETENTION_DAYS)
+        try:
+            MetricPoint.query.filter(MetricPoint.ts < cutoff).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        with self._lock:
+            for series in self._series.values():
+                if series.low is not None and series.low < cutoff:
+                    series.low = cutoff
+
+
+store = MetricStore()
@@ -0,0 +1,5 @@
+# observability/__init__.py
+from .routes import observability_bp
+from .tracing import init_tracing, propagate, span
+
+__all__ = ['observability_bp', 'init_tracing', 'propagate', 'span']
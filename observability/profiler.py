@@ -0,0 +1,76 @@
+# observability/profiler.py
+"""
+Profileur par échantillonnage, à la demande : toutes les `interval` secondes, la pile de
+chaque thread du process (sys._current_frames) est relevée ; le résultat est au format
+« folded stacks » (une ligne "thread;f1;f2;...;fN nombre" par pile distincte), lu par
+flamegraph.pl, speedscope ou inferno.
+
+Sous gunicorn, seul le worker qui sert la requête est profilé. Les threads en attente
+(verrous, files, sockets) sont ignorés sauf `idle=True`.
+"""
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+
+# dernière fonction Python d'un thread qui attend (verrou, file, socket) au lieu de travailler
+IDLE_FUNCTIONS = {
+    "wait", "_wait_for_tstate_lock", "get", "select", "poll", "accept", "readinto", "recv_into",
+    "read", "_communicate",
+}
+
+# chemins raccourcis dans les libellés : projet, site-packages, bibliothèque standard
+_PREFIXES = sorted({
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    sysconfig.get_paths()["purelib"],
+    sysconfig.get_paths()["platlib"],
+    sysconfig.get_paths()["stdlib"],
+}, key=len, reverse=True)
+_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _label(code):
+    filename = code.co_filename
+    for prefix in _PREFIXES:
+        if filename.startswith(prefix + os.sep):
+            filename = filename[len(prefix) + 1:]
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def sample(seconds, interval=0.005, idle=False):
+    """Relève les piles pendant `seconds` ; renvoie (Counter {pile repliée: échantillons}, nb de relevés)."""
+    if not _lock.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        me = threading.get_ident()
+        stacks, ticks = Counter(), 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if not idle and frame.f_code.co_name in IDLE_FUNCTIONS:
+                    continue
+                parts = []
+                while frame is not None:
+                    parts.append(_label(frame.f_code))
+                    frame = frame.f_back
+                parts.append(names.get(ident, f"thread-{ident}"))
+                stacks[";".join(reversed(parts))] += 1
+            ticks += 1
+            time.sleep(interval)
+        return stacks, ticks
+    finally:
+        _lock.release()
+
+
+def folded(stacks):
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
@@ -0,0 +1,68 @@
+# observability/routes.py
+import logging
+
+from flask import Blueprint, Response, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from .profiler import ProfilerBusy, folded, sample
+from .tracing import TRACE_BUFFER_SIZE, recent_traces
+
+observability_bp = Blueprint("observability", __name__, url_prefix="/debug")
+logger = logging.getLogger(__name__)
+
+PROFILE_MAX_SECONDS = 60
+
+
+def _is_admin():
+    identity = get_jwt_identity()
+    return bool(identity) and identity.get('role') == 'admin'
+
+
+@observability_bp.route("/profile", methods=["POST"])
+@jwt_required()
+def profile():
+    """
+    Profil échantillonné du process pendant N secondes, au format folded stacks
+    (flamegraph.pl, speedscope...). Query: seconds=10 (max 60), interval_ms=5, idle=1
+    """
+    if not _is_admin():
+        return jsonify({"error": "Accès réservé aux administrateurs"}), 403
+
+    seconds = request.args.get("seconds", 10, type=float)
+    interval_ms = request.args.get("interval_ms", 5, type=float)
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        return jsonify({"error": f"seconds invalide (0 à {PROFILE_MAX_SECONDS})"}), 400
+    if not 1 <= interval_ms <= 1000:
+        return jsonify({"error": "interval_ms invalide (1 à 1000)"}), 400
+
+    try:
+        stacks, ticks = sample(seconds, interval_ms / 1000, idle=request.args.get("idle") == "1")
+    except ProfilerBusy:
+        return jsonify({"error": "Un profil est déjà en cours"}), 409
+    logger.info("Profil de %.0f s : %s relevés, %s piles distinctes", seconds, ticks, len(stacks))
+    return Response(folded(stacks), mimetype="text/plain", headers={
+        "X-Profile-Ticks": str(ticks),
+        "X-Profile-Samples": str(sum(stacks.values())),
+        "Content-Disposition": "inline; filename=profile.folded"
+    })
+
+
+@observability_bp.route("/traces", methods=["GET"])
+@jwt_required()
+def traces():
+    """
+    Dernières traces de requêtes (spans par dépendance) gardées en mémoire par ce process.
+    Query: route=/k8s/pods, min_ms=100, limit=50, spans=0 (résumé par dépendance seulement)
+    """
+    if not _is_admin():
+        return jsonify({"error": "Accès réservé aux administrateurs"}), 403
+
+    limit = request.args.get("limit", 50, type=int)
+    if not 1 <= limit <= TRACE_BUFFER_SIZE:
+        return jsonify({"error": f"limit invalide (1 à {TRACE_BUFFER_SIZE})"}), 400
+    return jsonify({"traces": recent_traces(
+        route=request.args.get("route"),
+        min_ms=request.args.get("min_ms", 0, type=float),
+        limit=limit,
+        spans=request.args.get("spans") != "0"
+    )})
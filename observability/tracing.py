@@ -0,0 +1,190 @@
+# observability/tracing.py
+"""
+Latence des dépendances et traces par requête.
+
+span(dependency, operation) mesure un appel sortant (Kubernetes, subprocess, étapes du
+modèle...) : dependency_call_seconds{dependency, operation} et
+dependency_errors_total{dependency, operation, error}. Les appels boto3 gardent leurs
+propres métriques (aws_api_call_seconds, aws_clients.py) et n'ajoutent que le span.
+
+Pendant une requête HTTP, chaque span est aussi ajouté à la trace de la requête
+(ContextVar) : la réponse porte X-Trace-Id et un en-tête Server-Timing (temps par
+dépendance, visible dans les outils du navigateur), et les TRACE_BUFFER_SIZE dernières
+traces restent lisibles via /debug/traces. Le travail confié à un pool de threads
+n'hérite pas du contexte : soumettre propagate(fn) pour le rattacher à la requête.
+"""
+import contextvars
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+from flask import g, request
+from prometheus_client import Counter, Histogram
+
+from extensions import metrics
+
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "500"))
+TRACE_SKIP_PATHS = {p for p in os.getenv("TRACE_SKIP_PATHS", "/metrics,/events").split(",") if p}
+
+DEPENDENCY_LATENCY = Histogram(
+    "dependency_call_seconds",
+    "Durée des appels aux dépendances (kubernetes, subprocess, model...)",
+    ["dependency", "operation"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    registry=metrics.registry
+)
+DEPENDENCY_ERRORS = Counter(
+    "dependency_errors_total",
+    "Appels aux dépendances en échec, par type d'erreur",
+    ["dependency", "operation", "error"],
+    registry=metrics.registry
+)
+
+_current = contextvars.ContextVar("cloudnetops_trace", default=None)
+_recent = deque(maxlen=TRACE_BUFFER_SIZE)
+
+
+class Trace:
+    def __init__(self, method, path):
+        self.id = request.headers.get("X-Request-Id") or uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.route = None
+        self.status = None
+        self.started_at = time.time()
+        self.duration_ms = None
+        self.spans = []
+        self.dropped = 0
+        self._t0 = time.perf_counter()
+
+    def add(self, dependency, operation, start, end, error):
+        if len(self.spans) >= TRACE_MAX_SPANS:
+            self.dropped += 1
+            return
+        self.spans.append({
+            "dependency": dependency,
+            "operation": operation,
+            "start_ms": round((start - self._t0) * 1000, 3),
+            "duration_ms": round((end - start) * 1000, 3),
+            "thread": threading.current_thread().name,
+            "error": error
+        })
+
+    def finish(self, status, route):
+        self.status = status
+        self.route = route
+        self.duration_ms = round((time.perf_counter() - self._t0) * 1000, 3)
+
+    def by_dependency(self):
+        """{dépendance: (appels, ms cumulées)} ; les appels parallèles se cumulent."""
+        totals = {}
+        for s in list(self.spans):
+            count, ms = totals.get(s["dependency"], (0, 0.0))
+            totals[s["dependency"]] = (count + 1, ms + s["duration_ms"])
+        return totals
+
+    def server_timing(self):
+        parts = [
+            f'{dep};dur={ms:.1f};desc="{count} appel(s)"'
+            for dep, (count, ms) in sorted(self.by_dependency().items())
+        ]
+        parts.append(f"total;dur={self.duration_ms:.1f}")
+        return ", ".join(parts)
+
+    def to_dict(self, spans=True):
+        data = {
+            "trace_id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "dependencies": {
+                dep: {"calls": count, "ms": round(ms, 3)} for dep, (count, ms) in self.by_dependency().items()
+            }
+        }
+        if spans:
+            data["spans"] = list(self.spans)
+            data["dropped_spans"] = self.dropped
+        return data
+
+
+def record(dependency, operation, start, error=None, observe=True):
+    """Termine un span commencé à `start` (perf_counter) : métriques + trace courante."""
+    end = time.perf_counter()
+    if observe:
+        DEPENDENCY_LATENCY.labels(dependency, operation).observe(end - start)
+        if error:
+            DEPENDENCY_ERRORS.labels(dependency, operation, error).inc()
+    trace = _current.get()
+    if trace is not None:
+        trace.add(dependency, operation, start, end, error)
+
+
+@contextmanager
+def span(dependency, operation):
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        record(dependency, operation, start, error)
+
+
+def propagate(fn):
+    """fn exécutée dans une copie du contexte courant (spans rattachés à la requête en cours)."""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+
+def recent_traces(route=None, min_ms=0, limit=50, spans=True):
+    """Dernières traces, de la plus récente à la plus ancienne."""
+    out = []
+    for trace in reversed(list(_recent)):
+        if route and trace.route != route:
+            continue
+        if (trace.duration_ms or 0) < min_ms:
+            continue
+        out.append(trace.to_dict(spans))
+        if len(out) >= limit:
+            break
+    return out
+
+
+def init_tracing(app):
+    app.before_request(_start_trace)
+    app.after_request(_finish_trace)
+    app.teardown_request(_reset_trace)
+
+
+def _start_trace():
+    if request.path in TRACE_SKIP_PATHS:
+        return
+    trace = Trace(request.method, request.path)
+    g.trace_token = _current.set(trace)
+    g.trace = trace
+
+
+def _finish_trace(response):
+    trace = g.get("trace")
+    if trace is None:
+        return response
+    trace.finish(response.status_code, request.url_rule.rule if request.url_rule else request.path)
+    response.headers["X-Trace-Id"] = trace.id
+    response.headers["Server-Timing"] = trace.server_timing()
+    _recent.append(trace)
+    return response
+
+
+def _reset_trace(exc=None):
+    token = g.pop("trace_token", None)
+    if token is not None:
+        _current.reset(token)
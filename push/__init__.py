@@ -0,0 +1,5 @@
+# push/__init__.py
+from .routes import push_bp
+from .hub import hub
+
+__all__ = ['push_bp', 'hub']
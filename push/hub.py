@@ -0,0 +1,358 @@
+# push/hub.py
+"""
+Hub de diffusion (Server-Sent Events).
+
+Chaque topic (ec2, s3, k8s, ai, metrics:<instance_id>) a un seul producteur qui
+calcule l'instantané toutes les PUSH_INTERVAL secondes, uniquement tant qu'il a
+des abonnés. L'instantané est comparé au précédent et seul le diff (JSON merge
+patch, RFC 7386) est sérialisé une fois puis déposé dans la file de chaque abonné.
+
+Contre-pression : la file d'un abonné est bornée (PUSH_QUEUE_SIZE). Si elle est
+pleine, on la vide et on y remet l'instantané complet de ses topics : un client
+lent saute des versions intermédiaires mais ne bloque jamais le producteur.
+
+Sous gunicorn (PUSH_SHARED_DIR défini), les producteurs ne tournent que dans le worker
+leader (run_publisher) ; les topics des autres workers lisent les instantanés publiés
+(push/shared.py). Un flux SSE occupe un thread du worker : au-delà de PUSH_MAX_STREAMS
+flux par worker, /events répond 503 et le client repasse en polling (/events/snapshot).
+"""
+import logging
+import json
+import os
+import queue
+import threading
+
+from prometheus_client import Counter, Gauge
+
+from extensions import metrics
+
+from .shared import PUSH_SHARED_POLL, SharedSnapshots
+
+logger = logging.getLogger(__name__)
+
+PUSH_INTERVAL = float(os.getenv("PUSH_INTERVAL", "10"))
+PUSH_QUEUE_SIZE = int(os.getenv("PUSH_QUEUE_SIZE", "32"))
+PUSH_SHARED_DIR = os.getenv("PUSH_SHARED_DIR")
+# flux SSE simultanés par process (0 = sans limite) ; gunicorn.conf.py : la moitié des threads
+PUSH_MAX_STREAMS = int(os.getenv("PUSH_MAX_STREAMS", "0"))
+
+PUSH_SUBSCRIBERS = Gauge(
+    "push_subscribers",
+    "Clients SSE connectés",
+    registry=metrics.registry
+)
+PUSH_PRODUCER_RUNS = Counter(
+    "push_producer_runs_total",
+    "Instantanés calculés par les producteurs de topics",
+    ["topic", "result"],
+    registry=metrics.registry
+)
+PUSH_MESSAGES = Counter(
+    "push_messages_total",
+    "Messages diffusés (snapshot, patch) par topic",
+    ["topic", "kind"],
+    registry=metrics.registry
+)
+PUSH_RESYNCS = Counter(
+    "push_resyncs_total",
+    "Files d'abonnés saturées, remplacées par un instantané complet",
+    registry=metrics.registry
+)
+
+
+def merge_patch(old, new):
+    """
+    Diff RFC 7386 de `old` vers `new` ({} si identiques).
+    Les clés supprimées valent None ; les listes sont remplacées en entier.
+    """
+    patch = {}
+    for key in old:
+        if key not in new:
+            patch[key] = None
+    for key, value in new.items():
+        if key not in old:
+            patch[key] = value
+        elif old[key] != value:
+            if isinstance(value, dict) and isinstance(old[key], dict):
+                patch[key] = merge_patch(old[key], value)
+            else:
+                patch[key] = value
+    return patch
+
+
+def format_event(kind, topic, data):
+    """Message SSE prêt à écrire sur le flux."""
+    payload = json.dumps({"topic": topic, "data": data}, separators=(",", ":"), default=str)
+    return f"event: {kind}\ndata: {payload}\n\n"
+
+
+def _kind(name):
+    # métrique par famille : "metrics:i-0abc" -> "metrics"
+    return name.partition(":")[0]
+
+
+class Subscriber:
+    def __init__(self, topics, maxsize=PUSH_QUEUE_SIZE):
+        self.topics = list(topics)
+        # de quoi contenir au moins un instantané par topic après une resynchronisation
+        self.queue = queue.Queue(max(maxsize, len(self.topics) + 1))
+        self.resyncs = 0
+        self._lock = threading.Lock()
+
+    def offer(self, message, hub):
+        with self._lock:
+            try:
+                self.queue.put_nowait(message)
+                return
+            except queue.Full:
+                pass
+            # client trop lent : on jette son retard et on repart des instantanés courants
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self.resyncs += 1
+            PUSH_RESYNCS.inc()
+            for name in self.topics:
+                snapshot = hub.snapshot_message(name)
+                if snapshot:
+                    self.queue.put_nowait(snapshot)
+
+    def get(self, timeout=None):
+        """Message suivant, ou None après `timeout` secondes sans rien (heartbeat)."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class Topic:
+    def __init__(self, name, producer):
+        self.name = name
+        self.producer = producer
+        self.subscribers = set()
+        self.state = None
+        self.thread = None
+        self.wake = threading.Event()
+        self._snapshot = None  # instantané sérialisé, calculé à la demande
+        self._lock = threading.Lock()
+
+    def snapshot_message(self):
+        with self._lock:
+            if self.state is None:
+                return None
+            if self._snapshot is None:
+                self._snapshot = format_event("snapshot", self.name, self.state)
+            return self._snapshot
+
+    def update(self, new_state):
+        """Enregistre le nouvel instantané ; renvoie le message à diffuser (ou None)."""
+        with self._lock:
+            if new_state is None or new_state is self.state:
+                # rien de publié encore, ou instantané partagé inchangé
+                return None
+            old, self.state = self.state, new_state
+            if old is None:
+                self._snapshot = format_event("snapshot", self.name, new_state)
+                return "snapshot", self._snapshot
+            patch = merge_patch(old, new_state)
+            if not patch:
+                return None
+            self._snapshot = None
+            return "patch", format_event("patch", self.name, patch)
+
+
+class PushHub:
+    def __init__(self, interval=PUSH_INTERVAL, queue_size=PUSH_QUEUE_SIZE, shared_dir=PUSH_SHARED_DIR,
+                 max_streams=PUSH_MAX_STREAMS):
+        self.interval = interval
+        self.queue_size = queue_size
+        self.app = None
+        self.shared = SharedSnapshots(shared_dir, interval) if shared_dir else None
+        self.max_streams = max_streams
+        self.streams = 0
+        self._producers = {}   # nom -> fn()
+        self._refreshers = {}  # nom -> fn() appelée avant un recalcul demandé par refresh()
+        self._factories = {}   # préfixe -> (fn(argument), motif de l'argument) pour "préfixe:argument"
+        self._topics = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+
+    def register(self, name, producer, on_refresh=None):
+        """
+        `on_refresh` est appelée avant un recalcul demandé par refresh() ; en mode partagé
+        dans le leader, dont les caches n'ont pas vu la mutation faite par un autre worker.
+        """
+        self._producers[name] = producer
+        if on_refresh is not None:
+            self._refreshers[name] = on_refresh
+
+    def register_prefix(self, prefix, factory, pattern):
+        """
+        Topics "préfixe:argument" ; `pattern` (regex compilée) valide l'argument : chaque topic
+        distinct lance un producteur et, en mode partagé, sert de nom de fichier.
+        """
+        self._factories[prefix] = (factory, pattern)
+
+    def knows(self, name):
+        prefix, sep, arg = name.partition(":")
+        if sep:
+            return prefix in self._factories and bool(self._factories[prefix][1].match(arg))
+        return name in self._producers
+
+    def _producer_for(self, name):
+        if self.shared:
+            return lambda: self.shared.read(name)
+        return self._source_for(name)
+
+    def _source_for(self, name):
+        """Producteur réel du topic (appels AWS, Kubernetes, base)."""
+        prefix, sep, arg = name.partition(":")
+        if sep:
+            return self._factories[prefix][0](arg)
+        return self._producers[name]
+
+    def open_stream(self):
+        """Réserve un flux SSE ; False si le process en sert déjà max_streams."""
+        with self._lock:
+            if self.max_streams and self.streams >= self.max_streams:
+                return False
+            self.streams += 1
+            return True
+
+    def close_stream(self):
+        with self._lock:
+            self.streams -= 1
+
+    def current(self, name):
+        """État courant d'un topic, pour le polling de repli (None si pas encore calculé)."""
+        if self.shared:
+            return self.shared.read(name)
+        topic = self._topics.get(name)
+        if topic is not None and topic.state is not None:
+            return topic.state
+        return self._produce_source(name)
+
+    def subscribe(self, topics):
+        subscriber = Subscriber(topics, self.queue_size)
+        with self._lock:
+            for name in subscriber.topics:
+                topic = self._topics.get(name)
+                if topic is None:
+                    topic = self._topics[name] = Topic(name, self._producer_for(name))
+                topic.subscribers.add(subscriber)
+                # topic déjà actif : le nouveau venu reçoit l'instantané courant sans recalcul
+                snapshot = topic.snapshot_message()
+                if snapshot:
+                    subscriber.queue.put_nowait(snapshot)
+                if topic.thread is None:
+                    topic.thread = threading.Thread(
+                        target=self._run, args=(topic,), name=f"push-{name}", daemon=True
+                    )
+                    topic.thread.start()
+        PUSH_SUBSCRIBERS.inc()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            for name in subscriber.topics:
+                topic = self._topics.get(name)
+                if topic is None:
+                    continue
+                topic.subscribers.discard(subscriber)
+                if not topic.subscribers:
+                    topic.wake.set()  # le producteur s'arrête au lieu d'attendre la fin de l'intervalle
+        PUSH_SUBSCRIBERS.dec()
+
+    def snapshot_message(self, name):
+        topic = self._topics.get(name)
+        return topic.snapshot_message() if topic else None
+
+    def refresh(self, name):
+        """Force un nouveau calcul immédiat (après une mutation, par exemple)."""
+        if self.shared:
+            self.shared.request_refresh(name)
+        topic = self._topics.get(name)
+        if topic:
+            topic.wake.set()
+
+    def _produce(self, topic):
+        if self.app is not None:
+            with self.app.app_context():
+                return topic.producer()
+        return topic.producer()
+
+    def _produce_source(self, name):
+        producer = self._source_for(name)
+        if self.app is not None:
+            with self.app.app_context():
+                return producer()
+        return producer()
+
+    def _publish_one(self, name):
+        kind = _kind(name)
+        try:
+            state = self._produce_source(name)
+            PUSH_PRODUCER_RUNS.labels(kind, "ok").inc()
+            return state
+        except Exception:
+            PUSH_PRODUCER_RUNS.labels(kind, "error").inc()
+            logger.exception("Producteur du topic %s en échec", name)
+            return None
+
+    def _before_refresh(self, name):
+        refresher = self._refreshers.get(name)
+        if refresher is not None:
+            try:
+                refresher()
+            except Exception:
+                logger.exception("Préparation du rafraîchissement du topic %s", name)
+
+    def run_publisher(self, stop=None):
+        """Mode partagé : calcule les topics demandés par les workers (process leader seulement)."""
+        if self.shared is None:
+            return
+        logger.info("Producteurs push actifs dans ce process (pid %s)", os.getpid())
+        self.shared.run_publisher(self._publish_one, stop, on_refresh=self._before_refresh)
+
+    def _run(self, topic):
+        kind = _kind(topic.name)
+        while True:
+            with self._lock:
+                if not topic.subscribers:
+                    # plus personne : on libère le topic (et son instantané)
+                    topic.thread = None
+                    if self._topics.get(topic.name) is topic:
+                        del self._topics[topic.name]
+                    return
+
+            message = None
+            try:
+                new_state = self._produce(topic)
+                if not self.shared:
+                    # en mode partagé, seuls les appels du leader comptent (_publish_one)
+                    PUSH_PRODUCER_RUNS.labels(kind, "ok").inc()
+                # même verrou que subscribe() : un nouvel abonné reçoit soit l'ancien
+                # instantané puis ce diff, soit directement le nouvel instantané
+                with self._lock:
+                    message = topic.update(new_state)
+                    subscribers = list(topic.subscribers)
+            except Exception:
+                # on garde le dernier instantané ; nouvel essai au prochain intervalle
+                PUSH_PRODUCER_RUNS.labels(kind, "error").inc()
+                logger.exception("Producteur du topic %s en échec", topic.name)
+
+            if message:
+                PUSH_MESSAGES.labels(kind, message[0]).inc()
+                for subscriber in subscribers:
+                    subscriber.offer(message[1], self)
+
+            # mode partagé : simple lecture de fichier, on la refait souvent
+            topic.wake.wait(PUSH_SHARED_POLL if self.shared else self.interval)
+            topic.wake.clear()
+
+
+hub = PushHub()
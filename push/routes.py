@@ -0,0 +1,85 @@
+# push/routes.py
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+import os
+
+from .hub import hub
+from . import topics  # enregistre les producteurs auprès du hub
+
+push_bp = Blueprint("push", __name__)
+
+# commentaire SSE envoyé en l'absence de message, pour garder la connexion ouverte
+PUSH_HEARTBEAT = float(os.getenv("PUSH_HEARTBEAT", "15"))
+# délai de reconnexion suggéré au navigateur (ms)
+PUSH_RETRY_MS = int(os.getenv("PUSH_RETRY_MS", "3000"))
+# topics par requête : chacun peut lancer un producteur
+PUSH_MAX_TOPICS = int(os.getenv("PUSH_MAX_TOPICS", "16"))
+
+
+def _topics_arg():
+    """(noms, réponse d'erreur) depuis ?topics=..."""
+    names = list(dict.fromkeys(t.strip() for t in request.args.get("topics", "").split(",") if t.strip()))
+    if not names:
+        return None, (jsonify({"error": "topics manquant"}), 400)
+    if len(names) > PUSH_MAX_TOPICS:
+        return None, (jsonify({"error": f"trop de topics (max {PUSH_MAX_TOPICS})"}), 400)
+    unknown = [t for t in names if not hub.knows(t)]
+    if unknown:
+        return None, (jsonify({"error": f"topic inconnu: {', '.join(unknown)}"}), 400)
+    return names, None
+
+
+@push_bp.route("/events", methods=["GET"])
+def events():
+    """
+    Flux Server-Sent Events remplaçant le polling des pages.
+    Query: topics=ec2,s3,k8s,ai,metrics:<instance_id>
+    Événements : "snapshot" (état complet) puis "patch" (JSON merge patch, RFC 7386),
+    data = {"topic": ..., "data": ...}
+    Chaque flux occupe un thread du worker : au-delà de PUSH_MAX_STREAMS, 503 et
+    "fallback" indique la route à interroger à la place.
+    """
+    names, error = _topics_arg()
+    if error:
+        return error
+    if not hub.open_stream():
+        response = jsonify({"error": "trop de flux ouverts sur ce worker", "fallback": "/events/snapshot"})
+        response.headers["Retry-After"] = "30"
+        return response, 503
+
+    try:
+        subscriber = hub.subscribe(dict.fromkeys(names))
+    except Exception:
+        hub.close_stream()
+        raise
+
+    def generate():
+        yield f"retry: {PUSH_RETRY_MS}\n\n"
+        while True:
+            message = subscriber.get(timeout=PUSH_HEARTBEAT)
+            yield message if message is not None else ": ping\n\n"
+
+    def release():
+        # déconnexion du client : le topic s'arrête s'il n'a plus d'abonnés. Appelé par le
+        # serveur à la fermeture de la réponse, même si le flux n'a jamais été lu.
+        hub.unsubscribe(subscriber)
+        hub.close_stream()
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    response.call_on_close(release)
+    return response
+
+
+@push_bp.route("/events/snapshot", methods=["GET"])
+def events_snapshot():
+    """
+    Repli en polling quand /events refuse le flux (503) : {topic: état complet}.
+    Sous gunicorn, lecture des instantanés publiés par le leader, sans appel aux dépendances.
+    """
+    names, error = _topics_arg()
+    if error:
+        return error
+    return jsonify({name: hub.current(name) for name in dict.fromkeys(names)})
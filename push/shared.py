@@ -0,0 +1,130 @@
+# push/shared.py
+"""
+Partage des instantanés entre workers gunicorn (PUSH_SHARED_DIR, défini par
+gunicorn.conf.py).
+
+Un seul process, le leader (verrou fichier du pipeline IA), appelle les producteurs
+(AWS, Kubernetes, base) et écrit chaque instantané dans state/<topic>.json. Les
+workers lisent ces fichiers pour leurs abonnés SSE (un stat par seconde et par topic,
+relecture seulement si le fichier a changé) et signalent les topics qu'ils servent en
+touchant demand/<topic> : le leader ne calcule que les topics demandés récemment
+(deux intervalles), et ne réécrit un instantané que s'il a changé. Les appels aux dépendances ne dépendent donc ni du nombre
+d'abonnés ni du nombre de workers.
+
+Après une mutation (création / suppression), hub.refresh() touche refresh/<topic> : le
+leader recalcule le topic au tour suivant, après avoir vidé son propre cache (on_refresh).
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# fréquence de lecture des fichiers par les workers, et de la boucle du leader
+PUSH_SHARED_POLL = float(os.getenv("PUSH_SHARED_POLL", "1"))
+
+
+class SharedSnapshots:
+    def __init__(self, directory, interval, demand_ttl=None):
+        self.directory = directory
+        self.interval = interval
+        self.demand_ttl = demand_ttl if demand_ttl is not None else max(3 * PUSH_SHARED_POLL, 2 * interval)
+        self._cache = {}   # topic -> (mtime_ns, état) : relecture seulement si le fichier change
+        self._lock = threading.Lock()
+        for sub in ("state", "demand", "refresh"):
+            os.makedirs(os.path.join(directory, sub), exist_ok=True)
+
+    def _path(self, sub, topic):
+        return os.path.join(self.directory, sub, topic)
+
+    def _touch(self, sub, topic):
+        path = self._path(sub, topic)
+        # date explicite : l'horloge des fichiers est plus grossière que time.time(), et due()
+        # compare ces dates à l'heure du dernier calcul
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except FileNotFoundError:
+            open(path, "a").close()
+            os.utime(path, (now, now))
+
+    # --- côté workers ---
+
+    def read(self, topic):
+        """Dernier instantané publié (même objet tant que le fichier ne change pas), ou None."""
+        self._touch("demand", topic)
+        path = self._path("state", f"{topic}.json")
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            cached = self._cache.get(topic)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        with open(path) as f:
+            state = json.load(f)
+        with self._lock:
+            self._cache[topic] = (mtime, state)
+        return state
+
+    def request_refresh(self, topic):
+        self._touch("refresh", topic)
+
+    # --- côté leader ---
+
+    def publish(self, topic, state):
+        # écriture atomique : un lecteur voit l'ancien ou le nouveau fichier, jamais un fichier partiel
+        fd, tmp = tempfile.mkstemp(dir=os.path.join(self.directory, "state"), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f, separators=(",", ":"), default=str)
+        os.replace(tmp, self._path("state", f"{topic}.json"))
+
+    def _mtime(self, sub, topic):
+        try:
+            return os.stat(self._path(sub, topic)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def due(self, last_runs, now):
+        """
+        [(topic, rafraîchissement demandé)] pour les topics demandés dont l'intervalle est
+        écoulé ou dont un rafraîchissement est demandé depuis le dernier calcul.
+        """
+        topics = []
+        for topic in os.listdir(os.path.join(self.directory, "demand")):
+            demanded = self._mtime("demand", topic)
+            if demanded is None or now - demanded > self.demand_ttl:
+                continue
+            last = last_runs.get(topic)
+            refresh = self._mtime("refresh", topic)
+            refreshed = refresh is not None and last is not None and refresh > last
+            if last is None or now - last >= self.interval or refreshed:
+                topics.append((topic, refreshed))
+        return topics
+
+    def run_publisher(self, produce, stop=None, on_refresh=None):
+        """
+        Boucle du leader : produce(topic) pour chaque topic dû, puis publication ;
+        on_refresh(topic) d'abord si le recalcul suit un request_refresh().
+        """
+        last_runs, last_states = {}, {}
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            now = time.time()
+            try:
+                for topic, refreshed in self.due(last_runs, now):
+                    last_runs[topic] = now
+                    if refreshed and on_refresh is not None:
+                        on_refresh(topic)
+                    state = produce(topic)
+                    if state is not None and state != last_states.get(topic):
+                        self.publish(topic, state)
+                        last_states[topic] = state
+            except OSError:
+                # disque plein, répertoire supprimé... : on réessaie au tour suivant
+                logger.exception("Publication des instantanés push en échec")
+            stop.wait(PUSH_SHARED_POLL)
@@ -0,0 +1,61 @@
+# push/topics.py
+"""
+Producteurs des topics diffusés par /events. Les collections sont indexées par
+identifiant pour que le diff ne porte que sur les éléments modifiés.
+"""
+from aws_clients import INSTANCE_ID_RE
+from monitoring import inventory
+from monitoring.inventory import list_ec2_instances, list_s3_buckets
+from monitoring.timeseries import store
+from ai.recommendations import latest_recommendation
+from k8s import k8s_routes
+
+from .hub import hub
+
+
+def ec2_topic():
+    """Même contenu que /monitor/ec2/list, par instanceId."""
+    return {"instances": {inst["instanceId"]: inst for inst in list_ec2_instances()}}
+
+
+def s3_topic():
+    """Même contenu que /monitor/s3/list, par nom de bucket."""
+    return {"buckets": {b["name"]: b for b in list_s3_buckets()}}
+
+
+def ai_topic():
+    """Même contenu que /status."""
+    return {"status": "ok", "last_ai": latest_recommendation()}
+
+
+def k8s_topic():
+    """Les quatre routes /k8s/* (pods, services, metrics, recommendation) en un instantané."""
+    if not k8s_routes.v1:
+        return {"error": "Kubernetes non configuré"}
+    pods = k8s_routes.pods_payload()["pods"]
+    services = k8s_routes.services_payload()["services"]
+    return {
+        "pods": {f"{p['namespace']}/{p['name']}": p for p in pods},
+        "services": {f"{s['namespace']}/{s['name']}": s for s in services},
+        "metrics": k8s_routes.cluster_metrics_payload(),
+        "recommendation": k8s_routes.recommendation_payload()
+    }
+
+
+def ec2_metrics_topic(instance_id):
+    """metrics:<instance_id> -> même contenu que /monitor/ec2/<instance_id> (stockage local)."""
+    return lambda: store.latest(instance_id)
+
+
+def _refresh_inventory(resource):
+    # après une création / suppression (deploy/routes.py, deploy/jobs.py)
+    if hub.knows(resource):
+        hub.refresh(resource)
+
+
+hub.register("ec2", ec2_topic, on_refresh=lambda: inventory.invalidate("ec2", notify=False))
+hub.register("s3", s3_topic, on_refresh=lambda: inventory.invalidate("s3", notify=False))
+hub.register("ai", ai_topic)
+hub.register("k8s", k8s_topic)
+hub.register_prefix("metrics", ec2_metrics_topic, INSTANCE_ID_RE)
+inventory.on_invalidate(_refresh_inventory)
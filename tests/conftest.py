@@ -0,0 +1,8 @@
+# tests/conftest.py
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# pas d'informers ni de threads d'arrière-plan pendant les tests
+os.environ.setdefault("K8S_INFORMERS", "0")
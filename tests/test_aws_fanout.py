@@ -0,0 +1,60 @@
+# tests/test_aws_fanout.py
+import threading
+import time
+
+import aws_clients
+from aws_clients import Target, fan_out
+
+
+def _targets(n):
+    return [Target("default", f"region-{i}") for i in range(n)]
+
+
+def test_fan_out_reports_never_started_targets_apart(monkeypatch):
+    monkeypatch.setattr(aws_clients, "AWS_FANOUT_WORKERS", 2)
+    release = threading.Event()
+    started = []
+
+    def slow(target):
+        started.append(target)
+        release.wait(5)
+        return target.region
+
+    try:
+        results, errors = fan_out(slow, _targets(4), timeout=0.2)
+    finally:
+        release.set()
+
+    assert results == []
+    by_region = {e["region"]: e["error"] for e in errors}
+    assert len(started) == 2
+    for target in _targets(4):
+        if target in started:
+            assert by_region[target.region].startswith("délai dépassé")
+        else:
+            assert by_region[target.region].startswith("non lancée")
+
+
+def test_fan_out_pool_is_per_call(monkeypatch):
+    # une requête dont les cibles sont bloquées n'occupe pas les threads d'une autre
+    monkeypatch.setattr(aws_clients, "AWS_FANOUT_WORKERS", 2)
+    release = threading.Event()
+    blocked = threading.Thread(target=fan_out, args=(lambda t: release.wait(5), _targets(2), 2))
+    blocked.start()
+    try:
+        time.sleep(0.05)
+        results, errors = fan_out(lambda t: t.region, _targets(3), timeout=1)
+    finally:
+        release.set()
+        blocked.join()
+
+    assert errors == []
+    assert [value for _, value in results] == ["region-0", "region-1", "region-2"]
+
+
+def test_fan_out_threads_use_short_timeout_clients():
+    results, _ = fan_out(lambda t: aws_clients.get_client("ec2", t.region), _targets(2))
+    config = results[0][1].meta.config
+    assert config.read_timeout == aws_clients.AWS_FANOUT_READ_TIMEOUT
+    assert config.retries["total_max_attempts"] == aws_clients.AWS_FANOUT_MAX_ATTEMPTS
+    assert aws_clients.get_client("ec2").meta.config.read_timeout == aws_clients.AWS_READ_TIMEOUT
@@ -0,0 +1,98 @@
+# tests/test_cloudwatch_manager.py
+from datetime import datetime, timedelta
+
+import boto3
+import pytest
+from botocore.stub import ANY, Stubber
+
+from monitoring.cloudwatch_manager import EC2_METRICS, fetch_metric_data, get_ec2_metrics_batch
+
+NOW = datetime(2024, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def cloudwatch():
+    client = boto3.client("cloudwatch", region_name="us-east-1", aws_access_key_id="x", aws_secret_access_key="x")
+    with Stubber(client) as stubber:
+        yield client, stubber
+        stubber.assert_no_pending_responses()
+
+
+def _params(queries, token=None):
+    params = {"MetricDataQueries": queries, "StartTime": ANY, "EndTime": ANY, "ScanBy": "TimestampDescending"}
+    if token:
+        params["NextToken"] = token
+    return params
+
+
+def _result(query_id, *values):
+    # valeurs déjà dans l'ordre de ScanBy=TimestampDescending : la plus récente d'abord
+    return {
+        "Id": query_id,
+        "Label": query_id,
+        "Timestamps": [NOW - timedelta(minutes=5 * n) for n in range(len(values))],
+        "Values": list(values),
+        "StatusCode": "Complete"
+    }
+
+
+def _query(query_id):
+    return {
+        "Id": query_id,
+        "MetricStat": {
+            "Metric": {"Namespace": "AWS/EC2", "MetricName": "CPUUtilization"},
+            "Period": 300,
+            "Stat": "Average"
+        },
+        "ReturnData": True
+    }
+
+
+def test_fetch_metric_data_keeps_first_value_across_pages(cloudwatch):
+    client, stubber = cloudwatch
+    queries = [_query("a"), _query("b"), _query("c")]
+    stubber.add_response("get_metric_data", {
+        "MetricDataResults": [_result("a", 3.0, 2.0), _result("b")],
+        "NextToken": "page-2"
+    }, _params(queries))
+    # la suite de "a" sur la page 2 est plus ancienne : ignorée
+    stubber.add_response("get_metric_data", {
+        "MetricDataResults": [_result("a", 1.0), _result("c", 7.0)]
+    }, _params(queries, "page-2"))
+
+    latest = fetch_metric_data(queries, NOW - timedelta(minutes=10), NOW, client=client)
+
+    assert latest == {"a": 3.0, "c": 7.0}
+
+
+def test_ec2_batch_chunks_500_queries_per_call(cloudwatch):
+    client, stubber = cloudwatch
+    instance_ids = [f"i-{n:017x}" for n in range(120)]   # 600 requêtes : 500 + 100
+
+    def expect(chunk, pages):
+        for n, results in enumerate(pages):
+            params = _params(ANY, f"{chunk}-{n}" if n else None)
+            response = {"MetricDataResults": results}
+            if n + 1 < len(pages):
+                response["NextToken"] = f"{chunk}-{n + 1}"
+            stubber.add_response("get_metric_data", response, params)
+
+    # lot 1 (instances 0 à 99) sur deux pages, lot 2 (100 à 119) sur une
+    expect(1, [[_result("ec2_0_0", 42.0, 10.0)], [_result("ec2_99_1", 1234.0)]])
+    expect(2, [[_result("ec2_119_0", 5.5)]])
+
+    calls = []
+    client.meta.events.register(
+        "provide-client-params.cloudwatch.GetMetricData",
+        lambda params, **kwargs: calls.append([q["Id"] for q in params["MetricDataQueries"]])
+    )
+
+    results = get_ec2_metrics_batch(instance_ids, client=client)
+
+    assert [(len(ids), ids[0], ids[-1]) for ids in calls] == [
+        (500, "ec2_0_0", "ec2_99_4"), (500, "ec2_0_0", "ec2_99_4"), (100, "ec2_100_0", "ec2_119_4")
+    ]
+    assert results[instance_ids[0]]["CPUUtilization"] == 42.0
+    assert results[instance_ids[99]]["NetworkIn"] == 1234.0
+    assert results[instance_ids[119]]["CPUUtilization"] == 5.5
+    assert results[instance_ids[50]] == {key: 0 for key, _, _ in EC2_METRICS}
@@ -0,0 +1,25 @@
+# tests/test_hashing.py
+import pytest
+
+from auth import hashing
+
+
+class _ShutDownPool:
+    def submit(self, fn, *args):
+        raise RuntimeError("cannot schedule new futures after shutdown")
+
+
+def test_failed_submit_releases_its_slot(monkeypatch):
+    monkeypatch.setattr(hashing, "PASSWORD_HASH_WORKERS", 1)
+    monkeypatch.setattr(hashing, "_get_pool", lambda: _ShutDownPool())
+    resets = []
+    monkeypatch.setattr(hashing, "_reset_pool", lambda: resets.append(1))
+
+    for _ in range(hashing.PASSWORD_HASH_MAX_PENDING + 1):
+        with pytest.raises(RuntimeError):
+            hashing.verify_password("pbkdf2:sha256:1$sel$hash", "secret")
+
+    # toutes les places sont libres ; le pool n'est recréé que s'il est cassé
+    assert hashing._slots.acquire(blocking=False)
+    hashing._slots.release()
+    assert resets == []
@@ -0,0 +1,79 @@
+# tests/test_k8s_informer.py
+"""Informers (k8s/informer.py) contre le faux serveur d'API des benchmarks."""
+import threading
+import time
+
+import pytest
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+
+from benchmarks.fake_k8s import FakeKubeServer, build_cluster
+from k8s import informer as informer_module
+from k8s.informer import Informer
+
+
+def test_wait_synced_blocks_once_when_list_is_forbidden():
+    def forbidden(**kwargs):
+        raise ApiException(status=403, reason="Forbidden")
+
+    informer = Informer("test-forbidden", forbidden).start()
+    try:
+        t0 = time.monotonic()
+        assert informer.wait_synced(0.3) is False
+        assert time.monotonic() - t0 >= 0.25
+        # délai de synchronisation épuisé : les requêtes suivantes ne bloquent plus
+        t0 = time.monotonic()
+        for _ in range(5):
+            assert informer.wait_synced(0.3) is False
+        assert time.monotonic() - t0 < 0.05
+    finally:
+        informer.stop(timeout=2)
+
+
+def _core_v1(server):
+    cfg = client.Configuration()
+    cfg.host = f"http://127.0.0.1:{server.server_address[1]}"
+    return client.CoreV1Api(client.ApiClient(cfg))
+
+
+@pytest.fixture
+def fake_server():
+    server = FakeKubeServer(("127.0.0.1", 0), build_cluster(pods=20, nodes=2, services=2))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.stopping.set()
+    server.shutdown()
+    server.server_close()
+
+
+def _wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_watch_timeout_rewatches_without_relist(fake_server, monkeypatch):
+    monkeypatch.setattr(informer_module, "K8S_WATCH_TIMEOUT", 1)
+    informer = Informer("test-pods", _core_v1(fake_server).list_pod_for_all_namespaces).start()
+    try:
+        assert informer.wait_synced(5)
+        assert len(informer.store) == 20
+        _wait_for(lambda: len(fake_server.watch_versions) >= 3)
+        # une seule liste ; chaque fin de watch reprend au resourceVersion de la liste
+        assert fake_server.lists == 1
+        assert set(fake_server.watch_versions) == {"1"}
+    finally:
+        informer.stop(timeout=3)
+
+
+def test_rewatch_resumes_from_bookmark(fake_server, monkeypatch):
+    monkeypatch.setattr(informer_module, "K8S_WATCH_TIMEOUT", 1)
+    fake_server.bookmark_version = "42"
+    informer = Informer("test-bookmark", _core_v1(fake_server).list_pod_for_all_namespaces).start()
+    try:
+        _wait_for(lambda: len(fake_server.watch_versions) >= 2)
+        assert fake_server.watch_versions[:2] == ["1", "42"]
+        assert fake_server.lists == 1
+    finally:
+        informer.stop(timeout=3)
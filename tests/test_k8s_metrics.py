@@ -0,0 +1,140 @@
+# tests/test_k8s_metrics.py
+"""
+Métriques des pods (k8s/k8s_routes.py) : somme par pod des conteneurs de
+metrics.k8s.io, servi par le faux serveur d'API des benchmarks, et repli sur
+`kubectl top pods -A --no-headers`.
+"""
+import json
+import subprocess
+import threading
+from collections import Counter
+
+import pytest
+from kubernetes import client
+
+from benchmarks.fake_k8s import FakeKubeServer, build_cluster
+from k8s import k8s_routes
+
+METRICS_PATH = "/apis/metrics.k8s.io/v1beta1/pods"
+
+
+@pytest.fixture
+def fake_api():
+    """(démarre(bodies) -> CustomObjectsApi pointé sur un faux serveur d'API)."""
+    servers = []
+
+    def start(bodies):
+        server = FakeKubeServer(("127.0.0.1", 0), bodies)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        cfg = client.Configuration()
+        cfg.host = f"http://127.0.0.1:{server.server_address[1]}"
+        return client.CustomObjectsApi(client.ApiClient(cfg))
+
+    yield start
+    for server in servers:
+        server.stopping.set()
+        server.shutdown()
+        server.server_close()
+
+
+def _metrics_body(items):
+    return json.dumps({"kind": "PodMetricsList", "apiVersion": "metrics.k8s.io/v1beta1",
+                       "metadata": {}, "items": items}).encode()
+
+
+def test_pod_metrics_summed_per_pod(fake_api, monkeypatch):
+    bodies = build_cluster(pods=40, nodes=3, services=1, seed=7)
+    monkeypatch.setattr(k8s_routes, "custom_api", fake_api(bodies))
+
+    expected = {}
+    for item in json.loads(bodies[METRICS_PATH])["items"]:
+        usage = [c["usage"] for c in item["containers"]]
+        cpu = sum(int(u["cpu"][:-1]) for u in usage)          # "123m"
+        memory = sum(int(u["memory"][:-2]) for u in usage)    # "456Mi"
+        expected[(item["metadata"]["namespace"], item["metadata"]["name"])] = {
+            "cpu": f"{cpu}m", "memory": f"{memory}Mi"
+        }
+
+    assert k8s_routes.get_all_pod_metrics() == expected
+
+
+def test_pod_metrics_mixed_units(fake_api, monkeypatch):
+    items = [
+        {"metadata": {"namespace": "default", "name": "web"},
+         "containers": [
+             {"name": "app", "usage": {"cpu": "1500000n", "memory": "1Gi"}},
+             {"name": "sidecar", "usage": {"cpu": "250m", "memory": "524288Ki"}},
+         ]},
+        {"metadata": {"namespace": "jobs", "name": "batch"},
+         "containers": [{"name": "main", "usage": {"cpu": "2", "memory": "100M"}}]},
+        {"metadata": {"namespace": "jobs", "name": "empty"}, "containers": []},
+    ]
+    monkeypatch.setattr(k8s_routes, "custom_api", fake_api({METRICS_PATH: _metrics_body(items)}))
+
+    assert k8s_routes.get_all_pod_metrics() == {
+        ("default", "web"): {"cpu": "252m", "memory": "1536Mi"},
+        ("jobs", "batch"): {"cpu": "2000m", "memory": "95Mi"},
+        ("jobs", "empty"): {"cpu": "0m", "memory": "0Mi"},
+    }
+
+
+KUBECTL_TOP = """\
+default       web-7d4b9c-abcde           12m    64Mi
+kube-system   coredns-5d78c9869d-xyz12   3m     18Mi
+payments      api-0                      250m   512Mi
+malformed-line
+"""
+
+
+def test_kubectl_top_fallback(monkeypatch):
+    calls = []
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, stdout=KUBECTL_TOP, stderr="")
+
+    monkeypatch.setattr(k8s_routes, "custom_api", None)
+    monkeypatch.setattr(k8s_routes.subprocess, "run", fake_run)
+
+    assert k8s_routes.get_all_pod_metrics() == {
+        ("default", "web-7d4b9c-abcde"): {"cpu": "12m", "memory": "64Mi"},
+        ("kube-system", "coredns-5d78c9869d-xyz12"): {"cpu": "3m", "memory": "18Mi"},
+        ("payments", "api-0"): {"cpu": "250m", "memory": "512Mi"},
+    }
+    # un seul appel pour tout le cluster
+    assert calls == [["kubectl", "top", "pods", "-A", "--no-headers"]]
+
+
+def test_metrics_api_error_falls_back_to_kubectl(fake_api, monkeypatch):
+    # faux serveur sans metrics.k8s.io : 404 -> repli kubectl
+    monkeypatch.setattr(k8s_routes, "custom_api", fake_api({}))
+    monkeypatch.setattr(
+        k8s_routes.subprocess, "run",
+        lambda cmd, **kwargs: subprocess.CompletedProcess(cmd, 0, stdout=KUBECTL_TOP, stderr="")
+    )
+    assert k8s_routes.get_all_pod_metrics()[("payments", "api-0")] == {"cpu": "250m", "memory": "512Mi"}
+
+
+def test_kubectl_failure_gives_empty_map(monkeypatch):
+    monkeypatch.setattr(k8s_routes, "custom_api", None)
+    monkeypatch.setattr(
+        k8s_routes.subprocess, "run",
+        lambda cmd, **kwargs: subprocess.CompletedProcess(cmd, 1, stdout="", stderr="error: Metrics API not available")
+    )
+    assert k8s_routes.get_all_pod_metrics() == {}
+
+
+def test_pod_counts_without_informers(fake_api, monkeypatch):
+    """Sans informer : phases et pods par nœud depuis une seule liste de pods."""
+    bodies = build_cluster(pods=40, nodes=3, services=1, seed=7)
+    custom = fake_api(bodies)
+    monkeypatch.setattr(k8s_routes, "v1", client.CoreV1Api(custom.api_client))
+    pods = json.loads(bodies["/api/v1/pods"])["items"]
+
+    total, phases, per_node = k8s_routes.pod_counts()
+
+    assert total == 40
+    assert phases == dict(Counter(p["status"]["phase"] for p in pods))
+    assert per_node == dict(Counter(p["spec"]["nodeName"] for p in pods))
+    assert sum(per_node.values()) == 40
@@ -0,0 +1,38 @@
+# tests/test_model_utils.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from ai.model_utils import FeatureEncoder, _encode_frame, _parse_timestamp
+
+EPOCH = 1704067200.0  # 2024-01-01T00:00:00Z
+
+
+@pytest.mark.parametrize("value", [
+    "2024-01-01T00:00:00Z",
+    "2024-01-01T00:00:00z",
+    "2024-01-01T00:00:00+00:00",
+    "2024-01-01T02:00:00+02:00",
+    "2024-01-01T00:00:00",
+    str(EPOCH),
+    EPOCH,
+])
+def test_parse_timestamp_is_utc(value):
+    assert _parse_timestamp(value) == EPOCH
+
+
+def test_frame_encoding_matches_dict_encoding():
+    rows = [
+        {"timestamp": 1700000000, "cpu_usage": 10, "job_type": "batch"},
+        {"timestamp": 1700000000.5, "cpu_usage": "12.5", "job_type": "service"},
+        {"timestamp": "1700000000", "cpu_usage": None, "job_type": "unknown"},
+        {"timestamp": "2024-01-01T00:00:00Z", "cpu_usage": 1},
+        {"timestamp": "2024-01-01T02:00:00+02:00", "cpu_usage": 2},
+        {"timestamp": "2024-01-01T00:00:00", "cpu_usage": 3},
+        {"timestamp": "pas une date", "cpu_usage": "x"},
+        {"timestamp": None},
+    ]
+    features = ["timestamp", "cpu_usage", "job_type"]
+    frame = pd.DataFrame(rows, index=[0] * len(rows))
+
+    np.testing.assert_array_equal(_encode_frame(frame, features), FeatureEncoder(features).encode_many(rows))
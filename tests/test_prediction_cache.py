@@ -0,0 +1,35 @@
+# tests/test_prediction_cache.py
+from types import SimpleNamespace
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+from ai.model_utils import FeatureEncoder
+from ai.prediction_cache import PredictionCache
+
+FEATURES = ["CPUUtilization", "timestamp"]
+DAY = 86400
+
+
+def _state():
+    rng = np.random.default_rng(0)
+    # entraînement : CPU 0-100 %, timestamps répartis sur un an
+    X = np.column_stack([rng.uniform(0, 100, 1000), 1.7e9 + rng.uniform(0, 365 * DAY, 1000)])
+    return SimpleNamespace(scaler=StandardScaler().fit(X), encoder=FeatureEncoder(FEATURES), version="v1")
+
+
+def test_key_tolerance_follows_each_feature_spread():
+    cache, state = PredictionCache(backend="memory"), _state()
+    key = lambda cpu, ts: cache.key({"CPUUtilization": cpu, "timestamp": ts}, state)
+
+    base = key(50.0, 1.7e9 + 100 * DAY)
+    assert key(50.01, 1.7e9 + 100 * DAY) == base
+    assert key(50.0, 1.7e9 + 100 * DAY + 60) == base
+    # 11 jours d'écart sur le timestamp ou 5 points de CPU : autre entrée
+    assert key(50.0, 1.7e9 + 111 * DAY) != base
+    assert key(55.0, 1.7e9 + 100 * DAY) != base
+
+
+def test_step_zero_is_exact_match():
+    cache, state = PredictionCache(backend="memory", step=0), _state()
+    assert cache.key({"CPUUtilization": 50.0}, state) != cache.key({"CPUUtilization": 50.001}, state)
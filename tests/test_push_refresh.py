@@ -0,0 +1,44 @@
+# tests/test_push_refresh.py
+import threading
+
+from monitoring import inventory
+from push import shared as shared_module
+from push.hub import hub
+from push.shared import SharedSnapshots
+import push.topics  # noqa: F401  (branche inventory.invalidate sur hub.refresh)
+
+
+def test_inventory_invalidation_refreshes_the_topic(monkeypatch):
+    refreshed = []
+    monkeypatch.setattr(hub, "refresh", refreshed.append)
+
+    inventory.invalidate("s3")
+    inventory.invalidate("ec2", notify=False)
+
+    assert refreshed == ["s3"]
+
+
+def test_leader_runs_on_refresh_before_a_requested_recompute(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_module, "PUSH_SHARED_POLL", 0.01)
+    snapshots = SharedSnapshots(str(tmp_path), interval=3600)
+    snapshots.read("ec2")  # un worker sert le topic
+    stop, calls = threading.Event(), []
+
+    def produce(topic):
+        calls.append(("produce", topic))
+        if len(calls) == 1:
+            # mutation dans un worker après le premier calcul
+            snapshots.request_refresh(topic)
+        else:
+            stop.set()
+        return {"n": len(calls)}
+
+    timer = threading.Timer(5, stop.set)  # garde-fou si le rafraîchissement n'est pas vu
+    timer.start()
+    try:
+        snapshots.run_publisher(produce, stop, on_refresh=lambda topic: calls.append(("refresh", topic)))
+    finally:
+        timer.cancel()
+
+    assert calls == [("produce", "ec2"), ("refresh", "ec2"), ("produce", "ec2")]
+    assert snapshots.read("ec2") == {"n": 3}
@@ -0,0 +1,29 @@
+# tests/test_push_routes.py
+import pytest
+from flask import Flask
+
+from push import routes
+from push.routes import push_bp
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(push_bp)
+    return app.test_client()
+
+
+@pytest.mark.parametrize("topic", ["metrics:nimporte-quoi", "metrics:", "metrics:i-123", "metrics:../../etc", "inconnu"])
+def test_unknown_topics_are_rejected(client, topic):
+    for route in ("/events", "/events/snapshot"):
+        resp = client.get(route, query_string={"topics": topic})
+        assert resp.status_code == 400
+        assert resp.get_json()["error"].startswith("topic inconnu")
+
+
+def test_topic_count_is_capped(client, monkeypatch):
+    monkeypatch.setattr(routes, "PUSH_MAX_TOPICS", 3)
+    topics = ",".join(f"metrics:i-{n:017x}" for n in range(4))
+    resp = client.get("/events/snapshot", query_string={"topics": topics})
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "trop de topics (max 3)"}
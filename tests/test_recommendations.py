@@ -0,0 +1,40 @@
+# tests/test_recommendations.py
+import pytest
+from flask import Flask
+
+import app_state
+from ai.recommendations import save_if_changed
+from auth.models import Recommendation
+from extensions import db
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'test.db'}"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+
+
+def _rec(cpu, ec2):
+    return {"instance_id": "i-0000000a", "metrics": {"CPUUtilization": cpu},
+            "recommendation": {"recommended_ec2": ec2}}
+
+
+def test_only_changed_recommendations_are_persisted(app):
+    assert save_if_changed(_rec(10, "t3.micro")) == 1
+    # métriques différentes, même recommandation : pas de nouvelle ligne
+    assert save_if_changed(_rec(12, "t3.micro")) == 0
+    assert save_if_changed(_rec(90, "m5.large")) == 1
+    assert Recommendation.query.count() == 2
+
+
+def test_latest_recommendations_map_is_bounded():
+    latest = app_state.BoundedDict(2)
+    latest["a"], latest["b"] = 1, 2
+    latest["a"] = 3          # réécrite : redevient la plus récente
+    latest["c"] = 4          # évince b
+    assert dict(latest) == {"a": 3, "c": 4}
@@ -0,0 +1,70 @@
+# tests/test_s3_emptier.py
+import threading
+
+import boto3
+import pytest
+from botocore.exceptions import EndpointConnectionError
+from moto import mock_aws
+
+from deploy.s3_emptier import BucketEmptier, empty_bucket
+
+BUCKET = "bucket-test"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "x")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "x")
+    # pages de 4 clés : plusieurs pages sans créer des milliers d'objets
+    monkeypatch.setenv("MOTO_S3_DEFAULT_MAX_KEYS", "4")
+    with mock_aws():
+        yield boto3.client("s3", region_name="us-east-1")
+
+
+def _fail_once(client, operation, call):
+    """Coupure réseau au `call`-ième appel de `operation` (une seule fois)."""
+    calls = []
+
+    def handler(**kwargs):
+        calls.append(1)
+        if len(calls) == call:
+            raise EndpointConnectionError(endpoint_url="https://s3.amazonaws.com")
+
+    client.meta.events.register(f"before-call.s3.{operation}", handler)
+
+
+@pytest.mark.parametrize("versioned", [False, True])
+def test_listing_resumes_after_a_failed_page(s3, monkeypatch, versioned):
+    monkeypatch.setattr("deploy.s3_emptier.time.sleep", lambda s: None)
+    # suppressions enregistrées sans appeler moto, qui n'accepte pas un listing et des
+    # suppressions concurrents sur le même bucket
+    deleted, lock = [], threading.Lock()
+
+    def record(self, objects):
+        with lock:
+            deleted.extend(objects)
+        self.progress.add(deleted=len(objects))
+
+    monkeypatch.setattr(BucketEmptier, "_delete_batch", record)
+
+    s3.create_bucket(Bucket=BUCKET)
+    if versioned:
+        s3.put_bucket_versioning(Bucket=BUCKET, VersioningConfiguration={"Status": "Enabled"})
+    keys = [f"data/{n:02d}" for n in range(10)] + ["top"]
+    for key in keys:
+        s3.put_object(Bucket=BUCKET, Key=key, Body=b"")
+    # 1er appel : niveau racine ; 3e : deuxième page de data/
+    _fail_once(s3, "ListObjectVersions" if versioned else "ListObjectsV2", 3)
+
+    result = empty_bucket(s3, BUCKET, workers=2, list_workers=1)
+
+    assert sorted(o["Key"] for o in deleted) == sorted(keys)
+    assert result["listed"] == result["deleted"] == len(keys)
+    assert result["prefixes"] == 1 and result["errors"] == 0
+    if versioned:
+        assert result["versions"] == len(keys)
+
+
+def test_missing_bucket_is_already_empty(s3):
+    result = empty_bucket(s3, "absent")
+    assert result["phase"] == "done" and result["listed"] == 0
@@ -0,0 +1,73 @@
+# tests/test_terminate_instances.py
+import boto3
+import pytest
+from botocore.exceptions import EndpointConnectionError
+from botocore.stub import Stubber
+
+from deploy import aws_manager
+
+IDS = [f"i-{n:017x}" for n in range(4)]
+
+
+@pytest.fixture
+def ec2(monkeypatch):
+    client = boto3.client("ec2", region_name="us-east-1", aws_access_key_id="x", aws_secret_access_key="x")
+    monkeypatch.setattr(aws_manager, "get_client", lambda service: client)
+    with Stubber(client) as stubber:
+        yield stubber
+        stubber.assert_no_pending_responses()
+
+
+def _terminated(ids):
+    return {"TerminatingInstances": [
+        {"InstanceId": i, "PreviousState": {"Code": 16, "Name": "running"},
+         "CurrentState": {"Code": 32, "Name": "shutting-down"}}
+        for i in ids
+    ]}
+
+
+def test_invalid_id_splits_the_chunk(ec2):
+    bad = IDS[3]
+    ec2.add_client_error("terminate_instances", "InvalidInstanceID.NotFound",
+                         expected_params={"InstanceIds": IDS})
+    ec2.add_response("terminate_instances", _terminated(IDS[:2]), {"InstanceIds": IDS[:2]})
+    ec2.add_client_error("terminate_instances", "InvalidInstanceID.NotFound",
+                         expected_params={"InstanceIds": IDS[2:]})
+    ec2.add_response("terminate_instances", _terminated([IDS[2]]), {"InstanceIds": [IDS[2]]})
+    ec2.add_client_error("terminate_instances", "InvalidInstanceID.NotFound",
+                         expected_params={"InstanceIds": [bad]})
+
+    results = aws_manager.terminate_ec2_instances(IDS)
+
+    assert [results[i]["state"] for i in IDS[:3]] == ["shutting-down"] * 3
+    assert "InvalidInstanceID.NotFound" in results[bad]["error"]
+
+
+def test_other_errors_fail_the_whole_chunk_in_one_call(ec2):
+    ec2.add_client_error("terminate_instances", "UnauthorizedOperation",
+                         expected_params={"InstanceIds": IDS})
+
+    results = aws_manager.terminate_ec2_instances(IDS)
+
+    assert all("UnauthorizedOperation" in results[i]["error"] for i in IDS)
+
+
+def test_network_error_keeps_results_of_previous_chunks(monkeypatch):
+    class FlakyEC2:
+        def __init__(self):
+            self.calls = []
+
+        def terminate_instances(self, InstanceIds):
+            self.calls.append(InstanceIds)
+            if len(self.calls) == 2:
+                raise EndpointConnectionError(endpoint_url="https://ec2.us-east-1.amazonaws.com")
+            return _terminated(InstanceIds)
+
+    ec2 = FlakyEC2()
+    monkeypatch.setattr(aws_manager, "get_client", lambda service: ec2)
+
+    results = aws_manager.terminate_ec2_instances(IDS, chunk_size=2)
+
+    assert ec2.calls == [IDS[:2], IDS[2:]]   # lot en échec non découpé
+    assert [results[i]["state"] for i in IDS[:2]] == ["shutting-down"] * 2
+    assert all("Could not connect" in results[i]["error"] for i in IDS[2:])
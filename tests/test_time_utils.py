@@ -0,0 +1,25 @@
+# tests/test_time_utils.py
+from datetime import datetime
+
+import pytest
+
+from time_utils import parse_time
+
+MIDNIGHT = datetime(2024, 1, 1)
+
+
+@pytest.mark.parametrize("value", [
+    "2024-01-01T00:00:00Z",
+    "2024-01-01T02:00:00+02:00",
+    "2024-01-01T02:00:00 02:00",   # "+" non encodé dans l'URL
+    "2024-01-01T00:00:00",
+    "1704067200",
+])
+def test_parse_time_is_naive_utc(value):
+    assert parse_time(value) == MIDNIGHT
+
+
+@pytest.mark.parametrize("value", ["hier", "inf", "1e30"])
+def test_parse_time_rejects_invalid_dates(value):
+    with pytest.raises(ValueError, match="date invalide"):
+        parse_time(value)
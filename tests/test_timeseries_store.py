@@ -0,0 +1,30 @@
+# tests/test_timeseries_store.py
+from flask import Flask
+
+from aws_clients import DEFAULT_TARGET
+from monitoring.routes import monitor_bp
+from monitoring.timeseries import MetricStore
+
+
+def test_series_are_bounded_lru(monkeypatch):
+    store = MetricStore(max_series=2)
+    loads = []
+    monkeypatch.setattr(store, "_load", lambda series, instance_id, target: loads.append(instance_id))
+
+    a = store._get_series("i-0000000a", DEFAULT_TARGET)
+    store._get_series("i-0000000b", DEFAULT_TARGET)
+    assert store._get_series("i-0000000a", DEFAULT_TARGET) is a   # a redevient le plus récent
+    store._get_series("i-0000000c", DEFAULT_TARGET)                # évince b
+
+    assert [key[1] for key in store._series] == ["i-0000000a", "i-0000000c"]
+    store._get_series("i-0000000b", DEFAULT_TARGET)
+    assert loads == ["i-0000000a", "i-0000000b", "i-0000000c", "i-0000000b"]
+    assert len(store._series) == 2
+
+
+def test_monitor_ec2_rejects_malformed_instance_id():
+    app = Flask(__name__)
+    app.register_blueprint(monitor_bp, url_prefix="/monitor")
+    resp = app.test_client().get("/monitor/ec2/not-an-instance?step=300")
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "instance_id invalide"}
@@ -0,0 +1,20 @@
+# time_utils.py
+"""Dates reçues en paramètre de requête (?from=, ?to=), partagées par /monitor et /logs."""
+from datetime import datetime
+
+
+def parse_time(value):
+    """Date ISO 8601 (UTC si sans fuseau) ou timestamp epoch en secondes -> datetime UTC naïf."""
+    try:
+        return datetime.utcfromtimestamp(float(value))
+    except (ValueError, OverflowError, OSError):
+        # OverflowError / OSError : "inf", epoch hors de la plage de datetime
+        pass
+    try:
+        # "+02:00" non encodé dans l'URL arrive en " 02:00"
+        dt = datetime.fromisoformat(value.replace(" ", "+").replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"date invalide : {value}")
+    if dt.tzinfo:
+        dt = (dt - dt.utcoffset()).replace(tzinfo=None)
+    return dt
@@ -0,0 +1,35 @@
+# wsgi.py
+"""
+Point d'entrée de production : gunicorn -c gunicorn.conf.py wsgi:app
+
+Avec preload_app (défaut de gunicorn.conf.py), ce module est importé une seule fois,
+dans le master : application, schéma et bundle du modèle sont chargés avant le fork
+et partagés copy-on-write par tous les workers. Aucun thread ni connexion ne doit
+exister à ce moment : les threads d'arrière-plan sont démarrés dans chaque worker
+(post_fork) et le pool SQL est vidé avant le fork.
+"""
+import gc
+import logging
+
+from app import create_app
+from ai.model_utils import get_model_state
+from extensions import db
+from logs import handler as log_handler
+
+logger = logging.getLogger(__name__)
+
+app = create_app(background=False)
+
+try:
+    get_model_state()
+except Exception:
+    # le modèle sera chargé au premier /ai/predict, dans chaque worker
+    logger.warning("Bundle du modèle non préchargé", exc_info=True)
+
+# logs du démarrage écrits une fois ici, sinon chaque worker hériterait de la file
+if log_handler.handler is not None:
+    log_handler.handler.flush()
+# connexions ouvertes par upgrade_schema : jamais partagées entre process
+db.get_engine(app).dispose()
+# objets du démarrage hors du GC : ses passages n'écrivent plus dans les pages partagées
+gc.freeze()